@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import voice, appointments, conversation
+from app.api.api_v1.endpoints import voice, appointments, conversation, analytics, waitlist
 
 api_router = APIRouter()
 
 api_router.include_router(voice.router, prefix="/voice", tags=["voice"])
 api_router.include_router(appointments.router, prefix="/appointments", tags=["appointments"])
-api_router.include_router(conversation.router, prefix="/conversation", tags=["conversation"]) 
\ No newline at end of file
+api_router.include_router(conversation.router, prefix="/conversation", tags=["conversation"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(waitlist.router, prefix="/waitlist", tags=["waitlist"])
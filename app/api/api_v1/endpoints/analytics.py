@@ -0,0 +1,91 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.deps import require_admin
+from app.db.session import get_async_db, get_async_read_db
+from app.services.analytics import AnalyticsService
+from app.services.occupancy_rollup import OccupancyRollupService
+
+router = APIRouter()
+
+@router.get("/occupancy")
+async def get_daily_occupancy(
+    start_date: date,
+    end_date: date,
+    branch_id: Optional[int] = None,
+    staff_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Booked minutes, appointment and cancellation counts, revenue and
+    utilization per branch, staff member and day. Served from the daily
+    occupancy rollup, so the cost does not grow with the number of appointments.
+    """
+    rollup_service = OccupancyRollupService(db)
+    return await rollup_service.get_daily_occupancy(
+        start_date=start_date,
+        end_date=end_date,
+        branch_id=branch_id,
+        staff_id=staff_id
+    )
+
+@router.post("/occupancy/rebuild", dependencies=[Depends(require_admin)])
+async def rebuild_daily_occupancy(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Recompute the daily occupancy rollup from appointments, for all days or
+    an inclusive date range. Requires the X-Admin-Key header.
+    """
+    rollup_service = OccupancyRollupService(db)
+    return {"rows": await rollup_service.rebuild(start_date=start_date, end_date=end_date)}
+
+@router.get("/utilization/heatmap")
+async def get_utilization_heatmap(
+    start_date: date,
+    end_date: date,
+    branch_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Booked minutes, staff capacity and utilization for each hour of the week
+    (7 x 24 grids, Monday first) over a date range
+    """
+    analytics_service = AnalyticsService(db)
+    return await analytics_service.get_utilization_heatmap(
+        start_date=start_date,
+        end_date=end_date,
+        branch_id=branch_id
+    )
+
+@router.get("/revenue/categories")
+async def get_revenue_by_category(
+    start_date: date,
+    end_date: date,
+    branch_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Appointment counts and revenue per service category, highest revenue first
+    """
+    analytics_service = AnalyticsService(db)
+    return await analytics_service.get_revenue_by_category(
+        start_date=start_date,
+        end_date=end_date,
+        branch_id=branch_id
+    )
+
+@router.get("/cancellations")
+async def get_cancellation_rates(
+    start_date: date,
+    end_date: date,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Appointment and cancellation counts and the cancellation rate per branch
+    """
+    analytics_service = AnalyticsService(db)
+    return await analytics_service.get_cancellation_rates(start_date=start_date, end_date=end_date)
@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+import io
 from typing import List, Optional
-from app.db.session import get_db
-from app.services.appointment_service import AppointmentService
+from app.db.session import async_read_router, get_db, get_async_db, get_async_read_db, last_write_time
+from app.services.appointment_service import AppointmentService, DEFAULT_PAGE_SIZE, MAX_NEXT_AVAILABLE, MAX_PAGE_SIZE
+from app.services.availability_cache import availability_cache
+from app.services.export_service import AppointmentExportService, EXPORT_FORMATS, EXPORT_MEDIA_TYPES
+from app.services.import_service import AppointmentImportService, IMPORT_FORMATS, detect_format
+from app.services.waitlist_service import fill_cancelled_slot
+from app.core.etags import etag_matches, make_etag
+from app.core.exceptions import ValidationError
 from app.models import Appointment, AppointmentStatus
 from pydantic import BaseModel
 
@@ -31,7 +41,7 @@ class AppointmentResponse(BaseModel):
 @router.post("/", response_model=AppointmentResponse)
 async def create_appointment(
     appointment: AppointmentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new appointment
@@ -46,52 +56,201 @@ async def create_appointment(
         notes=appointment.notes
     )
 
+@router.post("/import")
+async def import_appointments(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or ndjson; inferred from the file name if omitted"),
+    dry_run: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import appointments from a CSV or NDJSON file.
+    Returns a per-row error report; valid rows are imported even if others fail.
+    """
+    fmt = format or detect_format(file.filename)
+    if fmt not in IMPORT_FORMATS:
+        raise ValidationError(f"Unsupported import format: {fmt}")
+
+    import_service = AppointmentImportService(db)
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    return await run_in_threadpool(import_service.import_stream, stream, fmt, dry_run)
+
 @router.get("/", response_model=List[AppointmentResponse])
 async def get_appointments(
     customer_id: Optional[int] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Get all appointments, optionally filtered by customer
+    Get appointments ordered by time, optionally filtered by customer.
+    Results are paginated; when more remain, the X-Next-Cursor response
+    header holds the cursor for the next page.
     """
     appointment_service = AppointmentService(db)
-    return await appointment_service.get_customer_appointments(
+    page = await appointment_service.get_customer_appointments(
         customer_id=customer_id,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        limit=limit,
+        cursor=cursor
     )
+    # Rows come straight from the database in the response shape, so skip
+    # response_model validation and encode them directly
+    headers = {"X-Next-Cursor": page["next_cursor"]} if page["next_cursor"] else None
+    return ORJSONResponse(page["items"], headers=headers)
+
+async def stream_export(session_factory, format: str, **filters):
+    # The body is streamed after the endpoint returns, when a dependency's
+    # session may already be closed, so the export opens its own
+    async with session_factory() as db:
+        async for chunk in AppointmentExportService(db).export(format, **filters):
+            yield chunk
+
+@router.get("/export")
+async def export_appointments(
+    request: Request,
+    format: str = Query("ndjson", description="ndjson or csv"),
+    customer_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    status: Optional[AppointmentStatus] = None
+):
+    """
+    Stream every matching appointment as NDJSON or CSV, ordered by time.
+    Rows are written as they are fetched, so exports of any size use
+    constant memory.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValidationError(f"Unsupported export format: {format}")
+
+    return StreamingResponse(
+        stream_export(
+            async_read_router.reader(last_write_time(request)),
+            format,
+            customer_id=customer_id,
+            start_date=start_date,
+            end_date=end_date,
+            status=status
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="appointments.{format}"'}
+    )
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def set_etag(response: Response, etag: str) -> None:
+    # no-cache: clients may store the response but must revalidate each time
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
 
 @router.get("/availability")
 async def check_availability(
+    response: Response,
     branch_id: int,
     service_id: int,
     date: datetime,
     staff_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    # Primary, not a replica: the ETag comes from change counters rather than
+    # the data, so slots from a lagging replica would be tagged as current
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Check available time slots for a service
+    Check available time slots for a service.
+    Supports If-None-Match; unchanged availability returns 304 without
+    recomputing the slots.
     """
+    # Taken before computing, so a concurrent write can only make it stale
+    # (forcing a refetch), never newer than the slots it is sent with
+    etag = availability_cache.availability_etag(branch_id, date.date(), service_id, staff_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if etag:
+        set_etag(response, etag)
+
     appointment_service = AppointmentService(db)
     return await appointment_service.check_availability(
         branch_id=branch_id,
         service_id=service_id,
         date=date,
         staff_id=staff_id
-    ) 
+    )
+
+@router.get("/availability/range")
+async def check_availability_range(
+    service_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    branch_ids: Optional[List[int]] = Query(None),
+    staff_ids: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Check available time slots for a service across several days and branches.
+    Each branch gets one string per day with a '1' for every free slot in slot_times.
+    """
+    appointment_service = AppointmentService(db)
+    return await appointment_service.check_availability_range(
+        service_id=service_id,
+        start_date=start_date,
+        end_date=end_date,
+        branch_ids=branch_ids,
+        staff_ids=staff_ids
+    )
+
+@router.get("/availability/next")
+async def find_next_available(
+    service_id: int,
+    after: Optional[datetime] = None,
+    branch_ids: Optional[List[int]] = Query(None),
+    staff_ids: Optional[List[int]] = Query(None),
+    limit: int = Query(5, ge=1, le=MAX_NEXT_AVAILABLE),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Soonest available slots for a service across branches and staff,
+    starting from `after` (default now)
+    """
+    appointment_service = AppointmentService(db)
+    return await appointment_service.find_next_available(
+        service_id=service_id,
+        after=after,
+        branch_ids=branch_ids,
+        staff_ids=staff_ids,
+        limit=limit
+    )
+
+@router.get("/availability/cache-stats")
+async def availability_cache_stats():
+    """
+    Hit/miss counters and size of the availability cache in this worker
+    """
+    return availability_cache.stats()
 
 
 @router.get("/{appointment_id}", response_model=AppointmentResponse)
 async def get_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Get a specific appointment
+    Get a specific appointment.
+    Supports If-None-Match against an ETag derived from updated_at.
     """
     appointment_service = AppointmentService(db)
+    updated_at = await appointment_service.get_appointment_version(appointment_id)
+    if updated_at is not None:
+        etag = make_etag("appointment", appointment_id, updated_at.isoformat())
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
     return await appointment_service.get_appointment(
         appointment_id=appointment_id
     )
@@ -99,13 +258,17 @@ async def get_appointment(
 @router.post("/{appointment_id}/cancel", response_model=AppointmentResponse)
 async def cancel_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Cancel an appointment
+    Cancel an appointment. The freed slot is offered to the waitlist after the
+    response is sent.
     """
     appointment_service = AppointmentService(db)
-    return await appointment_service.cancel_appointment(
+    appointment = await appointment_service.cancel_appointment(
         appointment_id=appointment_id
     )
+    background_tasks.add_task(fill_cancelled_slot, appointment_id)
+    return appointment
 
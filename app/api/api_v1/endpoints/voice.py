@@ -1,13 +1,15 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.services.voice_service import VoiceService, voice_service
+from app.services.audio import AudioDecodeError
+from app.services.streaming_stt import StreamingTranscriber
+from app.services.voice_service import stt_executor, voice_service
+from app.services.whisper_models import whisper_models
 from app.services.appointment_service import AppointmentService
 from app.models import Customer
 from fastapi.responses import StreamingResponse, JSONResponse, Response
 import io
-from app.services.rasa_service import rasa_service
 import uuid
 import json
 from typing import Optional, List, Tuple
@@ -25,7 +27,6 @@ async def process_voice_command(
     """
     try:
         audio_content = await audio_file.read()
-        voice_service = VoiceService()
         appointment_service = AppointmentService(db)
 
         # Process the voice command
@@ -48,6 +49,8 @@ async def process_voice_command(
             "command_data": command_data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -60,12 +63,23 @@ async def text_to_speech(
     Convert text to speech
     """
     try:
-        voice_service = VoiceService()
         audio_content = await voice_service.generate_response(text, language_code)
         return {"audio": audio_content}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/models")
+async def get_loaded_models():
+    """
+    Whisper models loaded in this process, with load and warm-up times and
+    memory footprint, and the state of the STT worker pool
+    """
+    return {
+        "configured": voice_service.settings.WHISPER_MODEL,
+        "models": whisper_models.info(),
+        "executor": stt_executor.status()
+    }
+
 @router.post("/speech-to-text")
 async def convert_speech_to_text(audio: UploadFile = File(...)):
     """
@@ -76,6 +90,10 @@ async def convert_speech_to_text(audio: UploadFile = File(...)):
         contents = await audio.read()
         text = await voice_service.speech_to_text(io.BytesIO(contents))
         return {"text": text}
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Speech-to-text conversion error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -145,33 +163,11 @@ async def voice_conversation(
         text = await voice_service.speech_to_text(io.BytesIO(audio_content))
         logger.info(f"Transcribed text: {text}")
 
-        # Get response from Rasa
-        rasa_response = await rasa_service.detect_intent(text, conversation_id)
-        logger.info(f"Rasa response: {rasa_response}")
-
-        # Extract and validate service if present
-        service = voice_service.extract_service_from_rasa(rasa_response)
-        if service:
-            normalized_service, is_valid = voice_service.validate_service(service)
-            if not is_valid:
-                # Handle invalid service with Rasa
-                rasa_response = await voice_service.handle_invalid_service(conversation_id, service)
-        
+        # Get response from Rasa, validating any requested service
+        response_data = await voice_service.converse(text, conversation_id)
+
         # Convert response to speech
-        audio_response = await voice_service.text_to_speech(rasa_response['text'])
-
-        # Prepare the multipart response
-        response_data = {
-            'session_id': conversation_id,
-            'user_text': text,
-            'bot_text': rasa_response['text'],
-            'rasa_response': rasa_response,
-            'service_validation': {
-                'service': service,
-                'normalized_service': normalized_service if service else None,
-                'is_valid': is_valid if service else None
-            } if service else None
-        }
+        audio_response = await voice_service.text_to_speech(response_data['bot_text'])
 
         # Create a multipart response with both audio and JSON
         boundary = 'boundary123'
@@ -195,6 +191,66 @@ async def voice_conversation(
             media_type=f'multipart/mixed; boundary={boundary}'
         )
 
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in voice conversation: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.websocket("/stream")
+async def stream_conversation(
+    websocket: WebSocket,
+    session_id: Optional[str] = Query(None, description="Session ID for maintaining conversation context"),
+    sample_rate: int = Query(16000, ge=8000, le=48000, description="Sample rate of the PCM frames")
+):
+    """
+    Streaming voice conversation. The client sends 16-bit little-endian mono
+    PCM as binary messages, and may send {"type": "end"} to finish a turn
+    without waiting for silence. The server answers with JSON messages:
+    "partial" and "final" transcripts, and a "response" from Rasa as soon as
+    end of speech is detected. While speech recognition is busy an "error"
+    with retry_after is sent and the final transcript follows once it frees up.
+    """
+    await websocket.accept()
+    conversation_id = session_id if session_id else str(uuid.uuid4())
+    transcriber = StreamingTranscriber(voice_service.transcribe_samples, sample_rate=sample_rate)
+    await websocket.send_json({"type": "session", "session_id": conversation_id})
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                if message.get("bytes") is not None:
+                    events = await transcriber.feed(message["bytes"])
+                else:
+                    control = json.loads(message.get("text") or "{}")
+                    if not isinstance(control, dict):
+                        raise ValueError("Control messages must be JSON objects")
+                    if control.get("type") != "end":
+                        continue
+                    events = await transcriber.flush()
+
+                for event in events:
+                    await websocket.send_json(event)
+                    if event["type"] == "final" and event["text"]:
+                        logger.info(f"Transcribed text: {event['text']}")
+                        response_data = await voice_service.converse(event["text"], conversation_id)
+                        await websocket.send_json({"type": "response", **response_data})
+            except HTTPException as e:
+                await websocket.send_json({
+                    "type": "error",
+                    "status_code": e.status_code,
+                    "detail": e.detail,
+                    "retry_after": (e.headers or {}).get("Retry-After")
+                })
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "status_code": 400, "detail": str(e)})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error in streaming voice conversation: {str(e)}")
+        await websocket.close(code=1011)
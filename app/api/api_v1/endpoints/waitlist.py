@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
+from app.services.waitlist_service import WaitlistService
+
+router = APIRouter()
+
+class WaitlistWindow(BaseModel):
+    start: datetime
+    end: datetime
+
+class WaitlistCreate(BaseModel):
+    customer_id: int
+    service_id: int
+    branch_id: int
+    staff_id: Optional[int] = None
+    windows: List[WaitlistWindow]
+
+class WaitlistEntryResponse(BaseModel):
+    id: int
+    customer_id: int
+    service_id: int
+    branch_id: int
+    staff_id: Optional[int] = None
+    window_start: datetime
+    window_end: datetime
+    status: str
+    appointment_id: Optional[int] = None
+
+@router.post("/", response_model=List[WaitlistEntryResponse])
+async def join_waitlist(
+    request: WaitlistCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Join the waitlist for a service at a branch. When a matching appointment
+    is cancelled, the slot is booked for the longest-waiting customer whose
+    window covers it.
+    """
+    waitlist_service = WaitlistService(db)
+    return await waitlist_service.join_waitlist(
+        customer_id=request.customer_id,
+        service_id=request.service_id,
+        branch_id=request.branch_id,
+        windows=[(window.start, window.end) for window in request.windows],
+        staff_id=request.staff_id
+    )
+
+@router.get("/", response_model=List[WaitlistEntryResponse])
+async def get_waitlist(
+    customer_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    A customer's waiting entries
+    """
+    waitlist_service = WaitlistService(db)
+    return await waitlist_service.get_customer_waitlist(customer_id=customer_id)
+
+@router.delete("/{entry_id}", response_model=WaitlistEntryResponse)
+async def leave_waitlist(
+    entry_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Remove a waiting entry
+    """
+    waitlist_service = WaitlistService(db)
+    return await waitlist_service.leave_waitlist(entry_id=entry_id)
@@ -0,0 +1,15 @@
+import secrets
+from typing import Optional
+from fastapi import Header
+from app.core.config import settings
+from app.core.exceptions import AuthenticationError, AuthorizationError
+
+def require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """
+    Guard for maintenance endpoints: the X-Admin-Key header must match
+    ADMIN_API_KEY, and without one configured they are refused
+    """
+    if not settings.ADMIN_API_KEY:
+        raise AuthorizationError("Admin endpoints are disabled")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise AuthenticationError("Invalid admin key")
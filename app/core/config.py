@@ -29,6 +29,31 @@ class Settings(BaseSettings):
             return v
         return f"postgresql://{values.get('POSTGRES_USER')}:{values.get('POSTGRES_PASSWORD')}@{values.get('POSTGRES_SERVER')}/{values.get('POSTGRES_DB')}"
 
+    # Database connection pool (ignored for SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a connection before failing
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced, -1 to disable
+    DB_POOL_PRE_PING: bool = True
+
+    # Read replicas for read-only sessions; empty means reads use the primary
+    # (Union with str so a plain comma-separated env value is not parsed as JSON)
+    READ_REPLICA_URLS: Union[List[str], str] = []
+    # After a client writes, its reads stay on the primary this long so they
+    # see its own writes despite replication lag
+    READ_REPLICA_STICKY_SECONDS: float = 5.0
+
+    @validator("READ_REPLICA_URLS", pre=True)
+    def assemble_read_replica_urls(cls, v: Union[str, List[str]]) -> List[str]:
+        if isinstance(v, str) and not v.startswith("["):
+            return [i.strip() for i in v.split(",") if i.strip()]
+        elif isinstance(v, (list, str)):
+            return v
+        raise ValueError(v)
+
+    # Sent as X-Admin-Key to maintenance endpoints; unset disables them
+    ADMIN_API_KEY: Union[str, None] = None
+
     # Google Cloud
     GOOGLE_CLOUD_PROJECT: str
 
@@ -0,0 +1,29 @@
+"""
+Helpers for weak ETags and If-None-Match handling
+"""
+import hashlib
+from typing import Any, Optional
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Weak ETag from the values that identify a representation's version
+    """
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Weak comparison of an ETag against an If-None-Match header value
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
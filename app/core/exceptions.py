@@ -40,4 +40,12 @@ class PaymentError(HTTPException):
         super().__init__(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=detail
-        ) 
\ No newline at end of file
+        )
+
+class ServiceUnavailableError(HTTPException):
+    def __init__(self, detail: str = "Service temporarily unavailable", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)}
+        )
@@ -0,0 +1,174 @@
+"""
+Minimal in-process metrics registry with Prometheus text exposition
+"""
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> LabelValues:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: LabelValues, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, labels: Optional[Dict[str, str]] = None) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, labels: Optional[Dict[str, str]] = None) -> float:
+        return self._values.get(_labels(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge:
+    """
+    Gauge whose value is either set directly or read from a callback at
+    scrape time
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelValues, float] = {}
+        self._callbacks: Dict[LabelValues, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+    def inc(self, amount: float = 1, labels: Optional[Dict[str, str]] = None) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, labels: Optional[Dict[str, str]] = None) -> None:
+        self.inc(-amount, labels)
+
+    def set_function(self, callback: Callable[[], float], labels: Optional[Dict[str, str]] = None) -> None:
+        with self._lock:
+            self._callbacks[_labels(labels)] = callback
+
+    def value(self, labels: Optional[Dict[str, str]] = None) -> float:
+        key = _labels(labels)
+        if key in self._callbacks:
+            return self._callbacks[key]()
+        return self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        values = dict(self._values)
+        for key, callback in list(self._callbacks.items()):
+            values[key] = callback()
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        key = _labels(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[position] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, labels: Optional[Dict[str, str]] = None) -> int:
+        return sum(self._counts.get(_labels(labels), ()))
+
+    def sum(self, labels: Optional[Dict[str, str]] = None) -> float:
+        return self._sums.get(_labels(labels), 0.0)
+
+    def quantile(self, q: float, labels: Optional[Dict[str, str]] = None) -> Optional[float]:
+        """
+        Upper bucket bound containing the q-quantile (inf if beyond the last bucket)
+        """
+        counts = self._counts.get(_labels(labels))
+        if not counts:
+            return None
+        target = q * sum(counts)
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, counts in list(self._counts.items()):
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', le)])} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {self._sums[key]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help)
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
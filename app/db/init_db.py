@@ -1,12 +1,23 @@
+import os
+from alembic import command
+from alembic.config import Config
 from sqlalchemy.orm import Session
 from app.db.session import Base, engine
 import app.models  # This imports all models
 
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+def alembic_config() -> Config:
+    return Config(ALEMBIC_INI)
+
 def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
+    # The schema is owned by the migrations in app/db/migrations
+    command.upgrade(alembic_config(), "head")
 
 def drop_db() -> None:
     Base.metadata.drop_all(bind=engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
 
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db()
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import weakref
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Union
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# First key of the two-key PostgreSQL advisory lock, so booking locks never
+# collide with advisory locks taken for other purposes
+BOOKING_LOCK_NAMESPACE = 1001
+
+_local_locks = defaultdict(threading.Lock)
+_local_locks_guard = threading.Lock()
+# Per event loop, dropped with the loop; asyncio locks must not be shared
+# across loops
+_async_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def _local_lock(staff_id: int) -> threading.Lock:
+    with _local_locks_guard:
+        return _local_locks[staff_id]
+
+
+@contextmanager
+def staff_booking_lock(db: Session, staff_id: int):
+    """
+    Serialize bookings for one staff member. On PostgreSQL this takes a
+    transaction-scoped advisory lock, released by the commit or rollback that
+    ends the booking transaction. Other databases (SQLite in tests) fall back to
+    a per-staff lock within the process.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :staff_id)"),
+            {"namespace": BOOKING_LOCK_NAMESPACE, "staff_id": staff_id}
+        )
+        yield
+    else:
+        with _local_lock(staff_id):
+            yield
+
+
+@asynccontextmanager
+async def async_staff_booking_lock(db: Union[Session, AsyncSession], staff_id: int):
+    """
+    Companion to staff_booking_lock for AsyncSession callers on databases
+    without advisory locks. Coroutines on one event loop share a thread, so
+    they must queue on an asyncio lock rather than block on the process lock.
+    """
+    if isinstance(db, AsyncSession) and db.sync_session.get_bind().dialect.name != "postgresql":
+        with _local_locks_guard:
+            loop_locks = _async_locks.setdefault(asyncio.get_running_loop(), {})
+        lock = loop_locks.setdefault(staff_id, asyncio.Lock())
+        async with lock:
+            yield
+    else:
+        yield
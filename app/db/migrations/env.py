@@ -0,0 +1,50 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine
+from app.db.session import Base, SQLALCHEMY_DATABASE_URL
+import app.models  # This imports all models
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+def database_url() -> str:
+    # Callers such as init_db may pass an explicit URL; default to DATABASE_URL
+    return config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"}
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    # Tests hand in an open connection; otherwise connect to the configured URL
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+    with create_engine(database_url()).connect() as connection:
+        _run_with_connection(connection)
+
+def _run_with_connection(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite cannot ALTER most constraints in place
+        render_as_batch=connection.dialect.name == "sqlite"
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
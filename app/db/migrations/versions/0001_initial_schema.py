@@ -0,0 +1,91 @@
+"""Initial schema
+
+Matches the tables previously created by init_db with Base.metadata.create_all.
+Databases created that way should be marked as migrated with
+`alembic stamp 0001` before upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-03-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+APPOINTMENT_STATUS = sa.Enum("SCHEDULED", "CONFIRMED", "CANCELLED", "COMPLETED", name="appointmentstatus")
+
+
+def _timestamps():
+    return [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "branches",
+        *_timestamps(),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("address", sa.String(255), nullable=False),
+        sa.Column("city", sa.String(100), nullable=False),
+        sa.Column("state", sa.String(2), nullable=False),
+        sa.Column("phone", sa.String(20), nullable=False),
+        sa.Column("email", sa.String(255)),
+        sa.Column("description", sa.Text()),
+        sa.Column("opening_hours", sa.String(255)),
+    )
+    op.create_table(
+        "customers",
+        *_timestamps(),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("phone", sa.String(20)),
+        sa.Column("preferences", sa.Text()),
+    )
+    op.create_table(
+        "services",
+        *_timestamps(),
+        sa.Column("name", sa.String(100), nullable=False, unique=True),
+        sa.Column("description", sa.String(500)),
+        sa.Column("duration_minutes", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("category", sa.String(50)),
+    )
+    op.create_table(
+        "staff",
+        *_timestamps(),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("phone", sa.String(20)),
+        sa.Column("role", sa.String(50), nullable=False),
+        sa.Column("branch_id", sa.Integer(), sa.ForeignKey("branches.id"), nullable=False),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("specialties", sa.String(255)),
+    )
+    op.create_table(
+        "appointments",
+        *_timestamps(),
+        sa.Column("customer_id", sa.Integer(), sa.ForeignKey("customers.id"), nullable=False),
+        sa.Column("staff_id", sa.Integer(), sa.ForeignKey("staff.id"), nullable=False),
+        sa.Column("branch_id", sa.Integer(), sa.ForeignKey("branches.id"), nullable=False),
+        sa.Column("service_id", sa.Integer(), sa.ForeignKey("services.id"), nullable=False),
+        sa.Column("appointment_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("status", APPOINTMENT_STATUS),
+        sa.Column("notes", sa.Text()),
+    )
+    for table in ("branches", "customers", "services", "staff", "appointments"):
+        op.create_index(f"ix_{table}_id", table, ["id"])
+
+
+def downgrade() -> None:
+    for table in ("appointments", "staff", "services", "customers", "branches"):
+        op.drop_table(table)
+    APPOINTMENT_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,36 @@
+"""Composite indexes for appointment availability and listing queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-03-15 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text("status <> 'CANCELLED'")
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_appointments_staff_active_time",
+        "appointments",
+        ["staff_id", "appointment_time", "end_time"],
+        postgresql_where=ACTIVE,
+        sqlite_where=ACTIVE
+    )
+    op.create_index("ix_appointments_customer_time", "appointments", ["customer_id", "appointment_time"])
+    op.create_index("ix_appointments_branch_time", "appointments", ["branch_id", "appointment_time", "status"])
+    op.create_index("ix_appointments_time", "appointments", ["appointment_time"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_appointments_time", table_name="appointments")
+    op.drop_index("ix_appointments_branch_time", table_name="appointments")
+    op.drop_index("ix_appointments_customer_time", table_name="appointments")
+    op.drop_index("ix_appointments_staff_active_time", table_name="appointments")
@@ -0,0 +1,30 @@
+"""Extend appointment listing indexes with id for keyset pagination
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-04-02 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _replace_listing_indexes(with_id: bool) -> None:
+    tail = ["id"] if with_id else []
+    op.drop_index("ix_appointments_time", table_name="appointments")
+    op.drop_index("ix_appointments_customer_time", table_name="appointments")
+    op.create_index("ix_appointments_time", "appointments", ["appointment_time"] + tail)
+    op.create_index("ix_appointments_customer_time", "appointments", ["customer_id", "appointment_time"] + tail)
+
+
+def upgrade() -> None:
+    _replace_listing_indexes(with_id=True)
+
+
+def downgrade() -> None:
+    _replace_listing_indexes(with_id=False)
@@ -0,0 +1,46 @@
+"""Daily occupancy rollup per branch, staff member, day and status
+
+Populate it after upgrading with `python app/scripts/rebuild_occupancy.py`.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-04-20 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+APPOINTMENT_STATUS = sa.Enum(
+    "SCHEDULED", "CONFIRMED", "CANCELLED", "COMPLETED",
+    name="appointmentstatus",
+    create_type=False
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_occupancy",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("branch_id", sa.Integer(), sa.ForeignKey("branches.id"), nullable=False),
+        sa.Column("staff_id", sa.Integer(), sa.ForeignKey("staff.id"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("status", APPOINTMENT_STATUS, nullable=False),
+        sa.Column("appointment_count", sa.Integer(), nullable=False),
+        sa.Column("booked_minutes", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.UniqueConstraint("branch_id", "staff_id", "day", "status", name="uq_daily_occupancy_key"),
+    )
+    op.create_index("ix_daily_occupancy_id", "daily_occupancy", ["id"])
+    op.create_index("ix_daily_occupancy_branch_day", "daily_occupancy", ["branch_id", "day"])
+    op.create_index("ix_daily_occupancy_staff_day", "daily_occupancy", ["staff_id", "day"])
+
+
+def downgrade() -> None:
+    op.drop_table("daily_occupancy")
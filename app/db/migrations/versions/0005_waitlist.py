@@ -0,0 +1,51 @@
+"""Waitlist entries for auto-filling cancelled slots
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-05-02 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+WAITING = sa.text("status = 'WAITING'")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "waitlist_entries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("customer_id", sa.Integer(), sa.ForeignKey("customers.id"), nullable=False),
+        sa.Column("service_id", sa.Integer(), sa.ForeignKey("services.id"), nullable=False),
+        sa.Column("branch_id", sa.Integer(), sa.ForeignKey("branches.id"), nullable=False),
+        sa.Column("staff_id", sa.Integer(), sa.ForeignKey("staff.id")),
+        sa.Column("window_start", sa.DateTime(), nullable=False),
+        sa.Column("window_end", sa.DateTime(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("WAITING", "BOOKED", "REMOVED", name="waitliststatus"),
+            nullable=False
+        ),
+        sa.Column("appointment_id", sa.Integer(), sa.ForeignKey("appointments.id")),
+    )
+    op.create_index("ix_waitlist_entries_id", "waitlist_entries", ["id"])
+    op.create_index(
+        "ix_waitlist_entries_waiting_window",
+        "waitlist_entries",
+        ["branch_id", "service_id", "window_start", "window_end"],
+        postgresql_where=WAITING,
+        sqlite_where=WAITING
+    )
+    op.create_index("ix_waitlist_entries_customer", "waitlist_entries", ["customer_id", "status"])
+
+
+def downgrade() -> None:
+    op.drop_table("waitlist_entries")
+    sa.Enum(name="waitliststatus").drop(op.get_bind(), checkfirst=True)
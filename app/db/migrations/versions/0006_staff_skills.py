@@ -0,0 +1,84 @@
+"""Normalize Staff.specialties into a staff_skills table
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-05-10 00:00:00
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+staff = sa.table(
+    "staff",
+    sa.column("id", sa.Integer()),
+    sa.column("specialties", sa.String(255)),
+)
+staff_skills = sa.table(
+    "staff_skills",
+    sa.column("created_at", sa.DateTime()),
+    sa.column("updated_at", sa.DateTime()),
+    sa.column("staff_id", sa.Integer()),
+    sa.column("skill", sa.String(50)),
+)
+
+
+def _parse_skills(specialties):
+    # Frozen copy of app.models.staff.parse_skills, so later model changes
+    # cannot alter what this migration does
+    skills = []
+    for part in (specialties or "").split(","):
+        skill = part.strip().lower()
+        if skill and skill not in skills:
+            skills.append(skill)
+    return skills
+
+
+def upgrade() -> None:
+    op.create_table(
+        "staff_skills",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("staff_id", sa.Integer(), sa.ForeignKey("staff.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("skill", sa.String(50), nullable=False),
+        sa.UniqueConstraint("staff_id", "skill", name="uq_staff_skills_staff_skill"),
+    )
+    op.create_index("ix_staff_skills_id", "staff_skills", ["id"])
+    op.create_index("ix_staff_skills_skill_staff", "staff_skills", ["skill", "staff_id"])
+
+    connection = op.get_bind()
+    now = datetime.utcnow()
+    rows = [
+        {"created_at": now, "updated_at": now, "staff_id": staff_id, "skill": skill}
+        for staff_id, specialties in connection.execute(sa.select(staff.c.id, staff.c.specialties))
+        for skill in _parse_skills(specialties)
+    ]
+    if rows:
+        op.bulk_insert(staff_skills, rows)
+
+    with op.batch_alter_table("staff") as batch_op:
+        batch_op.drop_column("specialties")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("staff") as batch_op:
+        batch_op.add_column(sa.Column("specialties", sa.String(255)))
+
+    connection = op.get_bind()
+    skills = {}
+    for staff_id, skill in connection.execute(
+        sa.select(staff_skills.c.staff_id, staff_skills.c.skill).order_by(staff_skills.c.staff_id, staff_skills.c.skill)
+    ):
+        skills.setdefault(staff_id, []).append(skill.capitalize())
+    for staff_id, names in skills.items():
+        connection.execute(
+            staff.update().where(staff.c.id == staff_id).values(specialties=",".join(names))
+        )
+
+    op.drop_table("staff_skills")
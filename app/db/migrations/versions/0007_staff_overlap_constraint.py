@@ -0,0 +1,41 @@
+"""Reject overlapping active appointments per staff member on PostgreSQL
+
+Kept out of 0001 so databases stamped at 0001 also get it on upgrade. Skipped
+when the constraint already exists, as it does on databases created by
+init_db. Existing overlapping bookings must be resolved before upgrading.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-05-20 00:00:00
+"""
+from alembic import op
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+CONSTRAINT = "appointments_staff_no_overlap"
+
+
+def _has_constraint() -> bool:
+    return op.get_bind().exec_driver_sql(
+        "SELECT 1 FROM pg_constraint WHERE conname = %(name)s", {"name": CONSTRAINT}
+    ).first() is not None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql" or _has_constraint():
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute(
+        f"ALTER TABLE appointments ADD CONSTRAINT {CONSTRAINT} "
+        "EXCLUDE USING gist (staff_id WITH =, tsrange(appointment_time, end_time) WITH &&) "
+        "WHERE (status <> 'CANCELLED')"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"ALTER TABLE appointments DROP CONSTRAINT IF EXISTS {CONSTRAINT}")
@@ -0,0 +1,30 @@
+"""Snapshot the service price on each appointment
+
+Existing appointments are backfilled with their service's current price.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2024-05-27 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("appointments") as batch_op:
+        batch_op.add_column(sa.Column("price", sa.Float()))
+    op.execute(
+        "UPDATE appointments SET price = "
+        "(SELECT services.price FROM services WHERE services.id = appointments.service_id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("appointments") as batch_op:
+        batch_op.drop_column("price")
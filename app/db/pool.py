@@ -0,0 +1,102 @@
+import time
+from typing import Any, Dict
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.metrics import metrics
+
+POOL_CHECKOUT_WAIT = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool"
+)
+POOL_CHECKOUT_TIMEOUTS = metrics.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT"
+)
+POOL_CHECKED_OUT = metrics.gauge("db_pool_checked_out_connections", "Connections currently in use")
+POOL_OVERFLOW = metrics.gauge("db_pool_overflow_connections", "Connections open beyond DB_POOL_SIZE")
+POOL_SIZE = metrics.gauge("db_pool_size", "Configured number of pooled connections")
+
+
+class _InstrumentedPoolMixin:
+    """
+    Times every checkout, including the wait for a free connection when the
+    pool and its overflow are exhausted
+    """
+    metrics_label = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc(labels={"engine": self.metrics_label})
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, labels={"engine": self.metrics_label})
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, settings, is_async: bool = False) -> Dict[str, Any]:
+    """
+    Pool keyword arguments for create_engine/create_async_engine from Settings.
+    SQLite keeps SQLAlchemy's default pool, which takes no sizing options.
+    """
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def instrument_engine(engine, label: str) -> None:
+    """
+    Label an engine's pool for checkout timing and export its usage gauges
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not isinstance(sync_engine.pool, _InstrumentedPoolMixin):
+        return
+
+    sync_engine.pool.metrics_label = label
+    labels = {"engine": label}
+    # Read through the engine so gauges follow the pool across dispose()
+    POOL_CHECKED_OUT.set_function(lambda: sync_engine.pool.checkedout(), labels)
+    POOL_OVERFLOW.set_function(lambda: max(sync_engine.pool.overflow(), 0), labels)
+    POOL_SIZE.set_function(lambda: sync_engine.pool.size(), labels)
+
+
+def pool_status(engine) -> Dict[str, Any]:
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    if not isinstance(pool, _InstrumentedPoolMixin):
+        return {"pool": type(pool).__name__}
+    labels = {"engine": pool.metrics_label}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": POOL_CHECKOUT_WAIT.count(labels),
+        "wait_seconds_total": POOL_CHECKOUT_WAIT.sum(labels),
+        "wait_seconds_p95_bucket": POOL_CHECKOUT_WAIT.quantile(0.95, labels),
+        "timeouts": POOL_CHECKOUT_TIMEOUTS.value(labels),
+    }
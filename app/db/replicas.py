@@ -0,0 +1,88 @@
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+# Marks sessions bound to a replica: they refuse to flush, and their results
+# are not written to shared caches, which must only hold primary data
+READ_ONLY_INFO = "read_only"
+
+# Carries the time (Unix seconds) of a client's last write between requests,
+# so only that client's reads stick to the primary. Browsers get the cookie;
+# other clients echo the response header back.
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+# Set per request by track_primary_writes; commits record their time in it
+_request_writes: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_writes", default=None)
+
+
+def is_read_only(session) -> bool:
+    return bool(session.info.get(READ_ONLY_INFO))
+
+
+def parse_last_write(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class ReplicaRouter:
+    """
+    Hands out session factories for read-only work: replicas in round-robin
+    order, or the primary when none are configured or the client wrote within
+    the last `sticky_seconds`.
+    """
+
+    def __init__(self, primary: sessionmaker, replicas: List[sessionmaker], sticky_seconds: float = 0.0):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.sticky_seconds = sticky_seconds
+        self._next_replica = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+
+    def reader(self, last_write: Optional[float] = None) -> sessionmaker:
+        """
+        last_write is when the client last wrote, if it has
+        """
+        if not self.replicas or (last_write is not None and time.time() - last_write < self.sticky_seconds):
+            return self.primary
+        with self._lock:
+            return next(self._next_replica)
+
+
+async def track_primary_writes(request, call_next):
+    """
+    HTTP middleware that hands the client the time of any write its request
+    committed, for read_router to keep its next reads on the primary
+    """
+    writes: Dict[str, float] = {}
+    token = _request_writes.set(writes)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_writes.reset(token)
+    if "at" in writes:
+        value = f"{writes['at']:.3f}"
+        response.headers[LAST_WRITE_HEADER] = value
+        response.set_cookie(LAST_WRITE_COOKIE, value, httponly=True, samesite="lax")
+    return response
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_replica_writes(session, flush_context, instances):
+    if is_read_only(session):
+        raise RuntimeError("Cannot write through a read-only replica session")
+
+
+@event.listens_for(Session, "after_commit")
+def _record_primary_write(session):
+    # Read paths never commit, so any commit on a primary session is a write,
+    # including Core and COPY writes that bypass the unit of work
+    writes = _request_writes.get()
+    if writes is not None and not is_read_only(session):
+        writes["at"] = time.time()
@@ -4,6 +4,8 @@ import json
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
 from app.models import Branch, Staff, Appointment, AppointmentStatus, Customer, Service
+# Registers the events that count seeded appointments in the occupancy rollup
+import app.services.occupancy_rollup  # noqa: F401
 
 # Sample data
 SERVICES = [
@@ -164,7 +166,15 @@ def create_test_data():
         db.add_all(branches)
         db.commit()
 
-        # Create staff members
+        # Create staff members, covering every service category. Staff without
+        # specialties are generalists who can provide any service.
+        staff_roles = [
+            ("Stylist", "Hair,Color"),
+            ("Stylist", "Hair"),
+            ("Nail Technician", "Nails"),
+            ("Esthetician", "Skin,Body"),
+            ("Salon Assistant", None),
+        ]
         staff_members = []
         for branch in branches:
             staff_members.extend([
@@ -172,11 +182,11 @@ def create_test_data():
                     name=f"Staff {i+1} at {branch.name}",
                     email=f"staff{i+1}_{branch.id}@salon.com",
                     phone=f"(415) 555-{1000+i}",
-                    role="Stylist",
+                    role=role,
                     branch_id=branch.id,
-                    specialties="Hair,Color"
+                    specialties=specialties
                 )
-                for i in range(5)  # 5 staff members per branch
+                for i, (role, specialties) in enumerate(staff_roles)  # 5 staff members per branch
             ])
         db.add_all(staff_members)
         db.commit()
@@ -201,8 +211,13 @@ def create_test_data():
         for _ in range(164):  # Create 164 appointments
             customer = random.choice(customers)
             branch = random.choice(branches)
-            staff = random.choice([s for s in staff_members if s.branch_id == branch.id])
             service = random.choice(services)
+            staff = random.choice([
+                s for s in staff_members
+                if s.branch_id == branch.id and (
+                    not s.specialties or service.category.lower() in s.specialties.split(",")
+                )
+            ])
             
             # Random date within 60 days (30 days in past, 30 days in future)
             appointment_date = start_date + timedelta(
@@ -216,6 +231,15 @@ def create_test_data():
                 status = random.choice([AppointmentStatus.COMPLETED, AppointmentStatus.CANCELLED])
             else:
                 status = random.choice([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
+
+            # Staff cannot be double booked, so skip overlapping active appointments
+            end_date = appointment_date + timedelta(minutes=service.duration_minutes)
+            if status != AppointmentStatus.CANCELLED and any(
+                a.staff_id == staff.id and a.status != AppointmentStatus.CANCELLED and
+                appointment_date < a.end_time and end_date > a.appointment_time
+                for a in appointments
+            ):
+                continue
             
             appointments.append(
                 Appointment(
@@ -224,7 +248,7 @@ def create_test_data():
                     branch_id=branch.id,
                     service_id=service.id,
                     appointment_time=appointment_date,
-                    end_time=appointment_date + timedelta(minutes=service.duration_minutes),
+                    end_time=end_date,
                     status=status,
                     notes="Test appointment"
                 )
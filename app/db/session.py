@@ -1,16 +1,84 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 import os
 from dotenv import load_dotenv
+from app.core.config import settings
+from app.db.pool import engine_options, instrument_engine
+from app.db.replicas import LAST_WRITE_COOKIE, LAST_WRITE_HEADER, READ_ONLY_INFO, ReplicaRouter, parse_last_write
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Async drivers used for the same database by the async session path
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """
+    Translate a sync database URL to its async driver, e.g.
+    postgresql://... -> postgresql+asyncpg://...
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return str(parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}"))
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    **engine_options(SQLALCHEMY_DATABASE_URL, settings)
+)
+instrument_engine(engine, "sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    async_database_url(SQLALCHEMY_DATABASE_URL),
+    **engine_options(SQLALCHEMY_DATABASE_URL, settings, is_async=True)
+)
+instrument_engine(async_engine, "async")
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Read replicas, each with a sync and an async engine like the primary
+replica_session_makers = []
+async_replica_session_makers = []
+for number, replica_url in enumerate(settings.READ_REPLICA_URLS, start=1):
+    replica_engine = create_engine(replica_url, **engine_options(replica_url, settings))
+    instrument_engine(replica_engine, f"replica{number}")
+    replica_session_makers.append(sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=replica_engine,
+        info={READ_ONLY_INFO: True}
+    ))
+
+    async_replica_engine = create_async_engine(
+        async_database_url(replica_url),
+        **engine_options(replica_url, settings, is_async=True)
+    )
+    instrument_engine(async_replica_engine, f"async-replica{number}")
+    async_replica_session_makers.append(sessionmaker(
+        bind=async_replica_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False,
+        info={READ_ONLY_INFO: True}
+    ))
+
+read_router = ReplicaRouter(SessionLocal, replica_session_makers, settings.READ_REPLICA_STICKY_SECONDS)
+async_read_router = ReplicaRouter(AsyncSessionLocal, async_replica_session_makers, settings.READ_REPLICA_STICKY_SECONDS)
+
 Base = declarative_base()
 
 # Dependency
@@ -19,4 +87,29 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def last_write_time(request: Request):
+    """
+    When the calling client last wrote, from the header or cookie set by
+    track_primary_writes
+    """
+    return parse_last_write(request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE))
+
+# Read-only dependencies: a replica session when replicas are configured,
+# unless the client wrote within READ_REPLICA_STICKY_SECONDS.
+# Never use these for writes.
+def get_read_db(request: Request):
+    db = read_router.reader(last_write_time(request))()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    async with async_read_router.reader(last_write_time(request))() as db:
+        yield db
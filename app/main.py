@@ -1,8 +1,14 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.api.api_v1.api import api_router
+from app.db.replicas import track_primary_writes
+from app.services.voice_service import VoiceServiceSettings, stt_executor
+from app.services.whisper_models import whisper_models
 import os
 import logging
 
@@ -26,8 +32,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Last-Write"],
 )
 
+# Lets a client's reads after its own writes skip lagging replicas
+app.middleware("http")(track_primary_writes)
+
 # Mount static files
 static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
@@ -35,6 +45,24 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def preload_whisper_model():
+    # Otherwise the model is loaded by the first request that needs it
+    voice_settings = VoiceServiceSettings()
+    if voice_settings.WHISPER_PRELOAD and voice_settings.STT_PROVIDER == "whisper":
+        if stt_executor.uses_processes:
+            # Each worker process warms its own model as it starts
+            stt_executor.start()
+            return
+        try:
+            await run_in_threadpool(whisper_models.warm_up, [voice_settings.WHISPER_MODEL])
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Whisper warm-up failed, loading on first use instead: {e}")
+
+@app.on_event("shutdown")
+def stop_stt_workers():
+    stt_executor.shutdown()
+
 @app.get("/")
 async def root():
     return {
@@ -44,4 +72,8 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    return metrics.render()
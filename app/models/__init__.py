@@ -1,16 +1,22 @@
 from app.models.base import BaseModel
 from app.models.appointment import Appointment, AppointmentStatus
-from app.models.staff import Staff
+from app.models.staff import Staff, StaffSkill
 from app.models.branch import Branch
 from app.models.customer import Customer
 from app.models.service import Service
+from app.models.daily_occupancy import DailyOccupancy
+from app.models.waitlist import WaitlistEntry, WaitlistStatus
 
 __all__ = [
     "BaseModel",
     "Appointment",
     "AppointmentStatus",
     "Staff",
+    "StaffSkill",
     "Branch",
     "Customer",
     "Service",
+    "DailyOccupancy",
+    "WaitlistEntry",
+    "WaitlistStatus",
 ] 
\ No newline at end of file
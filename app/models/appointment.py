@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text, Enum, DDL, Index, event, select, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 
 from app.models.base import BaseModel
+from app.models.service import Service
 
 class AppointmentStatus(enum.Enum):
     SCHEDULED = "scheduled"
@@ -13,6 +14,21 @@ class AppointmentStatus(enum.Enum):
 
 class Appointment(BaseModel):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Availability and booking overlap checks: active bookings of a set of
+        # staff members in a time window. Partial where the database supports it.
+        Index(
+            "ix_appointments_staff_active_time",
+            "staff_id", "appointment_time", "end_time",
+            postgresql_where=text("status <> 'CANCELLED'"),
+            sqlite_where=text("status <> 'CANCELLED'")
+        ),
+        # Listings by customer, by branch and over a plain date range. Listing
+        # keys end in id to match the (appointment_time, id) keyset order.
+        Index("ix_appointments_customer_time", "customer_id", "appointment_time", "id"),
+        Index("ix_appointments_branch_time", "branch_id", "appointment_time", "status"),
+        Index("ix_appointments_time", "appointment_time", "id"),
+    )
 
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     staff_id = Column(Integer, ForeignKey("staff.id"), nullable=False)
@@ -22,9 +38,30 @@ class Appointment(BaseModel):
     end_time = Column(DateTime, nullable=False)
     status = Column(Enum(AppointmentStatus), default=AppointmentStatus.SCHEDULED)
     notes = Column(Text)
+    # The service's price when booked, so later price changes leave the
+    # revenue of existing bookings alone
+    price = Column(Float)
 
     # Relationships
     customer = relationship("Customer", back_populates="appointments")
     staff = relationship("Staff", back_populates="appointments")
     branch = relationship("Branch", back_populates="appointments")
-    service = relationship("Service", back_populates="appointments")
\ No newline at end of file
+    service = relationship("Service", back_populates="appointments")
+
+@event.listens_for(Appointment, "before_insert")
+def _snapshot_service_price(mapper, connection, target):
+    if target.price is None:
+        target.price = connection.execute(select(Service.price).where(Service.id == target.service_id)).scalar()
+
+# On PostgreSQL the database itself rejects overlapping active bookings for a
+# staff member, backing up the advisory lock taken in create_appointment
+event.listen(
+    Appointment.__table__,
+    "after_create",
+    DDL(
+        "CREATE EXTENSION IF NOT EXISTS btree_gist; "
+        "ALTER TABLE appointments ADD CONSTRAINT appointments_staff_no_overlap "
+        "EXCLUDE USING gist (staff_id WITH =, tsrange(appointment_time, end_time) WITH &&) "
+        "WHERE (status <> 'CANCELLED')"
+    ).execute_if(dialect="postgresql")
+)
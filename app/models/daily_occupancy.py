@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Date, Float, ForeignKey, Enum, Index, UniqueConstraint
+
+from app.models.appointment import AppointmentStatus
+from app.models.base import BaseModel
+
+class DailyOccupancy(BaseModel):
+    """
+    Rollup of appointments per branch, staff member, start day and status.
+    Kept up to date by app.services.occupancy_rollup as appointments are
+    written, and rebuildable from the appointments table.
+    """
+    __tablename__ = "daily_occupancy"
+    __table_args__ = (
+        UniqueConstraint("branch_id", "staff_id", "day", "status", name="uq_daily_occupancy_key"),
+        Index("ix_daily_occupancy_branch_day", "branch_id", "day"),
+        Index("ix_daily_occupancy_staff_day", "staff_id", "day"),
+    )
+
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=False)
+    staff_id = Column(Integer, ForeignKey("staff.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    status = Column(Enum(AppointmentStatus), nullable=False)
+    appointment_count = Column(Integer, nullable=False, default=0)
+    booked_minutes = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)  # Sum of Service.price
@@ -1,7 +1,25 @@
-from sqlalchemy import Column, String, ForeignKey, Boolean, Integer
+from typing import List, Optional
+from sqlalchemy import Column, String, ForeignKey, Boolean, Integer, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
+def normalize_skill(name: Optional[str]) -> str:
+    """
+    Skills match service categories case-insensitively
+    """
+    return (name or "").strip().lower()
+
+def parse_skills(specialties: Optional[str]) -> List[str]:
+    """
+    Skills from a comma-separated list such as "Hair,Color", without duplicates
+    """
+    skills = []
+    for part in (specialties or "").split(","):
+        skill = normalize_skill(part)
+        if skill and skill not in skills:
+            skills.append(skill)
+    return skills
+
 class Staff(BaseModel):
     __tablename__ = "staff"
 
@@ -11,8 +29,44 @@ class Staff(BaseModel):
     role = Column(String(50), nullable=False)
     branch_id = Column(Integer, ForeignKey('branches.id'), nullable=False)
     is_active = Column(Boolean, default=True)
-    specialties = Column(String(255))  # Comma-separated list of services they can provide
 
     # Relationships
     branch = relationship("Branch", back_populates="staff")
-    appointments = relationship("Appointment", back_populates="staff") 
\ No newline at end of file
+    appointments = relationship("Appointment", back_populates="staff")
+    skills = relationship(
+        "StaffSkill",
+        back_populates="staff",
+        cascade="all, delete-orphan",
+        order_by="StaffSkill.skill"
+    )
+
+    @property
+    def specialties(self) -> str:
+        """
+        Skills as a comma-separated list. Staff without skills are generalists
+        who can provide every service.
+        """
+        return ",".join(skill.skill for skill in self.skills)
+
+    @specialties.setter
+    def specialties(self, value: Optional[str]) -> None:
+        # Keep rows for skills that stay, so the (staff, skill) unique key never
+        # sees a delete and re-insert of the same skill in one flush
+        existing = {skill.skill: skill for skill in self.skills}
+        self.skills = [existing.get(skill) or StaffSkill(skill=skill) for skill in parse_skills(value)]
+
+class StaffSkill(BaseModel):
+    """
+    One skill of a staff member, matched against Service.category
+    """
+    __tablename__ = "staff_skills"
+    __table_args__ = (
+        UniqueConstraint("staff_id", "skill", name="uq_staff_skills_staff_skill"),
+        Index("ix_staff_skills_skill_staff", "skill", "staff_id"),
+    )
+
+    staff_id = Column(Integer, ForeignKey("staff.id", ondelete="CASCADE"), nullable=False)
+    skill = Column(String(50), nullable=False)  # Normalized with normalize_skill
+
+    # Relationships
+    staff = relationship("Staff", back_populates="skills")
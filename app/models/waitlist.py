@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, Index, text
+from sqlalchemy.orm import relationship
+import enum
+
+from app.models.base import BaseModel
+
+class WaitlistStatus(enum.Enum):
+    WAITING = "waiting"
+    BOOKED = "booked"
+    REMOVED = "removed"
+
+class WaitlistEntry(BaseModel):
+    """
+    One acceptable time window of a customer waiting for a service at a
+    branch, optionally with a preferred staff member. A customer lists several
+    windows as several entries; booking any of them closes the rest.
+    """
+    __tablename__ = "waitlist_entries"
+    __table_args__ = (
+        # Matching a freed slot: waiting windows for the branch and service
+        # that start shortly before the slot. Partial where supported, so
+        # closed entries never enter the search.
+        Index(
+            "ix_waitlist_entries_waiting_window",
+            "branch_id", "service_id", "window_start", "window_end",
+            postgresql_where=text("status = 'WAITING'"),
+            sqlite_where=text("status = 'WAITING'")
+        ),
+        Index("ix_waitlist_entries_customer", "customer_id", "status"),
+    )
+
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+    service_id = Column(Integer, ForeignKey("services.id"), nullable=False)
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=False)
+    staff_id = Column(Integer, ForeignKey("staff.id"))  # Preferred staff member, any if empty
+    window_start = Column(DateTime, nullable=False)
+    window_end = Column(DateTime, nullable=False)
+    status = Column(Enum(WaitlistStatus), nullable=False, default=WaitlistStatus.WAITING)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"))  # Set once booked
+
+    # Relationships
+    customer = relationship("Customer")
+    service = relationship("Service")
+    branch = relationship("Branch")
+    appointment = relationship("Appointment")
@@ -0,0 +1,185 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.session import Base
+from app.models import Appointment, AppointmentStatus, Branch, Customer, Service, Staff
+from app.services.analytics import AnalyticsService, AppointmentColumns, booked_minutes_by_hour_of_week
+from app.services.availability import MINUTES_PER_DAY
+
+BRANCHES = 20
+SERVICES = 40
+CATEGORIES = ("Hair", "Nails", "Facial", "Massage", "Color")
+START_DATE = date(2024, 1, 1)
+
+def synthetic_columns(rows, days, seed=0):
+    """
+    Random appointments inside opening hours (9:00-19:00) over the range, with
+    roughly 10% cancelled
+    """
+    rng = np.random.default_rng(seed)
+    day = rng.integers(0, days, rows)
+    start = day * MINUTES_PER_DAY + 9 * 60 + rng.integers(0, 40, rows) * 15
+    end = start + rng.choice([30, 45, 60, 90], rows)
+    return AppointmentColumns(
+        branch_id=rng.integers(1, BRANCHES + 1, rows),
+        service_id=rng.integers(1, SERVICES + 1, rows),
+        start=start,
+        end=end,
+        cancelled=(rng.random(rows) < 0.1).astype(np.int64),
+        price_cents=rng.integers(2, 10, rows) * 1000
+    )
+
+def catalogue():
+    categories = np.zeros(SERVICES + 1, dtype=np.int64)
+    categories[1:] = np.arange(SERVICES) % len(CATEGORIES)
+    return categories
+
+def vectorized_reports(columns, days, categories):
+    active = columns.cancelled == 0
+    heatmap = booked_minutes_by_hour_of_week(columns.start[active], columns.end[active], days, START_DATE.weekday())
+    services = columns.service_id[active]
+    revenue = np.bincount(categories[services], weights=columns.price_cents[active], minlength=len(CATEGORIES)) / 100
+    totals = np.bincount(columns.branch_id, minlength=BRANCHES + 1)
+    cancelled = np.bincount(columns.branch_id, weights=columns.cancelled, minlength=BRANCHES + 1)
+    return heatmap, revenue, cancelled / np.maximum(totals, 1)
+
+def loop_reports(rows, categories):
+    """
+    The same reports computed one appointment at a time
+    """
+    first_weekday = START_DATE.weekday()
+    heatmap = [[0] * 24 for _ in range(7)]
+    revenue = defaultdict(float)
+    totals, cancelled = defaultdict(int), defaultdict(int)
+    for branch_id, service_id, start, end, is_cancelled, price_cents in rows:
+        totals[branch_id] += 1
+        if is_cancelled:
+            cancelled[branch_id] += 1
+            continue
+        revenue[categories[service_id]] += price_cents / 100
+        minute = start
+        while minute < end:
+            hour_end = min(end, (minute // 60 + 1) * 60)
+            day, hour = divmod(minute // 60, 24)
+            heatmap[(first_weekday + day) % 7][hour] += hour_end - minute
+            minute = hour_end
+    return heatmap, revenue, {branch: cancelled[branch] / totals[branch] for branch in totals}
+
+def measure(label, fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    print(f"{label:>32}: best {min(timings) * 1000:10.1f} ms")
+    return result, min(timings)
+
+def benchmark_aggregation(rows, baseline_rows, days):
+    columns = synthetic_columns(rows, days)
+    categories = catalogue()
+    print(f"Aggregating {rows:,} appointments over {days} days")
+    (heatmap, _, _), vectorized = measure("vectorized (NumPy)", lambda: vectorized_reports(columns, days, categories))
+
+    sample = AppointmentColumns(*(column[:baseline_rows] for column in columns))
+    sample_rows = list(zip(*(column.tolist() for column in sample)))
+    category_list = categories.tolist()
+    (loop_heatmap, _, _), looped = measure(
+        f"Python loop ({baseline_rows:,} rows)",
+        lambda: loop_reports(sample_rows, category_list),
+        repeat=1
+    )
+    sample_heatmap = vectorized_reports(sample, days, categories)[0]
+    if sample_heatmap.tolist() != loop_heatmap:
+        sys.exit("The vectorized and loop heatmaps differ")
+
+    projected = looped * rows / baseline_rows
+    print(f"{'Python loop (projected)':>32}: ~{projected * 1000:9.1f} ms")
+    print(f"speedup: ~{projected / vectorized:.0f}x")
+
+def benchmark_database(rows, days):
+    """
+    End to end through AnalyticsService on a file SQLite database, including
+    fetching the columns
+    """
+    path = os.path.join(tempfile.mkdtemp(), "analytics.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        branches = [
+            Branch(name=f"Branch {i}", address=f"{i} Main St", city="SF", state="CA", phone=f"555-{i:04d}")
+            for i in range(BRANCHES)
+        ]
+        services = [
+            Service(name=f"Service {i}", duration_minutes=60, price=20 + i % 8 * 10, category=CATEGORIES[i % len(CATEGORIES)])
+            for i in range(SERVICES)
+        ]
+        customer = Customer(name="Customer", email="customer@example.com")
+        db.add_all(branches + services + [customer])
+        db.commit()
+        staff = [
+            Staff(name=f"Stylist {i}", email=f"stylist{i}@salon.com", role="Stylist", branch_id=branches[i % BRANCHES].id)
+            for i in range(BRANCHES * 5)
+        ]
+        db.add_all(staff)
+        db.commit()
+
+        print(f"Loading {rows:,} appointments into {path}")
+        columns = synthetic_columns(rows, days)
+        origin = datetime.combine(START_DATE, datetime.min.time())
+        for offset in range(0, rows, 100000):
+            db.execute(Appointment.__table__.insert(), [
+                {
+                    "customer_id": customer.id,
+                    "staff_id": staff[branch_id - 1].id,
+                    "branch_id": branch_id,
+                    "service_id": service_id,
+                    "appointment_time": origin + timedelta(minutes=start),
+                    "end_time": origin + timedelta(minutes=end),
+                    "status": AppointmentStatus.CANCELLED if cancelled else AppointmentStatus.SCHEDULED,
+                    "price": price_cents / 100,
+                }
+                for branch_id, service_id, start, end, cancelled, price_cents in zip(
+                    *(column[offset:offset + 100000].tolist() for column in columns)
+                )
+            ])
+            db.commit()
+
+        service = AnalyticsService(db)
+        end_date = START_DATE + timedelta(days=days - 1)
+        measure("load columns", lambda: service.load_columns(START_DATE, end_date), repeat=1)
+        measure("utilization heatmap", lambda: service._get_utilization_heatmap(START_DATE, end_date), repeat=1)
+        measure("revenue by category", lambda: service._get_revenue_by_category(START_DATE, end_date), repeat=1)
+        measure("cancellation rates", lambda: service._get_cancellation_rates(START_DATE, end_date), repeat=1)
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized analytics reports")
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--baseline-rows", type=int, default=1000000,
+                        help="Rows for the pure Python loop, which is projected to --rows")
+    parser.add_argument("--days", type=int, default=366)
+    parser.add_argument("--database-rows", type=int, default=0,
+                        help="Also time the reports end to end on a SQLite database of this size")
+    args = parser.parse_args()
+
+    benchmark_aggregation(args.rows, min(args.baseline_rows, args.rows), args.days)
+    if args.database_rows:
+        benchmark_database(args.database_rows, args.days)
+
+if __name__ == "__main__":
+    main()
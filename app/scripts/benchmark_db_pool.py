@@ -0,0 +1,108 @@
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.db.pool import InstrumentedQueuePool, instrument_engine, pool_status
+
+def run_benchmark(url, workers, requests_per_worker, pool_size, max_overflow, pool_timeout, hold_ms):
+    """
+    Hammer a pool from `workers` threads, each checking out a connection,
+    running a trivial query and holding it for `hold_ms` to simulate work
+    """
+    engine = create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_pre_ping=True,
+        # Lets a local SQLite file stand in for PostgreSQL when trying the script
+        connect_args={"check_same_thread": False} if make_url(url).get_backend_name() == "sqlite" else {}
+    )
+    label = f"benchmark-{pool_size}-{max_overflow}"
+    instrument_engine(engine, label)
+
+    waits = []
+    timeouts = 0
+    peak_checked_out = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(workers)
+
+    def worker():
+        nonlocal timeouts, peak_checked_out
+        barrier.wait()
+        for _ in range(requests_per_worker):
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    waited = time.perf_counter() - started
+                    conn.execute(text("SELECT 1"))
+                    with lock:
+                        waits.append(waited)
+                        peak_checked_out = max(peak_checked_out, engine.pool.checkedout())
+                    time.sleep(hold_ms / 1000)
+            except PoolTimeoutError:
+                with lock:
+                    timeouts += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    status = pool_status(engine)
+    engine.dispose()
+    waits.sort()
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "completed": len(waits),
+        "timeouts": timeouts,
+        "throughput": len(waits) / elapsed if elapsed else 0.0,
+        "wait_p50_ms": statistics.median(waits) * 1000 if waits else None,
+        "wait_p95_ms": waits[int(len(waits) * 0.95) - 1] * 1000 if waits else None,
+        "wait_max_ms": waits[-1] * 1000 if waits else None,
+        "peak_checked_out": peak_checked_out,
+        "pool_timeouts_metric": status["timeouts"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure connection pool checkout waits under concurrent load")
+    parser.add_argument("--url", default=os.getenv("DATABASE_URL"), help="Defaults to DATABASE_URL")
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="Checkouts per worker")
+    parser.add_argument("--pool-sizes", default="5,10,20", help="Comma-separated pool sizes to compare")
+    parser.add_argument("--max-overflow", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--hold-ms", type=float, default=10.0, help="Time each checkout holds its connection")
+    args = parser.parse_args()
+
+    if not args.url:
+        parser.error("--url or DATABASE_URL is required")
+
+    print(f"{'pool':>5} {'overflow':>8} {'done':>6} {'timeouts':>8} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'peak':>5}")
+    for pool_size in (int(size) for size in args.pool_sizes.split(",")):
+        result = run_benchmark(
+            args.url, args.workers, args.requests, pool_size,
+            args.max_overflow, args.timeout, args.hold_ms
+        )
+        print(f"{result['pool_size']:>5} {result['max_overflow']:>8} {result['completed']:>6} "
+              f"{result['timeouts']:>8} {result['throughput']:>8.1f} {result['wait_p50_ms'] or 0:>8.2f} "
+              f"{result['wait_p95_ms'] or 0:>8.2f} {result['wait_max_ms'] or 0:>8.2f} "
+              f"{result['peak_checked_out']:>5}")
+
+if __name__ == "__main__":
+    main()
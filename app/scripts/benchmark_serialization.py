@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.api.api_v1.endpoints.appointments import AppointmentResponse
+from app.db.session import Base
+from app.models import Appointment, AppointmentStatus, Branch, Customer, Service, Staff
+from app.services.appointment_service import APPOINTMENT_COLUMNS, appointment_row_to_dict, appointment_to_dict
+
+def build_database(rows):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    branch = Branch(name="Downtown", address="1 Main St", city="SF", state="CA", phone="555-0001")
+    service = Service(name="Haircut", duration_minutes=60, price=50.0, category="Hair")
+    customer = Customer(name="Customer", email="customer@example.com")
+    db.add_all([branch, service, customer])
+    db.commit()
+    staff = Staff(name="Stylist", email="stylist@salon.com", role="Stylist", branch_id=branch.id)
+    db.add(staff)
+    db.commit()
+
+    start = datetime(2024, 1, 1, 9)
+    db.execute(Appointment.__table__.insert(), [
+        {
+            "customer_id": customer.id,
+            "staff_id": staff.id,
+            "branch_id": branch.id,
+            "service_id": service.id,
+            "appointment_time": start + timedelta(hours=i),
+            "end_time": start + timedelta(hours=i, minutes=45),
+            "status": AppointmentStatus.SCHEDULED,
+            "notes": "Benchmark row" if i % 3 else None,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    return engine, db
+
+def current_path(db):
+    """
+    ORM objects -> appointment_to_dict -> response_model validation -> stdlib JSON
+    """
+    appointments = db.query(Appointment).order_by(Appointment.appointment_time, Appointment.id).all()
+    items = [appointment_to_dict(appointment) for appointment in appointments]
+    validated = [AppointmentResponse(**item) for item in items]
+    body = JSONResponse(jsonable_encoder(validated)).body
+    db.expunge_all()
+    return body
+
+def lean_path(db):
+    """
+    Core select of tuples -> dicts -> orjson, no response_model validation
+    """
+    rows = db.execute(
+        select(*(getattr(Appointment, column) for column in APPOINTMENT_COLUMNS))
+        .order_by(Appointment.appointment_time, Appointment.id)
+    ).all()
+    return ORJSONResponse([appointment_row_to_dict(row) for row in rows]).body
+
+def measure(fn, db, repeat):
+    fn(db)  # Warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(db)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the ORM/pydantic and lean list serialization paths")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine, db = build_database(args.rows)
+    try:
+        if json.loads(current_path(db)) != json.loads(lean_path(db)):
+            sys.exit("The two paths produced different responses")
+
+        print(f"{args.rows} rows, {args.repeat} runs each")
+        results = {}
+        for name, fn in (("current", current_path), ("lean", lean_path)):
+            timings = measure(fn, db, args.repeat)
+            results[name] = statistics.median(timings)
+            print(f"{name:>8}: median {results[name] * 1000:8.1f} ms, best {min(timings) * 1000:8.1f} ms")
+        print(f"speedup: {results['current'] / results['lean']:.1f}x")
+    finally:
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import time
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import torch
+from whisper.model import ModelDimensions, Whisper
+from app.services.stt_batching import decode_windows
+from app.services.whisper_models import load_whisper_model
+
+# Dimensions of the "tiny" checkpoint, for --random-weights
+TINY_DIMS = ModelDimensions(
+    n_mels=80, n_audio_ctx=1500, n_audio_state=384, n_audio_head=6, n_audio_layer=4,
+    n_vocab=51865, n_text_ctx=448, n_text_state=384, n_text_head=6, n_text_layer=4
+)
+
+def synthetic_utterances(count, seconds, seed=0):
+    """
+    Noise bursts of the given length; decoding cost depends on the window and
+    token count, not on what is said
+    """
+    rng = np.random.default_rng(seed)
+    return [(rng.standard_normal(int(16000 * seconds)) * 0.1).astype(np.float32) for _ in range(count)]
+
+def throughput(model, utterances, batch_size, sample_len):
+    started = time.perf_counter()
+    for offset in range(0, len(utterances), batch_size):
+        decode_windows(model, utterances[offset:offset + batch_size], language="en", sample_len=sample_len)
+    return len(utterances) / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper utterances/sec by batch size on CPU")
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--random-weights", action="store_true",
+                        help="Use an untrained model with tiny's dimensions instead of downloading weights")
+    parser.add_argument("--utterances", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16")
+    parser.add_argument("--sample-len", type=int, default=32,
+                        help="Tokens decoded per utterance, fixed so every batch size does the same work")
+    args = parser.parse_args()
+
+    if args.random_weights:
+        torch.manual_seed(0)
+        model = Whisper(TINY_DIMS).eval()
+    else:
+        model = load_whisper_model(args.model)
+    utterances = synthetic_utterances(args.utterances, args.seconds)
+    throughput(model, utterances[:2], 2, args.sample_len)  # Warm up
+
+    print(f"{args.utterances} utterances of {args.seconds:g}s, {torch.get_num_threads()} torch threads")
+    baseline = None
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        rate = throughput(model, utterances, batch_size, args.sample_len)
+        baseline = baseline or rate
+        print(f"batch {batch_size:>3}: {rate:7.2f} utterances/s  ({rate / baseline:.2f}x)")
+
+if __name__ == "__main__":
+    main()
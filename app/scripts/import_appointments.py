@@ -0,0 +1,55 @@
+import argparse
+import json
+import os
+import sys
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.db.session import SessionLocal
+from app.services.import_service import (
+    AppointmentImportService,
+    DEFAULT_BATCH_SIZE,
+    IMPORT_FORMATS,
+    detect_format,
+)
+
+def import_appointments(path, fmt=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    db = SessionLocal()
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            report = AppointmentImportService(db, batch_size=batch_size).import_stream(
+                stream,
+                fmt or detect_format(path),
+                dry_run=dry_run
+            )
+        return report
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import appointments from CSV or NDJSON")
+    parser.add_argument("path", help="File to import")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Validate only, do not insert")
+    parser.add_argument("--report", help="Write the full JSON report to this file")
+    args = parser.parse_args()
+
+    report = import_appointments(args.path, args.format, args.batch_size, args.dry_run)
+
+    print(f"Rows: {report['total_rows']}, valid: {report['valid_rows']}, "
+          f"imported: {report['imported']}, failed: {report['failed']}")
+    for error in report["errors"][:20]:
+        print(f"- row {error['row']}: {error['error']}")
+    if report["failed"] > 20:
+        print(f"... and {report['failed'] - 20} more")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    sys.exit(1 if report["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import argparse
+import os
+import sys
+from datetime import date
+
+# Add the project root directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.db.session import SessionLocal
+from app.services.occupancy_rollup import rebuild_daily_occupancy
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the daily occupancy rollup from appointments")
+    parser.add_argument("--start-date", type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_occupancy(db, args.start_date, args.end_date)
+    finally:
+        db.close()
+    print(f"Wrote {rows} rollup rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, TypeVar, Union
+import numpy as np
+from sqlalchemy import DateTime, Integer, case, cast, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.exceptions import AppointmentError
+from app.models import Appointment, AppointmentStatus, Branch, Service, Staff
+from app.services.availability import MINUTES_PER_DAY
+from app.services.occupancy_rollup import minutes_between
+from app.services.opening_hours import DAY_NAMES, WeeklyHours, opening_hours_cache
+
+MAX_ANALYTICS_RANGE_DAYS = 366
+# Rows fetched per round trip while filling the column arrays
+LOAD_BATCH_SIZE = 50000
+
+HOURS_PER_DAY = 24
+MINUTES_PER_HOUR = 60
+
+T = TypeVar("T")
+
+
+class AppointmentColumns(NamedTuple):
+    """
+    Appointments in a date range as parallel int64 arrays. Times are whole
+    minutes from the start of the range; prices are the booking's price
+    snapshot in cents.
+    """
+    branch_id: np.ndarray
+    service_id: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    cancelled: np.ndarray
+    price_cents: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "AppointmentColumns":
+        return cls(*(np.empty(0, dtype=np.int64) for _ in cls._fields))
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray) -> "AppointmentColumns":
+        return cls(*(matrix[:, column] for column in range(len(cls._fields))))
+
+
+def booked_minutes_by_hour_of_week(
+    start: np.ndarray,
+    end: np.ndarray,
+    days: int,
+    first_weekday: int
+) -> np.ndarray:
+    """
+    Booked staff minutes per (weekday, hour) over a range of whole days.
+    Appointments spanning several hours are split across them; anything past
+    the end of the range is dropped.
+    """
+    minutes = days * MINUTES_PER_DAY
+    start = np.clip(start, 0, minutes)
+    end = np.clip(end, 0, minutes)
+    # Number of appointments in progress at each minute of the range
+    delta = np.bincount(start, minlength=minutes + 1) - np.bincount(end, minlength=minutes + 1)
+    in_progress = np.cumsum(delta[:minutes])
+    per_day_hour = in_progress.reshape(days, HOURS_PER_DAY, MINUTES_PER_HOUR).sum(axis=2)
+
+    heatmap = np.zeros((7, HOURS_PER_DAY), dtype=np.int64)
+    np.add.at(heatmap, (first_weekday + np.arange(days)) % 7, per_day_hour)
+    return heatmap
+
+
+def open_minutes_by_hour_of_week(hours: WeeklyHours) -> np.ndarray:
+    """
+    Minutes a branch is open in each (weekday, hour) of a week
+    """
+    week = np.zeros((7, MINUTES_PER_DAY), dtype=np.int64)
+    for weekday in range(7):
+        for open_minute, close_minute in hours.for_weekday(weekday):
+            week[weekday, open_minute:close_minute] = 1
+    return week.reshape(7, HOURS_PER_DAY, MINUTES_PER_HOUR).sum(axis=2)
+
+
+def weekday_counts(days: int, first_weekday: int) -> np.ndarray:
+    """
+    How many times each weekday (Monday first) occurs in a range of days
+    """
+    return np.bincount((first_weekday + np.arange(days)) % 7, minlength=7)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> List[Optional[float]]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.round(numerator / denominator, 4)
+    return [None if denominator[i] == 0 else float(ratios[i]) for i in range(len(ratios))]
+
+
+class AnalyticsService:
+    """
+    Ad-hoc reports over a date range. The columns a report needs are pulled in
+    bulk into NumPy arrays and aggregated with vectorized operations, so no ORM
+    objects are built and the Python work does not grow per appointment.
+    """
+
+    def __init__(self, db: Union[Session, AsyncSession]):
+        self.db = db
+
+    async def _run(self, method: Callable[..., T], **kwargs) -> T:
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(lambda session: method(AnalyticsService(session), **kwargs))
+        return method(self, **kwargs)
+
+    async def get_utilization_heatmap(
+        self,
+        start_date: date,
+        end_date: date,
+        branch_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Booked minutes against staff capacity (active staff times opening
+        hours) for each hour of the week
+        """
+        return await self._run(
+            AnalyticsService._get_utilization_heatmap,
+            start_date=start_date,
+            end_date=end_date,
+            branch_id=branch_id
+        )
+
+    async def get_revenue_by_category(
+        self,
+        start_date: date,
+        end_date: date,
+        branch_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Appointments and revenue per service category, excluding cancellations
+        """
+        return await self._run(
+            AnalyticsService._get_revenue_by_category,
+            start_date=start_date,
+            end_date=end_date,
+            branch_id=branch_id
+        )
+
+    async def get_cancellation_rates(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        """
+        Share of appointments cancelled at each branch
+        """
+        return await self._run(
+            AnalyticsService._get_cancellation_rates,
+            start_date=start_date,
+            end_date=end_date
+        )
+
+    def load_columns(
+        self,
+        start_date: date,
+        end_date: date,
+        branch_id: Optional[int] = None
+    ) -> AppointmentColumns:
+        """
+        Appointments starting between start_date and end_date inclusive. Minute
+        offsets and the cancelled flag are computed by the database, so rows
+        arrive as plain integers and are copied batch by batch into one matrix
+        sized from a COUNT(*) up front, never holding the rows twice.
+        """
+        range_start = datetime.combine(start_date, datetime.min.time())
+        origin = literal(range_start, DateTime)
+        filters = [
+            Appointment.appointment_time >= range_start,
+            Appointment.appointment_time < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        ]
+        if branch_id:
+            filters.append(Appointment.branch_id == branch_id)
+        query = select(
+            Appointment.branch_id,
+            Appointment.service_id,
+            minutes_between(origin, Appointment.appointment_time),
+            minutes_between(origin, Appointment.end_time),
+            case((Appointment.status == AppointmentStatus.CANCELLED, 1), else_=0),
+            cast(func.round(func.coalesce(Appointment.price, 0) * 100), Integer)
+        ).where(*filters).execution_options(stream_results=True)
+
+        # Executed on the connection rather than the session, whose ORM result
+        # wrapping costs more than the fetch itself at this size. Flattening
+        # rows through fromiter avoids NumPy probing each Row as a sequence.
+        connection = self.db.connection()
+        width = len(AppointmentColumns._fields)
+        matrix = np.empty(
+            (connection.execute(select(func.count()).select_from(Appointment).where(*filters)).scalar(), width),
+            dtype=np.int64
+        )
+        filled = 0
+        for rows in connection.execute(query).partitions(LOAD_BATCH_SIZE):
+            end = filled + len(rows)
+            if end > len(matrix):
+                # Booked since the count
+                grown = np.empty((max(end, 2 * len(matrix)), width), dtype=np.int64)
+                grown[:filled] = matrix[:filled]
+                matrix = grown
+            matrix[filled:end] = np.fromiter(
+                (value for row in rows for value in row),
+                dtype=np.int64,
+                count=len(rows) * width
+            ).reshape(-1, width)
+            filled = end
+        return AppointmentColumns.from_matrix(matrix[:filled])
+
+    def _check_range(self, start_date: date, end_date: date) -> int:
+        if end_date < start_date:
+            raise AppointmentError("end_date must not be before start_date")
+        days = (end_date - start_date).days + 1
+        if days > MAX_ANALYTICS_RANGE_DAYS:
+            raise AppointmentError(f"Date range cannot exceed {MAX_ANALYTICS_RANGE_DAYS} days")
+        return days
+
+    def _get_utilization_heatmap(
+        self,
+        start_date: date,
+        end_date: date,
+        branch_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        days = self._check_range(start_date, end_date)
+        first_weekday = start_date.weekday()
+        columns = self.load_columns(start_date, end_date, branch_id)
+        active = columns.cancelled == 0
+        booked = booked_minutes_by_hour_of_week(columns.start[active], columns.end[active], days, first_weekday)
+
+        staff_query = self.db.query(Staff.branch_id, func.count(Staff.id)).filter(
+            Staff.is_active.isnot(False)
+        ).group_by(Staff.branch_id)
+        if branch_id:
+            staff_query = staff_query.filter(Staff.branch_id == branch_id)
+        staff_counts = dict(staff_query.all())
+
+        hours = opening_hours_cache.get_many(self.db, set(staff_counts))
+        capacity = np.zeros((7, HOURS_PER_DAY), dtype=np.int64)
+        for branch, count in staff_counts.items():
+            capacity += count * open_minutes_by_hour_of_week(hours[branch])
+        capacity *= weekday_counts(days, first_weekday)[:, np.newaxis]
+
+        return {
+            "days": DAY_NAMES,
+            "hours": list(range(HOURS_PER_DAY)),
+            "booked_minutes": booked.tolist(),
+            "capacity_minutes": capacity.tolist(),
+            "utilization": [_ratio(booked[weekday], capacity[weekday]) for weekday in range(7)]
+        }
+
+    def _get_revenue_by_category(
+        self,
+        start_date: date,
+        end_date: date,
+        branch_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        self._check_range(start_date, end_date)
+        columns = self.load_columns(start_date, end_date, branch_id)
+        active = columns.cancelled == 0
+        service_ids = columns.service_id[active]
+
+        services = self.db.query(Service.id, Service.category).all()
+        if not services or not service_ids.size:
+            return []
+        categories = sorted({category for _, category in services}, key=lambda category: (category is None, category))
+        category_index = {category: index for index, category in enumerate(categories)}
+
+        # Category of each service id. Revenue comes from the appointments'
+        # price snapshots, so later price changes leave past revenue alone.
+        size = max(max(service_id for service_id, _ in services), int(service_ids.max())) + 1
+        category_of = np.full(size, len(categories), dtype=np.int64)
+        for service_id, category in services:
+            category_of[service_id] = category_index[category]
+
+        per_category = category_of[service_ids]
+        counts = np.bincount(per_category, minlength=len(categories) + 1)
+        revenue = np.bincount(per_category, weights=columns.price_cents[active], minlength=len(categories) + 1) / 100
+
+        report = [
+            {"category": category, "appointment_count": int(counts[index]), "revenue": round(float(revenue[index]), 2)}
+            for index, category in enumerate(categories)
+            if counts[index]
+        ]
+        return sorted(report, key=lambda row: -row["revenue"])
+
+    def _get_cancellation_rates(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        self._check_range(start_date, end_date)
+        columns = self.load_columns(start_date, end_date)
+        branches = dict(self.db.query(Branch.id, Branch.name).all())
+        if not columns.branch_id.size:
+            return []
+
+        size = int(columns.branch_id.max()) + 1
+        totals = np.bincount(columns.branch_id, minlength=size)
+        cancelled = np.bincount(columns.branch_id, weights=columns.cancelled, minlength=size).astype(np.int64)
+        rates = _ratio(cancelled, totals)
+
+        return [
+            {
+                "branch_id": branch,
+                "name": branches.get(branch),
+                "appointment_count": int(totals[branch]),
+                "cancelled_count": int(cancelled[branch]),
+                "cancellation_rate": rates[branch]
+            }
+            for branch in np.flatnonzero(totals).tolist()
+        ]
@@ -1,8 +1,40 @@
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+import base64
+import binascii
+import json
+import numpy as np
+from typing import List, Optional, Dict, Any, Tuple, Union, Callable, TypeVar
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models import Appointment, Staff, Service, Branch, AppointmentStatus
-from app.core.exceptions import AppointmentError
+from app.models import Appointment, Service, Branch, AppointmentStatus
+from app.core.exceptions import AppointmentError, ValidationError
+from app.db.locks import async_staff_booking_lock, staff_booking_lock
+from app.db.replicas import is_read_only
+from app.services.availability import OccupancyGrid, MINUTES_PER_DAY
+from app.services.availability_cache import AvailabilityKey, availability_cache
+from app.services.opening_hours import WeeklyHours, opening_hours_cache
+from app.services.staff_skills import staff_skill_cache
+# Registers the events that keep the daily occupancy rollup in step with bookings
+import app.services.occupancy_rollup  # noqa: F401
+
+# Columns of the lean list and export queries, in response order
+APPOINTMENT_COLUMNS = (
+    "id", "customer_id", "staff_id", "service_id", "branch_id",
+    "appointment_time", "end_time", "status", "notes"
+)
+_STATUS_INDEX = APPOINTMENT_COLUMNS.index("status")
+
+def appointment_row_to_dict(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    """
+    Same shape as appointment_to_dict, from a plain row of APPOINTMENT_COLUMNS
+    without building an ORM object
+    """
+    values = dict(zip(APPOINTMENT_COLUMNS, row))
+    status = row[_STATUS_INDEX]
+    values["status"] = status.value if status else None
+    return values
 
 def appointment_to_dict(appointment: Appointment) -> Dict[str, Any]:
     return {
@@ -17,10 +49,68 @@ def appointment_to_dict(appointment: Appointment) -> Dict[str, Any]:
         "notes": appointment.notes
     }
 
+MAX_RANGE_DAYS = 31
+
+# Earliest-slot search scans at most this far ahead, in windows that start at
+# one day and double up to NEXT_AVAILABLE_MAX_WINDOW_DAYS
+NEXT_AVAILABLE_HORIZON_DAYS = 60
+NEXT_AVAILABLE_MAX_WINDOW_DAYS = 8
+MAX_NEXT_AVAILABLE = 20
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(appointment_time: datetime, appointment_id: int) -> str:
+    """
+    Opaque continuation token for the (appointment_time, id) keyset
+    """
+    payload = json.dumps([appointment_time.isoformat(), appointment_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        appointment_time, appointment_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(appointment_time), int(appointment_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValidationError("Invalid cursor")
+
+T = TypeVar("T")
+
+def appointment_filters(
+    customer_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    status: Optional[AppointmentStatus] = None
+) -> List[Any]:
+    """
+    WHERE clauses shared by the appointment listing and export queries
+    """
+    filters = []
+    if customer_id:
+        filters.append(Appointment.customer_id == customer_id)
+    if start_date:
+        filters.append(Appointment.appointment_time >= start_date)
+    if end_date:
+        filters.append(Appointment.appointment_time <= end_date)
+    if status:
+        filters.append(Appointment.status == status)
+    return filters
+
 class AppointmentService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Union[Session, AsyncSession]):
         self.db = db
 
+    async def _run(self, method: Callable[..., T], **kwargs) -> T:
+        """
+        Run one of the synchronous query methods below. With an AsyncSession it
+        runs through run_sync, so queries go through the async driver and the
+        event loop is never blocked on database I/O.
+        """
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(lambda session: method(AppointmentService(session), **kwargs))
+        return method(self, **kwargs)
+
     async def check_availability(
         self,
         branch_id: int,
@@ -29,55 +119,376 @@ class AppointmentService:
         staff_id: Optional[int] = None
     ) -> List[datetime]:
         """
-        Check available time slots for a given service at a branch
+        Check available time slots for a given service at a branch. A slot is
+        available when at least one eligible staff member is free for it.
+        """
+        return await self._run(
+            AppointmentService._check_availability,
+            branch_id=branch_id,
+            service_id=service_id,
+            date=date,
+            staff_id=staff_id
+        )
+
+    async def check_availability_range(
+        self,
+        service_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        branch_ids: Optional[List[int]] = None,
+        staff_ids: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Check available time slots for a service across a date range and a set
+        of branches, returned as a compact slot matrix
+        """
+        return await self._run(
+            AppointmentService._check_availability_range,
+            service_id=service_id,
+            start_date=start_date,
+            end_date=end_date,
+            branch_ids=branch_ids,
+            staff_ids=staff_ids
+        )
+
+    async def find_next_available(
+        self,
+        service_id: int,
+        after: Optional[datetime] = None,
+        branch_ids: Optional[List[int]] = None,
+        staff_ids: Optional[List[int]] = None,
+        limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Earliest bookable slots for a service from `after` (default now) onward,
+        across branches (default all) and their eligible staff. Returns up to
+        `limit` options ordered by time, one per time and branch.
+        """
+        return await self._run(
+            AppointmentService._find_next_available,
+            service_id=service_id,
+            after=after,
+            branch_ids=branch_ids,
+            staff_ids=staff_ids,
+            limit=limit
+        )
+
+    async def create_appointment(
+        self,
+        customer_id: int,
+        staff_id: int,
+        service_id: int,
+        branch_id: int,
+        appointment_time: datetime,
+        notes: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a new appointment
+        """
+        async with async_staff_booking_lock(self.db, staff_id):
+            return await self._run(
+                AppointmentService._create_appointment,
+                customer_id=customer_id,
+                staff_id=staff_id,
+                service_id=service_id,
+                branch_id=branch_id,
+                appointment_time=appointment_time,
+                notes=notes
+            )
+
+    async def cancel_appointment(self, appointment_id: int) -> Dict[str, Any]:
+        """
+        Cancel an appointment
+        """
+        return await self._run(AppointmentService._cancel_appointment, appointment_id=appointment_id)
+
+    async def get_appointment(self, appointment_id: int) -> Dict[str, Any]:
+        """
+        Get appointment details
+        """
+        return await self._run(AppointmentService._get_appointment, appointment_id=appointment_id)
+
+    async def get_appointment_version(self, appointment_id: int) -> Optional[datetime]:
         """
+        Last modification time of an appointment, or None if it does not exist.
+        Reads a single column, so it is cheap enough to check before a full read.
+        """
+        return await self._run(AppointmentService._get_appointment_version, appointment_id=appointment_id)
+
+    async def get_customer_appointments(
+        self,
+        customer_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get one page of appointments ordered by time, optionally filtered by
+        customer and date range. Pass the returned next_cursor to get the next
+        page; it is None on the last page.
+        """
+        return await self._run(
+            AppointmentService._get_customer_appointments,
+            customer_id=customer_id,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            cursor=cursor
+        )
+
+    # Synchronous implementations, always called through _run
+
+    def _eligible_staff(
+        self,
+        service: Service,
+        branch_ids: List[int],
+        staff_ids: Optional[List[int]] = None
+    ) -> Dict[int, List[int]]:
+        """
+        Active staff per branch who can perform the service, from the in-memory
+        skill index. Staff without any listed skills are treated as generalists.
+        """
+        return staff_skill_cache.eligible_staff(self.db, branch_ids, service.category, staff_ids)
+
+    def _staff_occupancy(
+        self,
+        staff_ids: List[int],
+        start: datetime,
+        days: int
+    ) -> OccupancyGrid:
+        """
+        Occupancy grid with one row per staff member, covering each member's full
+        calendar (every service, every branch) in a single query
+        """
+        end = start + timedelta(days=days)
+        staff_rows = {staff_id: row for row, staff_id in enumerate(staff_ids)}
+
+        appointments = self.db.query(
+            Appointment.staff_id,
+            Appointment.appointment_time,
+            Appointment.end_time
+        ).filter(
+            Appointment.staff_id.in_(staff_ids),
+            Appointment.appointment_time < end,
+            Appointment.end_time > start,
+            Appointment.status != AppointmentStatus.CANCELLED
+        )
+
+        return OccupancyGrid.from_intervals(
+            start,
+            (
+                (staff_rows[staff_id], appointment_time, end_time)
+                for staff_id, appointment_time, end_time in appointments
+            ),
+            days=days,
+            rows=max(len(staff_ids), 1)
+        )
+
+    def _free_starts(
+        self,
+        eligible: Dict[int, List[int]],
+        hours: Dict[int, WeeklyHours],
+        start: datetime,
+        days: int,
+        duration_minutes: int
+    ) -> Dict[Tuple[int, int], np.ndarray]:
+        """
+        Free slot starts (minute of day) per (staff_id, day index), served from
+        the availability cache where possible. All misses are computed from a
+        single occupancy grid.
+        """
+        keys = {
+            (staff_id, day): AvailabilityKey(
+                branch_id, staff_id, duration_minutes, (start + timedelta(days=day)).date()
+            )
+            for branch_id, staff_ids in eligible.items()
+            for staff_id in staff_ids
+            for day in range(days)
+        }
+        generation = availability_cache.generation
+        cached = availability_cache.get_many(list(keys.values()))
+        free = {
+            slot: np.array(cached[key], dtype=np.int64)
+            for slot, key in keys.items()
+            if key in cached
+        }
+
+        missing = [slot for slot in keys if slot not in free]
+        if missing:
+            missing_staff = sorted({staff_id for staff_id, _ in missing})
+            rows = {staff_id: row for row, staff_id in enumerate(missing_staff)}
+            occupancy = self._staff_occupancy(missing_staff, start, days)
+            computed = {}
+            for staff_id, day in missing:
+                key = keys[(staff_id, day)]
+                offsets = hours[key.branch_id].slot_offsets(key.day.weekday(), duration_minutes)
+                mask = occupancy.free_mask(duration_minutes, offsets + day * MINUTES_PER_DAY)[rows[staff_id]]
+                free[(staff_id, day)] = offsets[mask]
+                computed[key] = tuple(offsets[mask].tolist())
+            # Only primary reads are cached; a lagging replica could otherwise
+            # re-cache a day whose invalidation has already run. Neither are
+            # slots that saw this session's uncommitted appointments.
+            if not is_read_only(self.db) and not self.db.info.get("changed_appointments"):
+                availability_cache.set_many(computed, generation)
+
+        return free
+
+    def _check_availability(
+        self,
+        branch_id: int,
+        service_id: int,
+        date: datetime,
+        staff_id: Optional[int] = None
+    ) -> List[datetime]:
         service = self.db.query(Service).filter(Service.id == service_id).first()
         if not service:
             raise AppointmentError("Service not found")
 
-        # Get all appointments for the day
         start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
+        staff_ids = self._eligible_staff(
+            service,
+            [branch_id],
+            [staff_id] if staff_id else None
+        )[branch_id]
+        if not staff_ids:
+            return []
 
-        query = self.db.query(Appointment).filter(
-            Appointment.branch_id == branch_id,
-            Appointment.service_id == service_id,
-            Appointment.appointment_time >= start_of_day,
-            Appointment.appointment_time < end_of_day,
-            Appointment.status != AppointmentStatus.CANCELLED
-        )
+        # Only slots that fit inside the branch's opening hours are candidates
+        hours = {branch_id: opening_hours_cache.get(self.db, branch_id)}
+        if hours[branch_id].slot_offsets(start_of_day.weekday(), service.duration_minutes).size == 0:
+            return []
 
-        if staff_id:
-            query = query.filter(Appointment.staff_id == staff_id)
+        free = self._free_starts({branch_id: staff_ids}, hours, start_of_day, 1, service.duration_minutes)
+        starts = np.unique(np.concatenate(list(free.values())))
+        return [start_of_day + timedelta(minutes=int(minute)) for minute in starts]
 
-        existing_appointments = query.all()
+    def _check_availability_range(
+        self,
+        service_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        branch_ids: Optional[List[int]] = None,
+        staff_ids: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        service = self.db.query(Service).filter(Service.id == service_id).first()
+        if not service:
+            raise AppointmentError("Service not found")
 
-        # Generate available time slots
-        available_slots = []
-        current_time = start_of_day + timedelta(hours=9)  # Assuming business hours start at 9 AM
-        end_time = start_of_day + timedelta(hours=17)  # Assuming business hours end at 5 PM
+        start_of_range = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        days = (end_date.date() - start_of_range.date()).days + 1
+        if days < 1:
+            raise AppointmentError("end_date must not be before start_date")
+        if days > MAX_RANGE_DAYS:
+            raise AppointmentError(f"Date range cannot exceed {MAX_RANGE_DAYS} days")
 
-        while current_time < end_time:
-            slot_end = current_time + timedelta(minutes=service.duration_minutes)
-            if slot_end > end_time:
-                break
+        if branch_ids is None:
+            branch_ids = [branch_id for (branch_id,) in self.db.query(Branch.id).order_by(Branch.id)]
 
-            # Check if slot is available
-            is_available = True
-            for appointment in existing_appointments:
-                if (current_time < appointment.end_time and 
-                    slot_end > appointment.appointment_time):
-                    is_available = False
-                    break
+        eligible = self._eligible_staff(service, branch_ids, staff_ids)
+        hours = opening_hours_cache.get_many(self.db, branch_ids)
 
-            if is_available:
-                available_slots.append(current_time)
+        # Shared slot axis: every candidate start any branch offers on any day
+        weekdays = [(start_of_range + timedelta(days=day)).weekday() for day in range(days)]
+        offsets = np.unique(np.concatenate([np.empty(0, dtype=np.int64)] + [
+            hours[branch_id].slot_offsets(weekday, service.duration_minutes)
+            for branch_id in branch_ids
+            for weekday in set(weekdays)
+        ]))
 
-            current_time += timedelta(minutes=30)  # 30-minute intervals
+        free = self._free_starts(eligible, hours, start_of_range, days, service.duration_minutes)
 
-        return available_slots
+        def day_bits(branch_id: int, day: int) -> str:
+            # Any eligible staff member free makes the branch slot available
+            starts = [free[(staff_id, day)] for staff_id in eligible[branch_id]]
+            available = np.isin(offsets, np.concatenate(starts)) if starts else np.zeros(offsets.size, dtype=bool)
+            return "".join("1" if slot else "0" for slot in available.tolist())
 
-    async def create_appointment(
+        return {
+            "service_id": service_id,
+            "duration_minutes": service.duration_minutes,
+            "dates": [(start_of_range + timedelta(days=day)).date().isoformat() for day in range(days)],
+            "slot_times": [f"{minute // 60:02d}:{minute % 60:02d}" for minute in offsets.tolist()],
+            "branches": [
+                {
+                    "branch_id": branch_id,
+                    "days": [day_bits(branch_id, day) for day in range(days)]
+                }
+                for branch_id in branch_ids
+            ]
+        }
+
+    def _find_next_available(
+        self,
+        service_id: int,
+        after: Optional[datetime] = None,
+        branch_ids: Optional[List[int]] = None,
+        staff_ids: Optional[List[int]] = None,
+        limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        if not 1 <= limit <= MAX_NEXT_AVAILABLE:
+            raise ValidationError(f"limit must be between 1 and {MAX_NEXT_AVAILABLE}")
+
+        service = self.db.query(Service).filter(Service.id == service_id).first()
+        if not service:
+            raise AppointmentError("Service not found")
+        duration = service.duration_minutes
+
+        if branch_ids is None:
+            branch_ids = [branch_id for (branch_id,) in self.db.query(Branch.id).order_by(Branch.id)]
+        eligible = {
+            branch_id: staff
+            for branch_id, staff in self._eligible_staff(service, branch_ids, staff_ids).items()
+            if staff
+        }
+        if not eligible:
+            return []
+        hours = opening_hours_cache.get_many(self.db, list(eligible))
+
+        after = after or datetime.now()
+        start_of_day = after.replace(hour=0, minute=0, second=0, microsecond=0)
+        # Slots already started today are not offered
+        first_minute = int(np.ceil((after - start_of_day).total_seconds() / 60))
+
+        options: List[Dict[str, Any]] = []
+        day, window = 0, 1
+        while day < NEXT_AVAILABLE_HORIZON_DAYS:
+            days = min(window, NEXT_AVAILABLE_HORIZON_DAYS - day)
+            window_start = start_of_day + timedelta(days=day)
+            # Free starts per staff-day come from the availability cache, with
+            # one occupancy query for whatever the window is missing
+            free = self._free_starts(eligible, hours, window_start, days, duration)
+
+            for offset in range(days):
+                day_start = window_start + timedelta(days=offset)
+                # First free staff member (lowest id) for each time and branch
+                first_free: Dict[Tuple[int, int], int] = {}
+                for branch_id, staff in eligible.items():
+                    for staff_id in staff:
+                        starts = free[(staff_id, offset)]
+                        if day + offset == 0:
+                            starts = starts[starts >= first_minute]
+                        for minute in starts.tolist():
+                            first_free.setdefault((minute, branch_id), staff_id)
+
+                for (minute, branch_id), staff_id in sorted(first_free.items()):
+                    appointment_time = day_start + timedelta(minutes=minute)
+                    options.append({
+                        "appointment_time": appointment_time,
+                        "end_time": appointment_time + timedelta(minutes=duration),
+                        "branch_id": branch_id,
+                        "staff_id": staff_id
+                    })
+                # Days are visited in order, so the first full day settles it
+                if len(options) >= limit:
+                    return options[:limit]
+
+            day += days
+            window = min(window * 2, NEXT_AVAILABLE_MAX_WINDOW_DAYS)
+
+        return options
+
+    def _create_appointment(
         self,
         customer_id: int,
         staff_id: int,
@@ -86,44 +497,61 @@ class AppointmentService:
         appointment_time: datetime,
         notes: Optional[str] = None
     ) -> Dict[str, Any]:
-        """
-        Create a new appointment
-        """
-        # Check if the slot is available
-        available_slots = await self.check_availability(
-            branch_id=branch_id,
-            service_id=service_id,
-            date=appointment_time,
-            staff_id=staff_id
-        )
+        service = self.db.query(Service).filter(Service.id == service_id).first()
+        if not service:
+            raise AppointmentError("Service not found")
+        end_time = appointment_time + timedelta(minutes=service.duration_minutes)
+
+        if not self._eligible_staff(service, [branch_id], [staff_id])[branch_id]:
+            raise AppointmentError("Staff member cannot provide this service at this branch")
 
-        if appointment_time not in available_slots:
+        # The slot must be one the availability grid would offer
+        hours = opening_hours_cache.get(self.db, branch_id)
+        start_of_day = appointment_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        minute, remainder = divmod((appointment_time - start_of_day).total_seconds(), 60)
+        offsets = hours.slot_offsets(appointment_time.weekday(), service.duration_minutes)
+        if remainder or int(minute) not in offsets:
             raise AppointmentError("Selected time slot is not available")
 
-        service = self.db.query(Service).filter(Service.id == service_id).first()
-        end_time = appointment_time + timedelta(minutes=service.duration_minutes)
+        # Check for an overlapping booking and insert under a per-staff lock, so
+        # two concurrent requests cannot both take the same slot
+        try:
+            with staff_booking_lock(self.db, staff_id):
+                conflict = self.db.query(Appointment.id).filter(
+                    Appointment.staff_id == staff_id,
+                    Appointment.appointment_time < end_time,
+                    Appointment.end_time > appointment_time,
+                    Appointment.status != AppointmentStatus.CANCELLED
+                ).first()
+                if conflict:
+                    raise AppointmentError("Selected time slot is not available")
 
-        appointment = Appointment(
-            customer_id=customer_id,
-            staff_id=staff_id,
-            service_id=service_id,
-            branch_id=branch_id,
-            appointment_time=appointment_time,
-            end_time=end_time,
-            notes=notes,
-            status=AppointmentStatus.SCHEDULED
-        )
+                appointment = Appointment(
+                    customer_id=customer_id,
+                    staff_id=staff_id,
+                    service_id=service_id,
+                    branch_id=branch_id,
+                    appointment_time=appointment_time,
+                    end_time=end_time,
+                    notes=notes,
+                    status=AppointmentStatus.SCHEDULED
+                )
+
+                self.db.add(appointment)
+                self.db.commit()
+        except IntegrityError:
+            # The PostgreSQL exclusion constraint caught an overlap
+            self.db.rollback()
+            raise AppointmentError("Selected time slot is not available")
+        except AppointmentError:
+            self.db.rollback()
+            raise
 
-        self.db.add(appointment)
-        self.db.commit()
         self.db.refresh(appointment)
 
         return appointment_to_dict(appointment)
 
-    async def cancel_appointment(self, appointment_id: int) -> Dict[str, Any]:
-        """
-        Cancel an appointment
-        """
+    def _cancel_appointment(self, appointment_id: int) -> Dict[str, Any]:
         appointment = self.db.query(Appointment).filter(
             Appointment.id == appointment_id
         ).first()
@@ -140,10 +568,7 @@ class AppointmentService:
 
         return appointment_to_dict(appointment)
 
-    async def get_appointment(self, appointment_id: int) -> Dict[str, Any]:
-        """
-        Get appointment details
-        """
+    def _get_appointment(self, appointment_id: int) -> Dict[str, Any]:
         appointment = self.db.query(Appointment).filter(
             Appointment.id == appointment_id
         ).first()
@@ -153,23 +578,44 @@ class AppointmentService:
 
         return appointment_to_dict(appointment)
 
-    async def get_customer_appointments(
+    def _get_appointment_version(self, appointment_id: int) -> Optional[datetime]:
+        return self.db.execute(
+            select(Appointment.updated_at).where(Appointment.id == appointment_id)
+        ).scalar()
+
+    def _get_customer_appointments(
         self,
         customer_id: Optional[int] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> List[Dict[str, Any]]:
-        """
-        Get all appointments, optionally filtered by customer and date range
-        """
-        query = self.db.query(Appointment)
+        end_date: Optional[datetime] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValidationError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
 
-        if customer_id:
-            query = query.filter(Appointment.customer_id == customer_id)
-        if start_date:
-            query = query.filter(Appointment.appointment_time >= start_date)
-        if end_date:
-            query = query.filter(Appointment.appointment_time <= end_date)
+        # Plain column tuples rather than ORM objects: nothing is tracked in the
+        # identity map and rows convert straight to response dicts
+        query = select(
+            *(getattr(Appointment, column) for column in APPOINTMENT_COLUMNS)
+        ).where(*appointment_filters(customer_id, start_date, end_date))
+        if cursor:
+            # Seek past the last row of the previous page instead of using
+            # OFFSET, so every page costs the same however deep it is
+            after_time, after_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(Appointment.appointment_time, Appointment.id) > tuple_(after_time, after_id)
+            )
 
-        appointments = query.order_by(Appointment.appointment_time).all()
-        return [appointment_to_dict(appointment) for appointment in appointments] 
\ No newline at end of file
+        # One extra row tells us whether another page follows
+        rows = self.db.execute(
+            query.order_by(Appointment.appointment_time, Appointment.id).limit(limit + 1)
+        ).all()
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(page[-1].appointment_time, page[-1].id)
+        return {
+            "items": [appointment_row_to_dict(row) for row in page],
+            "next_cursor": next_cursor
+        }
@@ -0,0 +1,145 @@
+"""
+Decode uploaded audio straight from memory into the 16 kHz mono float32
+samples Whisper expects
+"""
+import struct
+import subprocess
+from typing import Tuple
+import numpy as np
+
+SAMPLE_RATE = 16000  # Whisper's input rate
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Little-endian sample layouts by (format, bits per sample); 24-bit is handled separately
+PCM_DTYPES = {
+    (WAVE_FORMAT_PCM, 8): np.dtype("u1"),
+    (WAVE_FORMAT_PCM, 16): np.dtype("<i2"),
+    (WAVE_FORMAT_PCM, 32): np.dtype("<i4"),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): np.dtype("<f4"),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): np.dtype("<f8"),
+}
+
+
+class AudioDecodeError(ValueError):
+    pass
+
+
+def is_wav(data: bytes) -> bool:
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def _wav_chunks(data: memoryview) -> Tuple[memoryview, memoryview]:
+    """
+    The fmt and data chunks of a RIFF/WAVE file, as views into the upload
+    """
+    fmt = samples = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = bytes(data[offset:offset + 4])
+        (size,) = struct.unpack_from("<I", data, offset + 4)
+        body = data[offset + 8:offset + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = body
+        elif chunk_id == b"data":
+            # Streamed recordings may leave the size unset or too large
+            samples = data[offset + 8:] if size in (0, 0xFFFFFFFF) else body
+            break
+        offset += 8 + size + (size & 1)  # Chunks are word aligned
+    if fmt is None or samples is None:
+        raise AudioDecodeError("WAV file is missing its fmt or data chunk")
+    return fmt, samples
+
+
+def decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Samples (frames x channels, float32 in [-1, 1]) and the sample rate of a
+    PCM or IEEE float WAV file. The sample data is read in place with
+    np.frombuffer; the only copy is the conversion to float32.
+    """
+    fmt, body = _wav_chunks(memoryview(data))
+    if len(fmt) < 16:
+        raise AudioDecodeError("WAV fmt chunk is too short")
+    format_tag, channels, rate, _, block_align, bits = struct.unpack_from("<HHIIHH", fmt)
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # The real format is the first two bytes of the subformat GUID
+        (format_tag,) = struct.unpack_from("<H", fmt, 24)
+    if not channels or not rate or not block_align:
+        raise AudioDecodeError("WAV header has no channels, sample rate or block size")
+
+    frames = len(body) // block_align
+    body = body[:frames * block_align]
+    if (format_tag, bits) == (WAVE_FORMAT_PCM, 24):
+        raw = np.frombuffer(body, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = (raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)) << 8  # Sign-extend via the top byte
+        samples = values.astype(np.float32) / 2 ** 31
+    else:
+        dtype = PCM_DTYPES.get((format_tag, bits))
+        if dtype is None:
+            raise AudioDecodeError(f"Unsupported WAV encoding: format {format_tag:#06x}, {bits} bits")
+        values = np.frombuffer(body, dtype=dtype)
+        if dtype.kind == "f":
+            samples = values.astype(np.float32)
+        elif dtype.kind == "u":
+            samples = (values.astype(np.float32) - 128) / 128
+        else:
+            samples = values.astype(np.float32) / float(2 ** (bits - 1))
+    return samples.reshape(-1, channels), rate
+
+
+def to_whisper_input(samples: np.ndarray, rate: int) -> np.ndarray:
+    """
+    Mix frames x channels samples down to mono and resample to 16 kHz
+    """
+    mono = samples.mean(axis=1, dtype=np.float32) if samples.shape[1] > 1 else samples[:, 0]
+    return resample(mono, rate)
+
+
+def resample(samples: np.ndarray, rate: int, target: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Band-limited resampling by truncating or zero-padding the spectrum, which
+    also low-passes when downsampling so nothing aliases
+    """
+    if rate == target or not samples.size:
+        return np.ascontiguousarray(samples, dtype=np.float32)
+    count = max(int(round(samples.size * target / rate)), 1)
+    spectrum = np.fft.rfft(samples)
+    bins = count // 2 + 1
+    if bins <= spectrum.size:
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.concatenate([spectrum, np.zeros(bins - spectrum.size, dtype=spectrum.dtype)])
+    return (np.fft.irfft(spectrum, count) * (count / samples.size)).astype(np.float32)
+
+
+def decode_with_ffmpeg(data: bytes) -> np.ndarray:
+    """
+    Decode a compressed upload by piping it through ffmpeg, with no files on disk
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "pipe:1"
+    ]
+    try:
+        result = subprocess.run(command, input=data, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise AudioDecodeError("ffmpeg is required to decode compressed audio")
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(f"Failed to decode audio: {e.stderr.decode(errors='replace').strip()[-500:]}")
+    return np.frombuffer(result.stdout, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """
+    16 kHz mono float32 samples from uploaded audio bytes. WAV is parsed
+    in-process; anything else goes through an ffmpeg pipe.
+    """
+    if not data:
+        raise AudioDecodeError("Empty audio content")
+    if is_wav(data):
+        return to_whisper_input(*decode_wav(data))
+    return decode_with_ffmpeg(data)
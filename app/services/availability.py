@@ -0,0 +1,139 @@
+import bisect
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+SLOT_INTERVAL_MINUTES = 30  # Candidate slots start every 30 minutes
+
+
+def _minute_offset(moment: datetime, origin: datetime) -> float:
+    return (moment - origin).total_seconds() / 60
+
+
+def slot_offsets(
+    duration_minutes: int,
+    open_minute: int,
+    close_minute: int,
+    step_minutes: int = SLOT_INTERVAL_MINUTES
+) -> np.ndarray:
+    """
+    Minute-of-day offsets of every candidate slot that fits between open and close.
+    """
+    last_start = close_minute - duration_minutes
+    if duration_minutes <= 0 or last_start < open_minute:
+        return np.empty(0, dtype=np.int64)
+    return np.arange(open_minute, last_start + 1, step_minutes, dtype=np.int64)
+
+
+class OccupancyGrid:
+    """
+    Minute-resolution occupancy bitmap covering one or more consecutive days,
+    with one row per calendar (staff member, branch, ...).
+
+    The grid is built once per query from the appointments in range; free slots
+    of any length are then answered with prefix sums over the bitmap instead of
+    rescanning the appointment list for every candidate slot.
+    """
+
+    def __init__(self, start: datetime, days: int = 1, rows: int = 1):
+        self.start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.days = days
+        self.busy = np.zeros((rows, days * MINUTES_PER_DAY), dtype=bool)
+        self._occupied: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_intervals(
+        cls,
+        start: datetime,
+        intervals: Iterable[Tuple[int, datetime, datetime]],
+        days: int = 1,
+        rows: int = 1
+    ) -> "OccupancyGrid":
+        """
+        Build a grid from (row, start, end) intervals in a single vectorized pass.
+        """
+        grid = cls(start, days, rows)
+        grid.mark_many(intervals)
+        return grid
+
+    @property
+    def minutes(self) -> int:
+        return self.busy.shape[1]
+
+    def mark_many(self, intervals: Iterable[Tuple[int, datetime, datetime]]) -> None:
+        intervals = list(intervals)
+        if not intervals:
+            return
+
+        rows = np.fromiter((row for row, _, _ in intervals), dtype=np.int64, count=len(intervals))
+        # Occupied minutes are [floor(start), ceil(end)), which keeps the overlap
+        # test exact for whole-minute slots even if stored times carry seconds.
+        starts = np.floor([_minute_offset(start, self.start) for _, start, _ in intervals])
+        ends = np.ceil([_minute_offset(end, self.start) for _, _, end in intervals])
+        starts = np.clip(starts, 0, self.minutes).astype(np.int64)
+        ends = np.clip(ends, 0, self.minutes).astype(np.int64)
+        keep = ends > starts
+        if not keep.any():
+            return
+
+        # Difference array + cumulative sum paints every interval at once
+        delta = np.zeros((self.busy.shape[0], self.minutes + 1), dtype=np.int32)
+        np.add.at(delta, (rows[keep], starts[keep]), 1)
+        np.add.at(delta, (rows[keep], ends[keep]), -1)
+        self.busy |= np.cumsum(delta, axis=1)[:, :self.minutes] > 0
+        self._occupied = None
+
+    @property
+    def occupied(self) -> np.ndarray:
+        """
+        Running count of busy minutes per row, computed once per grid
+        """
+        if self._occupied is None:
+            occupied = np.zeros((self.busy.shape[0], self.minutes + 1), dtype=np.int32)
+            np.cumsum(self.busy, axis=1, out=occupied[:, 1:])
+            self._occupied = occupied
+        return self._occupied
+
+    def free_mask(self, duration_minutes: int, starts: np.ndarray) -> np.ndarray:
+        """
+        Boolean array (rows x *starts.shape): True where a row is free for the
+        whole slot. `starts` are minute offsets from the start of the grid.
+        """
+        ends = np.minimum(starts + duration_minutes, self.minutes)
+        return (self.occupied[:, ends] - self.occupied[:, starts]) == 0
+
+
+class StaffIntervalIndex:
+    """
+    Sorted booked intervals per staff member, for checking many candidate
+    bookings against each other and the existing calendar in O(log n) each.
+    Alongside the starts it keeps the running maximum of the ends, so a
+    candidate conflicts exactly when some interval starting before its end
+    ends after its start, even if existing intervals overlap each other.
+    """
+
+    def __init__(self):
+        self._starts = {}
+        self._ends = {}
+        self._max_ends = {}
+
+    def add(self, staff_id: int, start: datetime, end: datetime) -> None:
+        starts = self._starts.setdefault(staff_id, [])
+        ends = self._ends.setdefault(staff_id, [])
+        max_ends = self._max_ends.setdefault(staff_id, [])
+        position = bisect.bisect_right(starts, start)
+        starts.insert(position, start)
+        ends.insert(position, end)
+        max_ends.insert(position, end)
+        running = max_ends[position - 1] if position else end
+        for i in range(position, len(ends)):
+            running = max(running, ends[i])
+            max_ends[i] = running
+
+    def overlaps(self, staff_id: int, start: datetime, end: datetime) -> bool:
+        starts = self._starts.get(staff_id)
+        if not starts:
+            return False
+        position = bisect.bisect_left(starts, end)
+        return position > 0 and self._max_ends[staff_id][position - 1] > start
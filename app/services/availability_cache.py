@@ -0,0 +1,459 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from pydantic import BaseSettings
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+from app.core.etags import make_etag
+from app.models import Appointment, Branch, Service, Staff, StaffSkill
+
+logger = logging.getLogger(__name__)
+
+
+class AvailabilityCacheSettings(BaseSettings):
+    AVAILABILITY_CACHE_BACKEND: str = "memory"  # Can be "memory", "redis" or "none"
+    AVAILABILITY_CACHE_MAX_ENTRIES: int = 50000
+    AVAILABILITY_CACHE_TTL_SECONDS: int = 300
+    AVAILABILITY_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    class Config:
+        env_file = ".env"
+
+
+class AvailabilityKey(NamedTuple):
+    branch_id: int
+    staff_id: int
+    duration_minutes: int
+    day: date
+
+
+# Cached values are the free slot starts of one staff member on one day, as
+# minutes from midnight
+FreeStarts = Tuple[int, ...]
+
+# Change counters behind availability ETags: one for everything (service
+# changes), one per branch (opening hours, staff) and one per branch and day
+# (appointments)
+ALL_VERSION = "all"
+
+
+def branch_version(branch_id: int) -> str:
+    return f"branch:{branch_id}"
+
+
+def branch_day_version(branch_id: int, day: date) -> str:
+    return f"day:{branch_id}:{day.isoformat()}"
+
+
+class InMemoryAvailabilityBackend:
+    """
+    Bounded LRU with per-entry TTL, local to the worker process
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[AvailabilityKey, Tuple[float, FreeStarts]]" = OrderedDict()
+        self._by_staff_day: Dict[Tuple[int, date], Set[AvailabilityKey]] = {}
+        self._versions: Dict[str, int] = {}
+        # Other workers' writes are invisible here, so version tokens are
+        # unique to this process and roll over with the entry TTL
+        self._epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[AvailabilityKey]) -> Dict[AvailabilityKey, FreeStarts]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if expires_at <= now:
+                    self._remove(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, items: Dict[AvailabilityKey, FreeStarts]) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+                self._by_staff_day.setdefault((key.staff_id, key.day), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, staff_id: int, day: date) -> int:
+        with self._lock:
+            keys = self._by_staff_day.pop((staff_id, day), set())
+            for key in keys:
+                self._entries.pop(key, None)
+            return len(keys)
+
+    def invalidate_branch(self, branch_id: int) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if key.branch_id == branch_id]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_staff_day.clear()
+
+    def bump_versions(self, names: Iterable[str]) -> None:
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def get_versions(self, names: Iterable[str]) -> List[str]:
+        bucket = int(time.time() // self.ttl_seconds) if self.ttl_seconds > 0 else 0
+        return [f"{self._epoch}.{bucket}.{self._versions.get(name, 0)}" for name in names]
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: AvailabilityKey) -> None:
+        self._entries.pop(key, None)
+        bucket = self._by_staff_day.get((key.staff_id, key.day))
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._by_staff_day[(key.staff_id, key.day)]
+
+
+class RedisAvailabilityBackend:
+    """
+    Shared backend for running several uvicorn workers. Each staff/day is one
+    hash with a field per (branch, duration), so invalidation is a single DEL.
+    Eviction beyond the TTL is left to the server's maxmemory-policy.
+    """
+
+    def __init__(self, url: str, ttl_seconds: int, prefix: str = "availability"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis package is required for AVAILABILITY_CACHE_BACKEND=redis")
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _hash(self, staff_id: int, day: date) -> str:
+        return f"{self.prefix}:{staff_id}:{day.isoformat()}"
+
+    @staticmethod
+    def _field(key: AvailabilityKey) -> str:
+        return f"{key.branch_id}:{key.duration_minutes}"
+
+    def get_many(self, keys: Iterable[AvailabilityKey]) -> Dict[AvailabilityKey, FreeStarts]:
+        keys = list(keys)
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.hget(self._hash(key.staff_id, key.day), self._field(key))
+        return {
+            key: tuple(json.loads(value))
+            for key, value in zip(keys, pipe.execute())
+            if value is not None
+        }
+
+    def set_many(self, items: Dict[AvailabilityKey, FreeStarts]) -> None:
+        pipe = self.client.pipeline()
+        for key, value in items.items():
+            name = self._hash(key.staff_id, key.day)
+            pipe.hset(name, self._field(key), json.dumps(list(value)))
+            pipe.expire(name, self.ttl_seconds)
+        pipe.execute()
+
+    def invalidate(self, staff_id: int, day: date) -> int:
+        return self.client.delete(self._hash(staff_id, day))
+
+    def invalidate_branch(self, branch_id: int) -> int:
+        removed = 0
+        for name in self.client.scan_iter(f"{self.prefix}:*"):
+            fields = [field for field in self.client.hkeys(name) if field.decode().split(":")[0] == str(branch_id)]
+            if fields:
+                removed += self.client.hdel(name, *fields)
+        return removed
+
+    def clear(self) -> None:
+        for name in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(name)
+
+    # Versions live outside the entry prefix so clear() never resets them;
+    # a reset counter could repeat an ETag a client still holds
+
+    def bump_versions(self, names: Iterable[str]) -> None:
+        pipe = self.client.pipeline()
+        for name in names:
+            pipe.incr(f"{self.prefix}-version:{name}")
+        pipe.execute()
+
+    def get_versions(self, names: Iterable[str]) -> List[str]:
+        values = self.client.mget([f"{self.prefix}-version:{name}" for name in names])
+        return [value.decode() if value else "0" for value in values]
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(f"{self.prefix}:*"))
+
+
+class AvailabilityCache:
+    """
+    Computed free slots per (branch, staff, service duration, day), invalidated
+    whenever an appointment for that staff member and day is written.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Bumped by every invalidation, so slots computed before one are not
+        # written back over it
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get_many(self, keys: List[AvailabilityKey]) -> Dict[AvailabilityKey, FreeStarts]:
+        if not self.enabled:
+            return {}
+        try:
+            found = self.backend.get_many(keys)
+        except Exception as e:
+            logger.warning(f"Availability cache read failed: {e}")
+            found = {}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: Dict[AvailabilityKey, FreeStarts], generation: Optional[int] = None) -> None:
+        """
+        Store computed slots. Given the generation read before they were
+        computed, they are dropped if anything was invalidated since.
+        """
+        if not self.enabled or not items:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            try:
+                self.backend.set_many(items)
+            except Exception as e:
+                logger.warning(f"Availability cache write failed: {e}")
+
+    def invalidate(self, staff_id: int, day: date) -> None:
+        if not self.enabled:
+            return
+        self.invalidations += 1
+        with self._lock:
+            self._generation += 1
+        try:
+            self.backend.invalidate(staff_id, day)
+        except Exception as e:
+            logger.warning(f"Availability cache invalidation failed: {e}")
+
+    def invalidate_appointment(
+        self,
+        staff_id: int,
+        start: datetime,
+        end: datetime,
+        branch_id: Optional[int] = None
+    ) -> None:
+        """
+        Drop every cached day an appointment touches and, given its branch,
+        move on those days' availability ETags
+        """
+        day = start.date()
+        last_day = (end - timedelta(microseconds=1)).date() if end > start else day
+        days = []
+        while day <= last_day:
+            self.invalidate(staff_id, day)
+            days.append(day)
+            day += timedelta(days=1)
+        if branch_id is not None:
+            self.bump_versions(branch_day_version(branch_id, day) for day in days)
+
+    def invalidate_branch(self, branch_id: int) -> None:
+        if not self.enabled:
+            return
+        self.invalidations += 1
+        with self._lock:
+            self._generation += 1
+        try:
+            self.backend.invalidate_branch(branch_id)
+        except Exception as e:
+            logger.warning(f"Availability cache invalidation failed: {e}")
+        self.bump_versions([branch_version(branch_id)])
+
+    def bump_versions(self, names: Iterable[str]) -> None:
+        if not self.enabled:
+            return
+        try:
+            self.backend.bump_versions(list(names))
+        except Exception as e:
+            logger.warning(f"Availability version update failed: {e}")
+
+    def availability_etag(
+        self,
+        branch_id: int,
+        day: date,
+        service_id: int,
+        staff_id: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        ETag for one availability response, built from change counters alone
+        so it costs no queries. None when there is no backend to count changes.
+        """
+        if not self.enabled:
+            return None
+        try:
+            versions = self.backend.get_versions([
+                ALL_VERSION,
+                branch_version(branch_id),
+                branch_day_version(branch_id, day)
+            ])
+        except Exception as e:
+            logger.warning(f"Availability version read failed: {e}")
+            return None
+        return make_etag("availability", branch_id, day.isoformat(), service_id, staff_id, *versions)
+
+    def clear(self) -> None:
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.enabled else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "invalidations": self.invalidations,
+            "size": self.backend.size() if self.enabled else 0
+        }
+
+
+def build_availability_cache(settings: Optional[AvailabilityCacheSettings] = None) -> AvailabilityCache:
+    settings = settings or AvailabilityCacheSettings()
+    backend_name = settings.AVAILABILITY_CACHE_BACKEND
+    if backend_name == "memory":
+        return AvailabilityCache(InMemoryAvailabilityBackend(
+            settings.AVAILABILITY_CACHE_MAX_ENTRIES,
+            settings.AVAILABILITY_CACHE_TTL_SECONDS
+        ))
+    if backend_name == "redis":
+        return AvailabilityCache(RedisAvailabilityBackend(
+            settings.AVAILABILITY_CACHE_REDIS_URL,
+            settings.AVAILABILITY_CACHE_TTL_SECONDS
+        ))
+    if backend_name == "none":
+        return AvailabilityCache()
+    raise ValueError(f"Unsupported availability cache backend: {backend_name}")
+
+
+availability_cache = build_availability_cache()
+
+
+def _appointment_windows(target: Appointment) -> List[Tuple[int, int, datetime, datetime]]:
+    """
+    Current and previously committed (branch, staff, start, end) of a written
+    appointment
+    """
+    state = inspect(target)
+    columns = ("branch_id", "staff_id", "appointment_time", "end_time")
+    current = tuple(getattr(target, column) for column in columns)
+    previous = tuple(
+        (state.attrs[column].history.deleted or [value])[0]
+        for column, value in zip(columns, current)
+    )
+    return [window for window in {current, previous} if None not in window]
+
+
+def _session_changes(target, name: str) -> Optional[set]:
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault(name, set())
+
+
+@event.listens_for(Appointment, "after_insert")
+@event.listens_for(Appointment, "after_update")
+@event.listens_for(Appointment, "after_delete")
+def _mark_appointment_changed(mapper, connection, target):
+    changes = _session_changes(target, "changed_appointments")
+    if changes is not None:
+        changes.update(_appointment_windows(target))
+
+
+@event.listens_for(Branch, "after_update")
+@event.listens_for(Branch, "after_delete")
+def _mark_branch_hours_changed(mapper, connection, target):
+    changes = _session_changes(target, "changed_branch_hours")
+    if changes is not None:
+        changes.add(target.id)
+
+
+@event.listens_for(Staff, "after_insert")
+@event.listens_for(Staff, "after_update")
+@event.listens_for(Staff, "after_delete")
+def _mark_branch_staff_changed(mapper, connection, target):
+    # Who works where and what they can do changes availability responses
+    # without touching any cached free slots
+    changes = _session_changes(target, "changed_branch_staff")
+    if changes is not None:
+        branches = inspect(target).attrs.branch_id.history.deleted or []
+        changes.update(branch_id for branch_id in [target.branch_id, *branches] if branch_id is not None)
+
+
+@event.listens_for(StaffSkill, "after_insert")
+@event.listens_for(StaffSkill, "after_update")
+@event.listens_for(StaffSkill, "after_delete")
+def _mark_staff_skill_changed(mapper, connection, target):
+    changes = _session_changes(target, "changed_branch_staff")
+    if changes is not None:
+        branch_id = connection.execute(select(Staff.branch_id).where(Staff.id == target.staff_id)).scalar()
+        if branch_id is not None:
+            changes.add(branch_id)
+
+
+@event.listens_for(Service, "after_update")
+@event.listens_for(Service, "after_delete")
+def _mark_service_changed(mapper, connection, target):
+    changes = _session_changes(target, "changed_services")
+    if changes is not None:
+        changes.add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_availability(session):
+    for branch_id, staff_id, start, end in session.info.pop("changed_appointments", ()):
+        availability_cache.invalidate_appointment(staff_id, start, end, branch_id=branch_id)
+    for branch_id in session.info.pop("changed_branch_hours", ()):
+        availability_cache.invalidate_branch(branch_id)
+    branches = session.info.pop("changed_branch_staff", ())
+    if branches:
+        availability_cache.bump_versions(branch_version(branch_id) for branch_id in branches)
+    if session.info.pop("changed_services", None):
+        availability_cache.bump_versions([ALL_VERSION])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_availability(session):
+    for name in ("changed_appointments", "changed_branch_hours", "changed_branch_staff", "changed_services"):
+        session.info.pop(name, None)
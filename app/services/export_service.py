@@ -0,0 +1,83 @@
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional, Sequence
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Appointment, AppointmentStatus
+from app.services.appointment_service import APPOINTMENT_COLUMNS, appointment_filters
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = APPOINTMENT_COLUMNS
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, AppointmentStatus):
+        return value.value
+    return value
+
+
+class AppointmentExportService:
+    """
+    Stream appointments out of the database in fixed-size batches. Rows are
+    fetched through a server-side cursor and each batch is encoded and handed to
+    the response before the next is read, so memory does not grow with the
+    size of the export.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = DEFAULT_EXPORT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+
+    async def export(
+        self,
+        fmt: str,
+        customer_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        status: Optional[AppointmentStatus] = None
+    ) -> AsyncIterator[str]:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        encode = self._encode_csv if fmt == "csv" else self._encode_ndjson
+
+        if fmt == "csv":
+            yield self._encode_csv([EXPORT_COLUMNS])
+
+        query = select(
+            *(getattr(Appointment, column) for column in EXPORT_COLUMNS)
+        ).where(
+            *appointment_filters(customer_id, start_date, end_date, status)
+        ).order_by(
+            Appointment.appointment_time, Appointment.id
+        ).execution_options(yield_per=self.batch_size)
+
+        result = await self.db.stream(query)
+        try:
+            async for rows in result.partitions():
+                yield encode(rows)
+        finally:
+            await result.close()
+
+    @staticmethod
+    def _encode_ndjson(rows: Sequence[Sequence[Any]]) -> str:
+        # orjson writes datetimes and enums natively
+        return b"".join(
+            orjson.dumps(dict(zip(EXPORT_COLUMNS, row)), option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        ).decode()
+
+    @staticmethod
+    def _encode_csv(rows: Sequence[Sequence[Any]]) -> str:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        return buffer.getvalue()
@@ -0,0 +1,312 @@
+import csv
+import io
+import json
+import logging
+from contextlib import ExitStack
+from itertools import islice
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.db.locks import staff_booking_lock
+from app.models import Appointment, AppointmentStatus, Customer, Service, Staff
+from app.services.availability import StaffIntervalIndex
+from app.services.availability_cache import availability_cache
+from app.services.occupancy_rollup import add_appointment_rows
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "ndjson")
+DEFAULT_BATCH_SIZE = 5000
+REQUIRED_FIELDS = ("customer_id", "staff_id", "service_id", "branch_id", "appointment_time")
+COLUMNS = (
+    "customer_id", "staff_id", "branch_id", "service_id", "appointment_time",
+    "end_time", "status", "notes", "price", "created_at", "updated_at"
+)
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def detect_format(filename: Optional[str]) -> str:
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (row number, raw record) pairs from a CSV or NDJSON stream. Row numbers
+    are 1-based data rows; malformed NDJSON lines are yielded as the exception.
+    """
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(stream), start=1):
+            yield number, record
+    elif fmt == "ndjson":
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                yield number, ImportRowError(f"Invalid JSON: {e}")
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _parse_int(record: Dict[str, Any], field: str) -> int:
+    try:
+        return int(record[field])
+    except (TypeError, ValueError):
+        raise ImportRowError(f"Invalid {field}: {record[field]!r}")
+
+
+def _parse_datetime(value: Any, field: str) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ImportRowError(f"Invalid {field}: {value!r}")
+
+
+def _parse_status(value: Any) -> AppointmentStatus:
+    if not value:
+        return AppointmentStatus.SCHEDULED
+    try:
+        return AppointmentStatus(str(value).strip().lower())
+    except ValueError:
+        raise ImportRowError(f"Invalid status: {value!r}")
+
+
+class AppointmentImportService:
+    """
+    Validate and insert appointments in bulk. The input is read one batch at a
+    time: each batch is checked in memory against the preloaded reference data
+    and a per-staff interval index of existing and already accepted bookings,
+    then written before the next is read, so memory is bounded by the batch
+    size plus the error report.
+    """
+
+    def __init__(self, db: Session, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+
+    def import_stream(self, stream: TextIO, fmt: str, dry_run: bool = False) -> Dict[str, Any]:
+        return self.import_records(read_rows(stream, fmt), dry_run=dry_run)
+
+    def import_records(self, records: Iterable[Tuple[int, Any]], dry_run: bool = False) -> Dict[str, Any]:
+        errors: List[Dict[str, Any]] = []
+        total = valid = imported = 0
+        # A dry run writes nothing, so rows accepted from earlier batches are
+        # remembered here instead of being found in the database
+        pending = StaffIntervalIndex() if dry_run else None
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.batch_size))
+            if not chunk:
+                break
+            total += len(chunk)
+            parsed = []
+            for number, record in chunk:
+                try:
+                    parsed.append((number, self._parse(record)))
+                except ImportRowError as e:
+                    errors.append({"row": number, "error": str(e)})
+
+            batch = self._validate(parsed, errors, pending)
+            valid += len(batch)
+            if dry_run or not batch:
+                continue
+            try:
+                batch = self._insert_locked(batch, errors)
+                imported += len(batch)
+                self._invalidate_cache(row for _, row in batch)
+            except SQLAlchemyError as e:
+                self.db.rollback()
+                logger.error(f"Import batch starting at row {batch[0][0]} failed: {e}")
+                errors.extend({"row": number, "error": "Batch insert failed"} for number, _ in batch)
+
+        errors.sort(key=lambda error: error["row"])
+        return {
+            "total_rows": total,
+            "valid_rows": valid,
+            "imported": imported,
+            "failed": len(errors),
+            "dry_run": dry_run,
+            "errors": errors
+        }
+
+    def _parse(self, record: Any) -> Dict[str, Any]:
+        if isinstance(record, Exception):
+            raise record
+        if not isinstance(record, dict):
+            raise ImportRowError("Row must be an object")
+
+        missing = [field for field in REQUIRED_FIELDS if record.get(field) in (None, "")]
+        if missing:
+            raise ImportRowError(f"Missing required fields: {', '.join(missing)}")
+
+        row = {field: _parse_int(record, field) for field in ("customer_id", "staff_id", "service_id", "branch_id")}
+        row["appointment_time"] = _parse_datetime(record["appointment_time"], "appointment_time")
+        row["end_time"] = _parse_datetime(record["end_time"], "end_time") if record.get("end_time") else None
+        row["status"] = _parse_status(record.get("status"))
+        row["notes"] = record.get("notes") or None
+        return row
+
+    def _validate(
+        self,
+        parsed: List[Tuple[int, Dict[str, Any]]],
+        errors: List[Dict[str, Any]],
+        pending: Optional[StaffIntervalIndex] = None
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        if not parsed:
+            return []
+        rows = [row for _, row in parsed]
+
+        # Preload every referenced entity with one query each
+        services = {
+            service_id: (duration, price)
+            for service_id, duration, price in self.db.query(
+                Service.id, Service.duration_minutes, Service.price
+            ).filter(Service.id.in_({row["service_id"] for row in rows}))
+        }
+        staff_branches = dict(self.db.query(Staff.id, Staff.branch_id).filter(
+            Staff.id.in_({row["staff_id"] for row in rows})
+        ))
+        customers = {customer_id for (customer_id,) in self.db.query(Customer.id).filter(
+            Customer.id.in_({row["customer_id"] for row in rows})
+        )}
+
+        for row in rows:
+            if row["service_id"] in services:
+                duration, row["price"] = services[row["service_id"]]
+                if row["end_time"] is None:
+                    row["end_time"] = row["appointment_time"] + timedelta(minutes=duration)
+
+        index = self._load_interval_index(rows)
+        now = datetime.utcnow()
+        accepted = []
+        for number, row in parsed:
+            error = None
+            if row["service_id"] not in services:
+                error = "Service not found"
+            elif row["staff_id"] not in staff_branches:
+                error = "Staff member not found"
+            elif staff_branches[row["staff_id"]] != row["branch_id"]:
+                error = "Staff member does not work at this branch"
+            elif row["customer_id"] not in customers:
+                error = "Customer not found"
+            elif row["end_time"] <= row["appointment_time"]:
+                error = "end_time must be after appointment_time"
+            elif row["status"] != AppointmentStatus.CANCELLED:
+                window = (row["staff_id"], row["appointment_time"], row["end_time"])
+                if index.overlaps(*window) or (pending is not None and pending.overlaps(*window)):
+                    error = "Conflicts with another appointment for this staff member"
+                else:
+                    index.add(*window)
+                    if pending is not None:
+                        pending.add(*window)
+
+            if error:
+                errors.append({"row": number, "error": error})
+            else:
+                row["created_at"] = row["updated_at"] = now
+                accepted.append((number, row))
+        return accepted
+
+    def _load_interval_index(self, rows: List[Dict[str, Any]]) -> StaffIntervalIndex:
+        index = StaffIntervalIndex()
+        windows = [row for row in rows if row["end_time"] is not None]
+        if not windows:
+            return index
+
+        existing = self.db.query(
+            Appointment.staff_id,
+            Appointment.appointment_time,
+            Appointment.end_time
+        ).filter(
+            Appointment.staff_id.in_({row["staff_id"] for row in windows}),
+            Appointment.appointment_time < max(row["end_time"] for row in windows),
+            Appointment.end_time > min(row["appointment_time"] for row in windows),
+            Appointment.status != AppointmentStatus.CANCELLED
+        )
+        for staff_id, start, end in existing:
+            index.add(staff_id, start, end)
+        return index
+
+    def _insert_locked(
+        self,
+        batch: List[Tuple[int, Dict[str, Any]]],
+        errors: List[Dict[str, Any]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Insert a batch under the booking locks of its staff, taken in id order
+        like any other booking. Rows that clash with appointments booked since
+        validation are reported and skipped. Returns the rows inserted.
+        """
+        with ExitStack() as locks:
+            for staff_id in sorted({row["staff_id"] for _, row in batch}):
+                locks.enter_context(staff_booking_lock(self.db, staff_id))
+            index = self._load_interval_index([row for _, row in batch])
+            inserted, conflicts = [], []
+            for number, row in batch:
+                if row["status"] != AppointmentStatus.CANCELLED and index.overlaps(
+                    row["staff_id"], row["appointment_time"], row["end_time"]
+                ):
+                    conflicts.append({"row": number, "error": "Conflicts with another appointment for this staff member"})
+                else:
+                    inserted.append((number, row))
+            if inserted:
+                self._insert_batch([row for _, row in inserted])
+            else:
+                self.db.rollback()
+        errors.extend(conflicts)
+        return inserted
+
+    def _insert_batch(self, rows: List[Dict[str, Any]]) -> None:
+        if self.db.get_bind().dialect.name == "postgresql":
+            self._copy_batch(rows)
+        else:
+            self.db.execute(Appointment.__table__.insert(), rows)
+        # Core inserts skip the ORM events that maintain the rollup
+        add_appointment_rows(self.db.connection(), rows)
+        self.db.commit()
+
+    def _copy_batch(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Stream a batch through COPY, the fastest bulk path on PostgreSQL
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                row["status"].name if column == "status" else row[column]
+                for column in COLUMNS
+            ])
+        buffer.seek(0)
+
+        statement = f"COPY {Appointment.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+        dbapi = self.db.get_bind().dialect.dbapi
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(statement, buffer)
+        except dbapi.Error as e:
+            # Raw driver errors bypass SQLAlchemy's wrapping; wrap them so a
+            # failed COPY is rolled back and reported like any other batch
+            raise DBAPIError.instance(statement, None, e, dbapi.Error)
+        finally:
+            cursor.close()
+
+    def _invalidate_cache(self, rows: Iterable[Dict[str, Any]]) -> None:
+        # Core inserts bypass the ORM events that normally invalidate the cache
+        for row in rows:
+            availability_cache.invalidate_appointment(
+                row["staff_id"],
+                row["appointment_time"],
+                row["end_time"],
+                branch_id=row["branch_id"]
+            )
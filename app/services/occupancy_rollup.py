@@ -0,0 +1,304 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, TypeVar, Union
+from sqlalchemy import Integer, and_, delete, event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+from app.core.exceptions import AppointmentError
+from app.models import Appointment, AppointmentStatus, DailyOccupancy
+from app.services.opening_hours import opening_hours_cache
+
+MAX_ROLLUP_RANGE_DAYS = 366
+
+T = TypeVar("T")
+
+
+class RollupKey(NamedTuple):
+    branch_id: int
+    staff_id: int
+    day: date
+    status: AppointmentStatus
+
+
+class minutes_between(FunctionElement):
+    """
+    Whole minutes from the first timestamp to the second
+    """
+    type = Integer()
+    name = "minutes_between"
+    inherit_cache = True
+
+
+@compiles(minutes_between, "postgresql")
+def _minutes_between_postgresql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"CAST(ROUND(EXTRACT(EPOCH FROM ({compiler.process(end, **kw)} - {compiler.process(start, **kw)})) / 60) AS INTEGER)"
+
+
+@compiles(minutes_between, "sqlite")
+def _minutes_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"CAST(ROUND((julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)})) * 1440) AS INTEGER)"
+
+
+def _minutes(start: datetime, end: datetime) -> int:
+    return round((end - start).total_seconds() / 60)
+
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def apply_deltas(connection: Connection, deltas: Dict[RollupKey, List[float]]) -> None:
+    """
+    Add [count, minutes, revenue] deltas to their rollup rows, creating rows
+    as needed, in the caller's transaction
+    """
+    table = DailyOccupancy.__table__
+    now = datetime.utcnow()
+    for key, (count, minutes, revenue) in deltas.items():
+        if not (count or minutes or revenue):
+            continue
+        values = dict(
+            key._asdict(),
+            appointment_count=count,
+            booked_minutes=minutes,
+            revenue=revenue,
+            created_at=now,
+            updated_at=now
+        )
+        upsert = UPSERTS.get(connection.dialect.name)
+        if upsert is not None:
+            statement = upsert(table).values(**values)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=list(RollupKey._fields),
+                set_={
+                    "appointment_count": table.c.appointment_count + statement.excluded.appointment_count,
+                    "booked_minutes": table.c.booked_minutes + statement.excluded.booked_minutes,
+                    "revenue": table.c.revenue + statement.excluded.revenue,
+                    "updated_at": now
+                }
+            ))
+        else:
+            matches = and_(*(getattr(table.c, field) == value for field, value in key._asdict().items()))
+            updated = connection.execute(table.update().where(matches).values(
+                appointment_count=table.c.appointment_count + count,
+                booked_minutes=table.c.booked_minutes + minutes,
+                revenue=table.c.revenue + revenue,
+                updated_at=now
+            ))
+            if updated.rowcount == 0:
+                connection.execute(table.insert().values(**values))
+
+
+def add_appointment_rows(connection: Connection, rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Count appointments written with Core statements, which bypass the ORM
+    events below. Rows carry their price snapshot.
+    """
+    deltas: Dict[RollupKey, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+    for row in rows:
+        _add(deltas, row, 1)
+    if deltas:
+        apply_deltas(connection, deltas)
+
+
+def _add(deltas: Dict[RollupKey, List[float]], values: Dict[str, Any], sign: int) -> None:
+    key = RollupKey(
+        values["branch_id"],
+        values["staff_id"],
+        values["appointment_time"].date(),
+        values["status"] or AppointmentStatus.SCHEDULED
+    )
+    delta = deltas[key]
+    delta[0] += sign
+    delta[1] += sign * _minutes(values["appointment_time"], values["end_time"])
+    delta[2] += sign * (values["price"] or 0.0)
+
+
+# Revenue comes from each appointment's price snapshot rather than the
+# service's current price, so removing a booking takes back exactly what
+# adding it counted
+ROLLUP_COLUMNS = ("branch_id", "staff_id", "appointment_time", "end_time", "status", "price")
+
+
+def _appointment_values(target: Appointment, previous: bool = False) -> Dict[str, Any]:
+    state = inspect(target)
+    values = {}
+    for column in ROLLUP_COLUMNS:
+        value = getattr(target, column)
+        if previous:
+            value = (state.attrs[column].history.deleted or [value])[0]
+        values[column] = value
+    return values
+
+
+@event.listens_for(Appointment, "after_insert")
+def _count_inserted_appointment(mapper, connection, target):
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    _add(deltas, _appointment_values(target), 1)
+    apply_deltas(connection, deltas)
+
+
+@event.listens_for(Appointment, "after_update")
+def _move_updated_appointment(mapper, connection, target):
+    previous, current = _appointment_values(target, previous=True), _appointment_values(target)
+    if previous == current:
+        return
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    _add(deltas, previous, -1)
+    _add(deltas, current, 1)
+    apply_deltas(connection, deltas)
+
+
+@event.listens_for(Appointment, "after_delete")
+def _uncount_deleted_appointment(mapper, connection, target):
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    _add(deltas, _appointment_values(target, previous=True), -1)
+    apply_deltas(connection, deltas)
+
+
+def rebuild_daily_occupancy(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> int:
+    """
+    Recompute the rollup from the appointments table, for every day or for
+    start_date..end_date inclusive, in one INSERT ... SELECT. Revenue uses
+    the appointments' price snapshots. Returns the number of rollup rows written.
+    """
+    day_filters, appointment_filters = [], []
+    if start_date:
+        day_filters.append(DailyOccupancy.day >= start_date)
+        appointment_filters.append(Appointment.appointment_time >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        day_filters.append(DailyOccupancy.day <= end_date)
+        appointment_filters.append(
+            Appointment.appointment_time < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        )
+
+    day = func.date(Appointment.appointment_time)
+    aggregate = select(
+        Appointment.branch_id,
+        Appointment.staff_id,
+        day,
+        Appointment.status,
+        func.count(),
+        func.sum(minutes_between(Appointment.appointment_time, Appointment.end_time)),
+        func.sum(func.coalesce(Appointment.price, 0.0))
+    ).where(
+        *appointment_filters
+    ).group_by(
+        Appointment.branch_id, Appointment.staff_id, day, Appointment.status
+    )
+
+    db.execute(delete(DailyOccupancy).where(*day_filters))
+    result = db.execute(DailyOccupancy.__table__.insert().from_select(
+        ["branch_id", "staff_id", "day", "status", "appointment_count", "booked_minutes", "revenue"],
+        aggregate
+    ))
+    db.commit()
+    return result.rowcount
+
+
+class OccupancyRollupService:
+    def __init__(self, db: Union[Session, AsyncSession]):
+        self.db = db
+
+    async def _run(self, method: Callable[..., T], **kwargs) -> T:
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(lambda session: method(OccupancyRollupService(session), **kwargs))
+        return method(self, **kwargs)
+
+    async def get_daily_occupancy(
+        self,
+        start_date: date,
+        end_date: date,
+        branch_id: Optional[int] = None,
+        staff_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Booked minutes, appointment counts, revenue and utilization per branch,
+        staff member and day, read from the rollup table
+        """
+        return await self._run(
+            OccupancyRollupService._get_daily_occupancy,
+            start_date=start_date,
+            end_date=end_date,
+            branch_id=branch_id,
+            staff_id=staff_id
+        )
+
+    async def rebuild(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+        """
+        Recompute the rollup from appointments
+        """
+        return await self._run(OccupancyRollupService._rebuild, start_date=start_date, end_date=end_date)
+
+    def _rebuild(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+        return rebuild_daily_occupancy(self.db, start_date, end_date)
+
+    def _get_daily_occupancy(
+        self,
+        start_date: date,
+        end_date: date,
+        branch_id: Optional[int] = None,
+        staff_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        if end_date < start_date:
+            raise AppointmentError("end_date must not be before start_date")
+        if (end_date - start_date).days + 1 > MAX_ROLLUP_RANGE_DAYS:
+            raise AppointmentError(f"Date range cannot exceed {MAX_ROLLUP_RANGE_DAYS} days")
+
+        query = select(
+            DailyOccupancy.branch_id,
+            DailyOccupancy.staff_id,
+            DailyOccupancy.day,
+            DailyOccupancy.status,
+            DailyOccupancy.appointment_count,
+            DailyOccupancy.booked_minutes,
+            DailyOccupancy.revenue
+        ).where(
+            DailyOccupancy.day >= start_date,
+            DailyOccupancy.day <= end_date,
+            DailyOccupancy.appointment_count != 0
+        )
+        if branch_id:
+            query = query.where(DailyOccupancy.branch_id == branch_id)
+        if staff_id:
+            query = query.where(DailyOccupancy.staff_id == staff_id)
+
+        totals: Dict[tuple, Dict[str, Any]] = {}
+        for branch, staff, day, status, count, minutes, revenue in self.db.execute(query):
+            row = totals.setdefault((branch, staff, day), {
+                "branch_id": branch,
+                "staff_id": staff,
+                "day": day,
+                "appointment_count": 0,
+                "cancelled_count": 0,
+                "booked_minutes": 0,
+                "revenue": 0.0
+            })
+            if status == AppointmentStatus.CANCELLED:
+                row["cancelled_count"] += count
+            else:
+                row["appointment_count"] += count
+                row["booked_minutes"] += minutes
+                row["revenue"] += revenue
+
+        hours = opening_hours_cache.get_many(self.db, {branch for branch, _, _ in totals})
+        for (branch, _, day), row in totals.items():
+            open_minutes = sum(close - open_ for open_, close in hours[branch].for_date(day))
+            row["open_minutes"] = open_minutes
+            row["utilization"] = row["booked_minutes"] / open_minutes if open_minutes else None
+            row["revenue"] = round(row["revenue"], 2)
+
+        return [totals[key] for key in sorted(totals)]
@@ -0,0 +1,192 @@
+import json
+import logging
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.db.replicas import is_read_only
+from app.models import Branch
+from app.services.availability import SLOT_INTERVAL_MINUTES, slot_offsets
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Branches without (valid) opening hours keep the historical 9 AM - 5 PM day
+DEFAULT_DAY = ((9 * 60, 17 * 60),)
+
+Intervals = Tuple[Tuple[int, int], ...]
+
+# Commits in other worker processes cannot invalidate this process's cache, so
+# entries are reloaded at least this often
+OPENING_HOURS_TTL_SECONDS = 60.0
+
+
+class WeeklyHours:
+    """
+    Opening hours compiled into minute-of-day intervals, one tuple per weekday
+    (Monday first).
+    """
+
+    def __init__(self, days: Tuple[Intervals, ...]):
+        self.days = days
+        self._offsets: Dict[Tuple[int, int, int], np.ndarray] = {}
+
+    def for_weekday(self, weekday: int) -> Intervals:
+        return self.days[weekday]
+
+    def for_date(self, day: date) -> Intervals:
+        return self.days[day.weekday()]
+
+    def slot_offsets(
+        self,
+        weekday: int,
+        duration_minutes: int,
+        step_minutes: int = SLOT_INTERVAL_MINUTES
+    ) -> np.ndarray:
+        """
+        Candidate slot starts (minute of day) that fit inside the day's opening hours
+        """
+        key = (weekday, duration_minutes, step_minutes)
+        offsets = self._offsets.get(key)
+        if offsets is None:
+            parts = [
+                slot_offsets(duration_minutes, open_minute, close_minute, step_minutes)
+                for open_minute, close_minute in self.days[weekday]
+            ]
+            offsets = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+            self._offsets[key] = offsets
+        return offsets
+
+
+DEFAULT_HOURS = WeeklyHours((DEFAULT_DAY,) * 7)
+
+
+def _parse_time(value: str) -> int:
+    hours, _, minutes = value.strip().partition(":")
+    minute = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= minute <= 24 * 60:
+        raise ValueError(f"Invalid time: {value}")
+    return minute
+
+
+def _parse_days(key: str) -> Set[int]:
+    days = set()
+    for part in key.split(","):
+        first, _, last = part.strip().lower().partition("-")
+        start = DAY_NAMES.index(first.strip()[:3])
+        end = DAY_NAMES.index(last.strip()[:3]) if last else start
+        # Ranges may wrap around the week, e.g. "Sat-Mon"
+        days.update((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+    return days
+
+
+def _parse_intervals(value: str) -> Intervals:
+    if not value or value.strip().lower() == "closed":
+        return ()
+    intervals = []
+    for part in value.split(","):
+        open_time, _, close_time = part.partition("-")
+        open_minute, close_minute = _parse_time(open_time), _parse_time(close_time)
+        if close_minute <= open_minute:
+            raise ValueError(f"Invalid opening interval: {part}")
+        intervals.append((open_minute, close_minute))
+    return tuple(sorted(intervals))
+
+
+def parse_opening_hours(raw: Optional[str]) -> WeeklyHours:
+    """
+    Compile a branch's opening hours JSON, e.g.
+    {"Mon-Fri": "9:00-20:00", "Sat": "10:00-12:00,13:00-18:00", "Sun": "Closed"}.
+    Days that are not listed are closed.
+    """
+    if not raw:
+        return DEFAULT_HOURS
+
+    try:
+        spec = json.loads(raw)
+        days = [()] * 7
+        for key, value in spec.items():
+            intervals = _parse_intervals(value)
+            for weekday in _parse_days(key):
+                days[weekday] = intervals
+        return WeeklyHours(tuple(days))
+    except (ValueError, AttributeError, TypeError) as e:
+        logger.warning(f"Invalid opening hours {raw!r}, using defaults: {e}")
+        return DEFAULT_HOURS
+
+
+class OpeningHoursCache:
+    """
+    Process-wide cache of compiled opening hours per branch. Entries are dropped
+    when a branch row is written, once the change is committed, or after
+    ttl_seconds for changes made by other workers.
+    """
+
+    def __init__(self, ttl_seconds: float = OPENING_HOURS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._hours: Dict[int, Tuple[float, WeeklyHours]] = {}
+        # Bumped by invalidate, so hours loaded before a change are not kept
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, branch_id: int) -> WeeklyHours:
+        return self.get_many(db, [branch_id])[branch_id]
+
+    def get_many(self, db: Session, branch_ids) -> Dict[int, WeeklyHours]:
+        now = time.monotonic()
+        found = {}
+        for branch_id in branch_ids:
+            entry = self._hours.get(branch_id)
+            if entry is not None and entry[0] > now:
+                found[branch_id] = entry[1]
+        missing = [branch_id for branch_id in branch_ids if branch_id not in found]
+        if missing:
+            generation = self._generation
+            rows = db.query(Branch.id, Branch.opening_hours).filter(Branch.id.in_(missing))
+            compiled = {branch_id: parse_opening_hours(raw) for branch_id, raw in rows}
+            found.update(compiled)
+            # A lagging replica could re-cache hours that were just changed,
+            # and so could this session's uncommitted branch changes
+            if not is_read_only(db) and not db.info.get("changed_branches"):
+                expires_at = now + self.ttl_seconds
+                with self._lock:
+                    if generation == self._generation:
+                        self._hours.update(
+                            (branch_id, (expires_at, hours)) for branch_id, hours in compiled.items()
+                        )
+        return {branch_id: found.get(branch_id, DEFAULT_HOURS) for branch_id in branch_ids}
+
+    def invalidate(self, branch_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if branch_id is None:
+                self._hours.clear()
+            else:
+                self._hours.pop(branch_id, None)
+
+
+opening_hours_cache = OpeningHoursCache()
+
+
+@event.listens_for(Branch, "after_insert")
+@event.listens_for(Branch, "after_update")
+@event.listens_for(Branch, "after_delete")
+def _mark_branch_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_branches", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_branches(session):
+    for branch_id in session.info.pop("changed_branches", ()):
+        opening_hours_cache.invalidate(branch_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_branches(session):
+    session.info.pop("changed_branches", None)
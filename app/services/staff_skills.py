@@ -0,0 +1,154 @@
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from app.db.replicas import is_read_only
+from app.models import Staff, StaffSkill
+from app.models.staff import normalize_skill
+
+# Commits in other worker processes cannot invalidate this process's index,
+# so it is reloaded at least this often
+SKILL_INDEX_TTL_SECONDS = 30.0
+
+
+class SkillIndex:
+    """
+    Active staff per branch, keyed by skill. Resolved (branch, category)
+    lookups are memoized, so after the first call for a pair eligibility is a
+    single dict lookup.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, int, Optional[str]]]):
+        """
+        rows are (staff_id, branch_id, skill) for every active staff member,
+        with skill None for staff without any
+        """
+        branch_staff: Dict[int, set] = {}
+        by_skill: Dict[Tuple[int, str], set] = {}
+        skilled: Dict[int, set] = {}
+        for staff_id, branch_id, skill in rows:
+            branch_staff.setdefault(branch_id, set()).add(staff_id)
+            if skill is not None:
+                by_skill.setdefault((branch_id, skill), set()).add(staff_id)
+                skilled.setdefault(branch_id, set()).add(staff_id)
+
+        self.branch_staff: Dict[int, FrozenSet[int]] = {
+            branch_id: frozenset(staff) for branch_id, staff in branch_staff.items()
+        }
+        self.by_skill: Dict[Tuple[int, str], FrozenSet[int]] = {
+            key: frozenset(staff) for key, staff in by_skill.items()
+        }
+        # Staff without listed skills are generalists
+        self.generalists: Dict[int, FrozenSet[int]] = {
+            branch_id: staff - skilled.get(branch_id, frozenset())
+            for branch_id, staff in self.branch_staff.items()
+        }
+        self._resolved: Dict[Tuple[int, str], Tuple[int, ...]] = {}
+
+    def eligible(self, branch_id: int, category: Optional[str]) -> Tuple[int, ...]:
+        """
+        Active staff at a branch who can provide a service of this category,
+        ordered by id. Uncategorized services can be provided by everyone.
+        """
+        skill = normalize_skill(category)
+        key = (branch_id, skill)
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            if skill:
+                staff = self.by_skill.get(key, frozenset()) | self.generalists.get(branch_id, frozenset())
+            else:
+                staff = self.branch_staff.get(branch_id, frozenset())
+            resolved = self._resolved.setdefault(key, tuple(sorted(staff)))
+        return resolved
+
+
+class StaffSkillCache:
+    """
+    Process-wide skill index, loaded with one query on first use and dropped
+    whenever a staff member or one of their skills is written, once the change
+    is committed, or after ttl_seconds for changes made by other workers.
+    """
+
+    def __init__(self, ttl_seconds: float = SKILL_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._index: Optional[SkillIndex] = None
+        self._expires_at = 0.0
+        # Bumped by invalidate, so an index loaded before a change is not kept
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> SkillIndex:
+        index = self._index
+        if index is None or time.monotonic() >= self._expires_at:
+            generation = self._generation
+            loaded_at = time.monotonic()
+            index = self._load(db)
+            # Never keep an index that saw this session's uncommitted staff
+            # changes, or a lagging replica's view
+            if not is_read_only(db) and not db.info.get("staff_skills_changed"):
+                with self._lock:
+                    if generation == self._generation:
+                        self._index = index
+                        self._expires_at = loaded_at + self.ttl_seconds
+        return index
+
+    def eligible_staff(
+        self,
+        db: Session,
+        branch_ids: List[int],
+        category: Optional[str],
+        staff_ids: Optional[List[int]] = None
+    ) -> Dict[int, List[int]]:
+        """
+        Eligible staff per branch, optionally narrowed to staff_ids
+        """
+        index = self.get(db)
+        wanted = set(staff_ids) if staff_ids else None
+        return {
+            branch_id: [
+                staff_id for staff_id in index.eligible(branch_id, category)
+                if wanted is None or staff_id in wanted
+            ]
+            for branch_id in branch_ids
+        }
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+            self._generation += 1
+
+    @staticmethod
+    def _load(db: Session) -> SkillIndex:
+        rows = db.execute(
+            select(Staff.id, Staff.branch_id, StaffSkill.skill).outerjoin(
+                StaffSkill, StaffSkill.staff_id == Staff.id
+            ).where(Staff.is_active.isnot(False))
+        )
+        return SkillIndex(rows)
+
+
+staff_skill_cache = StaffSkillCache()
+
+
+@event.listens_for(Staff, "after_insert")
+@event.listens_for(Staff, "after_update")
+@event.listens_for(Staff, "after_delete")
+@event.listens_for(StaffSkill, "after_insert")
+@event.listens_for(StaffSkill, "after_update")
+@event.listens_for(StaffSkill, "after_delete")
+def _mark_staff_skills_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["staff_skills_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_staff_skills(session):
+    if session.info.pop("staff_skills_changed", False):
+        staff_skill_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staff_skills_changes(session):
+    session.info.pop("staff_skills_changed", None)
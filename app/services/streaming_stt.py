@@ -0,0 +1,204 @@
+"""
+Streaming speech recognition: voice-activity segmentation of incoming PCM
+frames with partial transcripts while the caller is still speaking
+"""
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+import numpy as np
+from app.core.exceptions import ServiceUnavailableError
+from app.services.audio import SAMPLE_RATE, resample
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 30
+# Kept from before speech starts, so the first syllable is not clipped
+PRE_ROLL_MS = 300
+# Whisper's window; longer speech is finalized and a new utterance started
+MAX_UTTERANCE_SECONDS = 30
+
+
+def frame_level_db(frame: np.ndarray) -> float:
+    """
+    RMS level of float samples in dBFS
+    """
+    rms = float(np.sqrt(np.mean(np.square(frame, dtype=np.float64))))
+    return 20 * np.log10(max(rms, 1e-10))
+
+
+class EnergyVAD:
+    """
+    Frame-level voice activity from energy above an adaptive noise floor.
+    Speech starts after min_speech_ms of voiced frames and ends after
+    end_silence_ms of unvoiced ones.
+    """
+
+    def __init__(
+        self,
+        threshold_db: float = 12.0,
+        min_level_db: float = -50.0,
+        min_speech_ms: int = 90,
+        end_silence_ms: int = 600
+    ):
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.start_frames = max(min_speech_ms // FRAME_MS, 1)
+        self.end_frames = max(end_silence_ms // FRAME_MS, 1)
+        self.noise_floor_db: Optional[float] = None
+        self.in_speech = False
+        self._run = 0  # Consecutive frames disagreeing with the current state
+
+    def reset(self) -> None:
+        """
+        Back to silence, keeping the learned noise floor
+        """
+        self.in_speech = False
+        self._run = 0
+
+    def is_voiced(self, frame: np.ndarray) -> bool:
+        level = frame_level_db(frame)
+        if self.noise_floor_db is None:
+            self.noise_floor_db = level
+        voiced = level > max(self.noise_floor_db + self.threshold_db, self.min_level_db)
+        if not voiced:
+            # Track the floor down quickly and up slowly
+            rate = 0.5 if level < self.noise_floor_db else 0.05
+            self.noise_floor_db += rate * (level - self.noise_floor_db)
+        return voiced
+
+    def update(self, frame: np.ndarray) -> Optional[str]:
+        """
+        Feed one frame; returns "start" or "end" when the state changes
+        """
+        voiced = self.is_voiced(frame)
+        if voiced != self.in_speech:
+            self._run += 1
+            if self._run >= (self.end_frames if self.in_speech else self.start_frames):
+                self.in_speech = voiced
+                self._run = 0
+                return "start" if voiced else "end"
+        else:
+            self._run = 0
+        return None
+
+
+class StreamingTranscriber:
+    """
+    Turns a stream of 16-bit mono PCM chunks into transcript events: a
+    "partial" transcript of the utterance so far every partial_interval
+    seconds of speech, and a "final" one once the VAD detects end of speech.
+    Audio is segmented at the client's sample rate and each utterance is
+    resampled as a whole when it is transcribed.
+
+    A final that cannot be transcribed because speech recognition is busy is
+    kept, reported as an "error" event, and retried after its Retry-After on
+    later chunks or at flush, so no speech is lost.
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray], Awaitable[str]],
+        sample_rate: int = SAMPLE_RATE,
+        partial_interval: float = 1.0,
+        vad: Optional[EnergyVAD] = None
+    ):
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.partial_samples = int(partial_interval * sample_rate)
+        self.max_utterance_samples = MAX_UTTERANCE_SECONDS * sample_rate
+        self.vad = vad or EnergyVAD()
+        self.frame_samples = max(sample_rate * FRAME_MS // 1000, 1)
+        self._pending = np.zeros(0, dtype=np.float32)  # Less than a frame, not yet classified
+        self._pre_roll: List[np.ndarray] = []
+        self._utterance: List[np.ndarray] = []
+        self._utterance_samples = 0
+        self._since_partial = 0
+        self._odd_byte = b""
+        # Finished utterances still owed a final transcript, oldest first
+        self._finals: List[np.ndarray] = []
+        self._retry_at = 0.0
+
+    def _samples(self, data: bytes) -> np.ndarray:
+        data = self._odd_byte + data
+        usable = len(data) - len(data) % 2
+        self._odd_byte = data[usable:]
+        return np.frombuffer(data, dtype="<i2", count=usable // 2).astype(np.float32) / 32768.0
+
+    async def feed(self, data: bytes) -> List[Dict[str, str]]:
+        events = await self._send_finals()
+        samples = np.concatenate([self._pending, self._samples(data)])
+        usable = len(samples) - len(samples) % self.frame_samples
+        self._pending = samples[usable:]
+        for frame in samples[:usable].reshape(-1, self.frame_samples):
+            change = self.vad.update(frame)
+            if change == "start":
+                self._utterance = self._pre_roll
+                self._utterance_samples = sum(len(chunk) for chunk in self._pre_roll)
+                self._pre_roll = []
+            if self.vad.in_speech or change == "end":
+                self._utterance.append(frame)
+                self._utterance_samples += len(frame)
+                self._since_partial += len(frame)
+            else:
+                self._pre_roll = (self._pre_roll + [frame])[-(PRE_ROLL_MS // FRAME_MS):]
+
+            if change == "end" or self._utterance_samples >= self.max_utterance_samples:
+                self._end_utterance()
+                events.extend(await self._send_finals())
+            elif self.vad.in_speech and self._since_partial >= self.partial_samples and not self._finals:
+                partial = await self._partial()
+                if partial:
+                    events.append(partial)
+        return events
+
+    async def flush(self) -> List[Dict[str, str]]:
+        """
+        Finalize whatever has been said, for callers that signal the end of
+        their turn explicitly. Finals held back by a busy recognizer are
+        retried straight away.
+        """
+        if self._utterance:
+            self.vad.reset()
+            self._end_utterance()
+        return await self._send_finals(wait=False)
+
+    async def _transcribe(self, samples: np.ndarray) -> str:
+        return await self.transcribe(resample(samples, self.sample_rate))
+
+    async def _partial(self) -> Optional[Dict[str, str]]:
+        self._since_partial = 0
+        try:
+            text = await self._transcribe(np.concatenate(self._utterance))
+        except ServiceUnavailableError:
+            # Partials are best effort; the final transcript still follows
+            logger.info("Skipping partial transcript, speech recognition is busy")
+            return None
+        return {"type": "partial", "text": text}
+
+    def _end_utterance(self) -> None:
+        self._finals.append(np.concatenate(self._utterance))
+        self._utterance = []
+        self._utterance_samples = 0
+        self._since_partial = 0
+
+    async def _send_finals(self, wait: bool = True) -> List[Dict[str, str]]:
+        events = []
+        if wait and time.monotonic() < self._retry_at:
+            return events
+        while self._finals:
+            try:
+                text = await self._transcribe(self._finals[0])
+            except ServiceUnavailableError as e:
+                retry_after = e.headers["Retry-After"]
+                self._retry_at = time.monotonic() + int(retry_after)
+                logger.info(f"Holding final transcript, speech recognition is busy for {retry_after}s")
+                events.append({
+                    "type": "error",
+                    "status_code": e.status_code,
+                    "detail": e.detail,
+                    "retry_after": retry_after
+                })
+                break
+            self._finals.pop(0)
+            events.append({"type": "final", "text": text})
+        return events
@@ -0,0 +1,118 @@
+"""
+Micro-batching of Whisper inference across concurrent transcriptions
+"""
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+import torch
+import whisper
+from app.core.metrics import metrics
+
+STT_BATCH_SIZE = metrics.histogram(
+    "stt_batch_size",
+    "Utterances decoded together in one Whisper batch",
+    buckets=(1, 2, 4, 8, 16, 32)
+)
+
+
+def decode_windows(model: Any, utterances: List[np.ndarray], **options: Any) -> List[Dict[str, Any]]:
+    """
+    Decode utterances of at most 30 seconds as one batch: each is padded to
+    Whisper's 30-second window and the stacked log-mel spectrograms go through
+    the encoder and decoder together
+    """
+    device = getattr(model, "device", torch.device("cpu"))
+    mel = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(samples)), model.dims.n_mels)
+        for samples in utterances
+    ]).to(device)
+    decoding = whisper.DecodingOptions(fp16=device.type != "cpu", **options)
+    with torch.no_grad():
+        decoded = model.decode(mel, decoding)
+    return [{"text": result.text, "segments": [], "language": result.language} for result in decoded]
+
+
+def decode_batch(model: Any, utterances: List[np.ndarray], **options: Any) -> List[Dict[str, Any]]:
+    """
+    Transcribe 16 kHz float32 utterances, batching those that fit in one
+    30-second window. Single or longer utterances go through model.transcribe,
+    which also handles temperature fallback and multi-window audio.
+    """
+    short = [i for i, samples in enumerate(utterances) if len(samples) <= whisper.audio.N_SAMPLES]
+    if len(short) < 2:
+        short = []
+    batched = set(short)
+    results: List[Optional[Dict[str, Any]]] = [
+        None if i in batched else model.transcribe(samples, **options)
+        for i, samples in enumerate(utterances)
+    ]
+    if short:
+        for i, result in zip(short, decode_windows(model, [utterances[i] for i in short], **options)):
+            results[i] = result
+    return results
+
+
+class _Batch:
+    def __init__(self):
+        self.utterances: List[np.ndarray] = []
+        self.closed = False
+        self.done = threading.Event()
+        self.results: Optional[List[Dict[str, Any]]] = None
+        self.error: Optional[BaseException] = None
+
+
+class WhisperBatcher:
+    """
+    Groups transcriptions arriving within max_wait of each other into batches
+    of up to max_batch_size per model. Called from STT worker threads: the
+    first thread to arrive leads the batch, waits for companions, runs it and
+    hands every waiting thread its own result. Batches can therefore be no
+    larger than the number of STT workers.
+    """
+
+    def __init__(self, max_batch_size: int = 1, max_wait: float = 0.02):
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait
+        self._open: Dict[int, _Batch] = {}
+        self._condition = threading.Condition()
+
+    def transcribe(self, model: Any, samples: np.ndarray, **options: Any) -> Dict[str, Any]:
+        if self.max_batch_size == 1:
+            return model.transcribe(samples, **options)
+
+        key = id(model)
+        with self._condition:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+            index = len(batch.utterances)
+            batch.utterances.append(samples)
+            if len(batch.utterances) >= self.max_batch_size:
+                self._close(key, batch)
+
+        if leader:
+            with self._condition:
+                self._condition.wait_for(lambda: batch.closed, timeout=self.max_wait)
+                self._close(key, batch)
+            try:
+                batch.results = decode_batch(model, batch.utterances, **options)
+            except BaseException as e:
+                batch.error = e
+            finally:
+                STT_BATCH_SIZE.observe(len(batch.utterances))
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _close(self, key: int, batch: _Batch) -> None:
+        # Called with the condition held
+        if not batch.closed:
+            batch.closed = True
+            if self._open.get(key) is batch:
+                del self._open[key]
+            self._condition.notify_all()
@@ -0,0 +1,192 @@
+"""
+Bounded worker pool for speech-to-text inference, so transcription never
+blocks the event loop and overload is answered with a fast 503
+"""
+import asyncio
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.core.exceptions import ServiceUnavailableError
+from app.core.metrics import metrics
+
+# Weight of the latest job in the running average of job duration
+DURATION_SMOOTHING = 0.2
+MAX_RETRY_AFTER_SECONDS = 60
+
+STT_QUEUE_DEPTH = metrics.gauge("stt_queue_depth", "Transcriptions waiting for a free STT worker")
+STT_IN_FLIGHT = metrics.gauge("stt_in_flight", "Transcriptions currently running on STT workers")
+STT_QUEUE_WAIT = metrics.histogram(
+    "stt_queue_wait_seconds",
+    "Time a transcription waited for a free STT worker"
+)
+STT_DURATION = metrics.histogram(
+    "stt_inference_seconds",
+    "Time an STT worker spent on one transcription"
+)
+STT_REJECTED = metrics.counter(
+    "stt_rejected_total",
+    "Transcriptions refused with 503 because the STT queue was full"
+)
+
+
+def _timed_call(fn: Callable[..., Any], *args: Any) -> Tuple[float, float, Any]:
+    """
+    Run fn on a worker and report when it started and finished. Module level
+    so process pools can pickle it; time.time is comparable across processes.
+    """
+    started = time.time()
+    result = fn(*args)
+    return started, time.time(), result
+
+
+class SttExecutor:
+    """
+    Runs STT jobs on a thread or process pool of `workers`, admitting at most
+    `max_queue` more jobs to wait for a worker. Jobs beyond that are rejected
+    straight away with ServiceUnavailableError, whose Retry-After estimates
+    when the backlog will have drained.
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        workers: int = 1,
+        max_queue: int = 4,
+        initializer: Optional[Callable[..., Any]] = None,
+        initargs: Tuple[Any, ...] = ()
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unsupported STT executor: {mode}")
+        self.mode = mode
+        self.workers = max(workers, 1)
+        self.max_queue = max(max_queue, 0)
+        # Run once in each worker as it starts, e.g. to warm up its model
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._average_duration: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def uses_processes(self) -> bool:
+        """
+        Jobs must then be picklable module-level functions, and each worker
+        process holds its own copy of the model
+        """
+        return self.mode == "process"
+
+    def queue_depth(self) -> int:
+        return max(self._pending - self.workers, 0)
+
+    def in_flight(self) -> int:
+        return min(self._pending, self.workers)
+
+    def export_metrics(self) -> None:
+        """
+        Report this pool's queue depth and in-flight jobs as the STT gauges
+        """
+        STT_QUEUE_DEPTH.set_function(self.queue_depth)
+        STT_IN_FLIGHT.set_function(self.in_flight)
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.uses_processes:
+                    # Forking a process that already runs torch threads can deadlock
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=self.initializer,
+                        initargs=self.initargs
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="stt",
+                        initializer=self.initializer,
+                        initargs=self.initargs
+                    )
+            return self._executor
+
+    def start(self) -> None:
+        """
+        Start every worker process now rather than on first use, so their
+        initializer runs ahead of the first request. The pool only spawns a
+        process for a job no idle worker can take, and none is idle while the
+        first ones are still starting.
+        """
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(int)
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                STT_REJECTED.inc()
+                raise ServiceUnavailableError(
+                    "Speech recognition is busy, please retry shortly",
+                    retry_after=self._retry_after()
+                )
+            self._pending += 1
+
+    def _release(self, future: Any = None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _retry_after(self) -> int:
+        """
+        Seconds until a queue slot frees up, from the average job duration
+        """
+        if self._average_duration is None:
+            return 1
+        waves = (self._pending - self.workers + 1) / self.workers
+        return min(max(math.ceil(self._average_duration * waves), 1), MAX_RETRY_AFTER_SECONDS)
+
+    def _record(self, duration: float) -> None:
+        with self._lock:
+            if self._average_duration is None:
+                self._average_duration = duration
+            else:
+                self._average_duration += DURATION_SMOOTHING * (duration - self._average_duration)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run fn(*args) on a worker without blocking the event loop
+        """
+        self._admit()
+        submitted = time.time()
+        try:
+            future = self._get_executor().submit(_timed_call, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the worker is done, even if the caller stopped waiting
+        future.add_done_callback(self._release)
+        started, finished, result = await asyncio.wrap_future(future)
+        STT_QUEUE_WAIT.observe(max(started - submitted, 0.0))
+        STT_DURATION.observe(finished - started)
+        self._record(finished - started)
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight(),
+            "queue_depth": self.queue_depth(),
+            "completed": STT_DURATION.count(),
+            "queue_wait_seconds_total": STT_QUEUE_WAIT.sum(),
+            "queue_wait_seconds_p95_bucket": STT_QUEUE_WAIT.quantile(0.95),
+            "rejected": STT_REJECTED.value(),
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -10,18 +10,28 @@ import os
 from pathlib import Path
 import speech_recognition as sr
 from gtts import gTTS
-import whisper
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseSettings
 import ssl
-import certifi
 import urllib.request
 import logging
+import numpy as np
+from app.services.audio import decode_audio
+from app.services.stt_batching import WhisperBatcher
+from app.services.stt_executor import SttExecutor
+from app.services.whisper_models import transcribe_audio, transcribe_samples, warm_up_worker, whisper_models
 
 class VoiceServiceSettings(BaseSettings):
     WHISPER_MODEL: str = "tiny"  # Can be "tiny", "base", "small", "medium", "large"
     TTS_LANGUAGE: str = "en"
     TTS_PROVIDER: str = "gtts"  # Can be "gtts" or "google_cloud"
     STT_PROVIDER: str = "whisper"  # Can be "whisper" or "google_cloud"
+    WHISPER_PRELOAD: bool = False  # Load and warm up the model at startup instead of on first use
+    STT_EXECUTOR: str = "thread"  # Can be "thread" or "process"
+    STT_WORKERS: int = 1  # Transcriptions run in parallel
+    STT_MAX_QUEUE: int = 4  # Transcriptions waiting for a worker before new ones get 503
+    STT_BATCH_SIZE: int = 1  # Utterances decoded together by Whisper; at most STT_WORKERS
+    STT_BATCH_WAIT_MS: int = 20  # How long a batch waits for more utterances
     GOOGLE_CLOUD_CREDENTIALS: Optional[str] = None
 
     class Config:
@@ -38,9 +48,33 @@ VALID_SERVICES = {
     'styling': ['style', 'hair style', 'styling', 'hair styling']
 }
 
+def create_stt_executor(settings: VoiceServiceSettings) -> SttExecutor:
+    warm_up = settings.WHISPER_PRELOAD and settings.STT_PROVIDER == "whisper" and settings.STT_EXECUTOR == "process"
+    return SttExecutor(
+        mode=settings.STT_EXECUTOR,
+        workers=settings.STT_WORKERS,
+        max_queue=settings.STT_MAX_QUEUE,
+        # Worker processes use their own models, so those are the ones to warm
+        initializer=warm_up_worker if warm_up else None,
+        initargs=([settings.WHISPER_MODEL],) if warm_up else ()
+    )
+
+def create_stt_batcher(settings: VoiceServiceSettings) -> WhisperBatcher:
+    return WhisperBatcher(
+        max_batch_size=min(settings.STT_BATCH_SIZE, settings.STT_WORKERS),
+        max_wait=settings.STT_BATCH_WAIT_MS / 1000
+    )
+
+# Shared by every VoiceService, so the bound and batching apply to the whole process
+stt_executor = create_stt_executor(VoiceServiceSettings())
+stt_executor.export_metrics()
+stt_batcher = create_stt_batcher(VoiceServiceSettings())
+
 class VoiceService:
     def __init__(self):
         self.settings = VoiceServiceSettings()
+        self.stt_executor = stt_executor
+        self.stt_batcher = stt_batcher
         
         # Initialize optional Google Cloud clients
         self.speech_client = None
@@ -52,30 +86,52 @@ class VoiceService:
             except Exception as e:
                 print(f"Failed to initialize Google Cloud clients: {e}")
         
-        # Initialize Whisper model
-        if self.settings.STT_PROVIDER == "whisper":
-            try:
-                # Set SSL certificate verification for macOS
-                if os.path.exists("/private/etc/ssl/cert.pem"):
-                    os.environ["SSL_CERT_FILE"] = "/private/etc/ssl/cert.pem"
-                else:
-                    os.environ["SSL_CERT_FILE"] = certifi.where()
-                
-                # Start with tiny model for faster loading and testing
-                self.whisper_model = whisper.load_model(self.settings.WHISPER_MODEL)
-            except Exception as e:
-                print(f"Failed to load Whisper model: {e}")
-                # Fallback to using Google Cloud if available
-                if self.speech_client:
-                    print("Falling back to Google Cloud Speech-to-Text")
-                    self.settings.STT_PROVIDER = "google_cloud"
-                else:
-                    print("WARNING: No speech-to-text service available")
-                    self.settings.STT_PROVIDER = None
-        
+        # The Whisper model itself is shared through whisper_models and loaded
+        # on first use; this only overrides it (tests set their own)
+        self._whisper_model = None
+
         self.recognizer = sr.Recognizer()
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def whisper_model(self):
+        if self._whisper_model is not None:
+            return self._whisper_model
+        return whisper_models.get(self.settings.WHISPER_MODEL)
+
+    @whisper_model.setter
+    def whisper_model(self, model) -> None:
+        self._whisper_model = model
+
+    def _load_whisper_model(self) -> bool:
+        """
+        Make sure the Whisper model is available. With a process pool the
+        workers load their own copy, so nothing is loaded here.
+        """
+        if self.stt_executor.uses_processes and self._whisper_model is None:
+            return True
+        try:
+            self.whisper_model
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to load Whisper model: {e}")
+            return False
+
+    def _stt_provider(self) -> Optional[str]:
+        """
+        Provider for this call: the configured one, or if the Whisper model
+        cannot be loaded, Google Cloud when available and otherwise none. The
+        settings are left alone, so later calls try Whisper again.
+        """
+        provider = self.settings.STT_PROVIDER
+        if provider == "whisper" and not self._load_whisper_model():
+            if self.speech_client:
+                self.logger.warning("Falling back to Google Cloud Speech-to-Text")
+                return "google_cloud"
+            self.logger.error("No speech-to-text service available")
+            return None
+        return provider
+
     def validate_service(self, service_value: str) -> Tuple[Optional[str], bool]:
         """
         Validate if a service is offered by the salon.
@@ -123,6 +179,36 @@ class VoiceService:
             "entities": []
         }
 
+    async def converse(self, text: str, session_id: str) -> dict:
+        """
+        Run one transcribed user turn through Rasa, replacing the reply when
+        the requested service is not one the salon offers
+        """
+        from app.services.rasa_service import rasa_service
+
+        rasa_response = await rasa_service.detect_intent(text, session_id)
+        self.logger.info(f"Rasa response: {rasa_response}")
+
+        service_validation = None
+        service = self.extract_service_from_rasa(rasa_response)
+        if service:
+            normalized_service, is_valid = self.validate_service(service)
+            if not is_valid:
+                rasa_response = await self.handle_invalid_service(session_id, service)
+            service_validation = {
+                'service': service,
+                'normalized_service': normalized_service,
+                'is_valid': is_valid
+            }
+
+        return {
+            'session_id': session_id,
+            'user_text': text,
+            'bot_text': rasa_response['text'],
+            'rasa_response': rasa_response,
+            'service_validation': service_validation
+        }
+
     def extract_service_from_rasa(self, rasa_response: dict) -> Optional[str]:
         """
         Extract service entity from Rasa response.
@@ -139,17 +225,19 @@ class VoiceService:
         """Convert speech to text using the configured provider."""
         if not self.settings.STT_PROVIDER:
             raise ValueError("No speech-to-text service available")
-            
-        if self.settings.STT_PROVIDER == "whisper":
-            if not hasattr(self, 'whisper_model'):
-                raise ValueError("Whisper model not initialized")
+
+        provider = self._stt_provider()
+        if provider == "whisper":
             return await self._whisper_speech_to_text(audio_file)
-        elif self.settings.STT_PROVIDER == "google_cloud":
+        if provider is None:
+            raise ValueError("Whisper model not initialized")
+
+        if provider == "google_cloud":
             if not self.speech_client:
                 raise ValueError("Google Cloud Speech client not initialized")
             return await self._google_speech_to_text(audio_file)
         else:
-            raise ValueError(f"Unsupported STT provider: {self.settings.STT_PROVIDER}")
+            raise ValueError(f"Unsupported STT provider: {provider}")
 
     async def text_to_speech(self, text: str) -> bytes:
         """Convert text to speech using the configured provider."""
@@ -162,43 +250,50 @@ class VoiceService:
         else:
             raise ValueError(f"Unsupported TTS provider: {self.settings.TTS_PROVIDER}")
 
+    def _transcribe(self, samples: np.ndarray) -> dict:
+        return self.stt_batcher.transcribe(self.whisper_model, samples)
+
+    def _transcribe_audio(self, data: bytes) -> dict:
+        # Decoded in memory; Whisper takes the samples without touching disk
+        return self._transcribe(decode_audio(data))
+
+    async def _run_whisper(self, local, remote, payload) -> str:
+        if self.stt_executor.uses_processes and self._whisper_model is None:
+            # Worker processes load the model from their own registry
+            result = await self.stt_executor.run(remote, self.settings.WHISPER_MODEL, payload)
+        else:
+            result = await self.stt_executor.run(local, payload)
+        return result["text"].strip()
+
     async def _whisper_speech_to_text(self, audio_file: BinaryIO) -> str:
         """Use OpenAI's Whisper model for speech-to-text conversion."""
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            temp_file.write(audio_file.read())
-            temp_path = temp_file.name
+        return await self._run_whisper(self._transcribe_audio, transcribe_audio, audio_file.read())
 
-        try:
-            result = self.whisper_model.transcribe(temp_path)
-            return result["text"].strip()
-        finally:
-            os.unlink(temp_path)
+    async def transcribe_samples(self, samples: np.ndarray) -> str:
+        """
+        Transcribe 16 kHz mono float32 samples, as produced by streaming
+        recognition. Only Whisper can transcribe raw samples.
+        """
+        if self.settings.STT_PROVIDER != "whisper" or not self._load_whisper_model():
+            raise ValueError("Streaming speech recognition requires the Whisper provider")
+        return await self._run_whisper(self._transcribe, transcribe_samples, samples)
 
     async def _google_speech_to_text(self, audio_file: BinaryIO) -> str:
         """Use Google Cloud Speech-to-Text API."""
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            temp_file.write(audio_file.read())
-            temp_path = temp_file.name
+        audio = speech_v1.RecognitionAudio(content=audio_file.read())
+        config = speech_v1.RecognitionConfig(
+            encoding=speech_v1.RecognitionConfig.AudioEncoding.LINEAR16,
+            language_code="en-US",
+            model="default"
+        )
 
-        try:
-            with open(temp_path, "rb") as audio_file:
-                content = audio_file.read()
+        # Blocking network call, kept off the event loop
+        response = await run_in_threadpool(self.speech_client.recognize, config=config, audio=audio)
 
-            audio = speech_v1.RecognitionAudio(content=content)
-            config = speech_v1.RecognitionConfig(
-                encoding=speech_v1.RecognitionConfig.AudioEncoding.LINEAR16,
-                language_code="en-US",
-                model="default"
-            )
+        if not response.results:
+            return ""
 
-            response = self.speech_client.recognize(config=config, audio=audio)
-            
-            if not response.results:
-                return ""
-                
-            return response.results[0].alternatives[0].transcript
-        finally:
-            os.unlink(temp_path)
+        return response.results[0].alternatives[0].transcript
 
     async def _gtts_text_to_speech(self, text: str) -> bytes:
         """Use gTTS (Google Text-to-Speech) for text-to-speech conversion."""
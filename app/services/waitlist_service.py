@@ -0,0 +1,265 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.exceptions import AppointmentError, ValidationError
+from app.db.locks import async_staff_booking_lock, staff_booking_lock
+from app.db.session import AsyncSessionLocal
+from app.models import (
+    Appointment,
+    AppointmentStatus,
+    Branch,
+    Customer,
+    Service,
+    WaitlistEntry,
+    WaitlistStatus,
+)
+from app.services.appointment_service import appointment_to_dict
+
+logger = logging.getLogger(__name__)
+
+# Windows are capped in length so that matching a slot only has to look at
+# windows starting in [slot end - MAX_WAITLIST_WINDOW, slot start]: one index
+# seek plus a bounded range scan, however long the waitlist grows
+MAX_WAITLIST_WINDOW = timedelta(days=14)
+MAX_WAITLIST_WINDOWS = 10
+# Waiting entries considered per freed slot before giving up
+MAX_FILL_CANDIDATES = 20
+
+T = TypeVar("T")
+
+
+def waitlist_entry_to_dict(entry: WaitlistEntry) -> Dict[str, Any]:
+    return {
+        "id": entry.id,
+        "customer_id": entry.customer_id,
+        "service_id": entry.service_id,
+        "branch_id": entry.branch_id,
+        "staff_id": entry.staff_id,
+        "window_start": entry.window_start,
+        "window_end": entry.window_end,
+        "status": entry.status.value,
+        "appointment_id": entry.appointment_id
+    }
+
+
+class WaitlistService:
+    def __init__(self, db: Union[Session, AsyncSession]):
+        self.db = db
+
+    async def _run(self, method: Callable[..., T], **kwargs) -> T:
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(lambda session: method(WaitlistService(session), **kwargs))
+        return method(self, **kwargs)
+
+    async def join_waitlist(
+        self,
+        customer_id: int,
+        service_id: int,
+        branch_id: int,
+        windows: List[Tuple[datetime, datetime]],
+        staff_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Put a customer on the waitlist for a service at a branch, with one or
+        more acceptable (start, end) windows
+        """
+        return await self._run(
+            WaitlistService._join_waitlist,
+            customer_id=customer_id,
+            service_id=service_id,
+            branch_id=branch_id,
+            windows=windows,
+            staff_id=staff_id
+        )
+
+    async def leave_waitlist(self, entry_id: int) -> Dict[str, Any]:
+        """
+        Remove a waiting entry
+        """
+        return await self._run(WaitlistService._leave_waitlist, entry_id=entry_id)
+
+    async def get_customer_waitlist(self, customer_id: int) -> List[Dict[str, Any]]:
+        """
+        A customer's waiting entries, earliest window first
+        """
+        return await self._run(WaitlistService._get_customer_waitlist, customer_id=customer_id)
+
+    async def fill_slot(self, appointment_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Book the slot freed by a cancelled appointment for the longest-waiting
+        matching customer. Returns the new appointment, or None when the slot
+        was taken in the meantime or nobody on the waitlist fits.
+        """
+        staff_id = await self._run(WaitlistService._cancelled_staff, appointment_id=appointment_id)
+        if staff_id is None:
+            return None
+        async with async_staff_booking_lock(self.db, staff_id):
+            return await self._run(WaitlistService._fill_slot, appointment_id=appointment_id)
+
+    # Synchronous implementations, always called through _run
+
+    def _join_waitlist(
+        self,
+        customer_id: int,
+        service_id: int,
+        branch_id: int,
+        windows: List[Tuple[datetime, datetime]],
+        staff_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        if not 1 <= len(windows) <= MAX_WAITLIST_WINDOWS:
+            raise ValidationError(f"Between 1 and {MAX_WAITLIST_WINDOWS} windows are required")
+        for start, end in windows:
+            if end <= start:
+                raise ValidationError("Window end must be after its start")
+            if end - start > MAX_WAITLIST_WINDOW:
+                raise ValidationError(f"Windows cannot be longer than {MAX_WAITLIST_WINDOW.days} days")
+
+        if not self.db.get(Customer, customer_id):
+            raise AppointmentError("Customer not found")
+        if not self.db.get(Service, service_id):
+            raise AppointmentError("Service not found")
+        if not self.db.get(Branch, branch_id):
+            raise AppointmentError("Branch not found")
+
+        entries = [
+            WaitlistEntry(
+                customer_id=customer_id,
+                service_id=service_id,
+                branch_id=branch_id,
+                staff_id=staff_id,
+                window_start=start,
+                window_end=end,
+                status=WaitlistStatus.WAITING
+            )
+            for start, end in sorted(windows)
+        ]
+        self.db.add_all(entries)
+        self.db.commit()
+        return [waitlist_entry_to_dict(entry) for entry in entries]
+
+    def _leave_waitlist(self, entry_id: int) -> Dict[str, Any]:
+        entry = self.db.get(WaitlistEntry, entry_id)
+        if not entry:
+            raise AppointmentError("Waitlist entry not found")
+        if entry.status != WaitlistStatus.WAITING:
+            raise AppointmentError(f"Waitlist entry is already {entry.status.value}")
+        entry.status = WaitlistStatus.REMOVED
+        self.db.commit()
+        return waitlist_entry_to_dict(entry)
+
+    def _get_customer_waitlist(self, customer_id: int) -> List[Dict[str, Any]]:
+        entries = self.db.query(WaitlistEntry).filter(
+            WaitlistEntry.customer_id == customer_id,
+            WaitlistEntry.status == WaitlistStatus.WAITING
+        ).order_by(WaitlistEntry.window_start, WaitlistEntry.id)
+        return [waitlist_entry_to_dict(entry) for entry in entries]
+
+    def _cancelled_staff(self, appointment_id: int) -> Optional[int]:
+        return self.db.execute(
+            select(Appointment.staff_id).where(
+                Appointment.id == appointment_id,
+                Appointment.status == AppointmentStatus.CANCELLED
+            )
+        ).scalar()
+
+    def _candidates(self, slot: Appointment) -> List[WaitlistEntry]:
+        """
+        Waiting entries whose window covers the slot, oldest first
+        """
+        query = self.db.query(WaitlistEntry).filter(
+            WaitlistEntry.branch_id == slot.branch_id,
+            WaitlistEntry.service_id == slot.service_id,
+            WaitlistEntry.status == WaitlistStatus.WAITING,
+            WaitlistEntry.window_start >= slot.end_time - MAX_WAITLIST_WINDOW,
+            WaitlistEntry.window_start <= slot.appointment_time,
+            WaitlistEntry.window_end >= slot.end_time,
+            or_(WaitlistEntry.staff_id.is_(None), WaitlistEntry.staff_id == slot.staff_id)
+        ).order_by(
+            WaitlistEntry.created_at, WaitlistEntry.id
+        ).limit(MAX_FILL_CANDIDATES)
+        # Concurrent fillers on PostgreSQL skip entries another one is booking
+        if self.db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        return query.all()
+
+    def _overlaps(self, column, value: int, start: datetime, end: datetime) -> bool:
+        return self.db.query(Appointment.id).filter(
+            column == value,
+            Appointment.appointment_time < end,
+            Appointment.end_time > start,
+            Appointment.status != AppointmentStatus.CANCELLED
+        ).first() is not None
+
+    def _fill_slot(self, appointment_id: int) -> Optional[Dict[str, Any]]:
+        slot = self.db.get(Appointment, appointment_id)
+        if not slot or slot.status != AppointmentStatus.CANCELLED:
+            return None
+        start, end = slot.appointment_time, slot.end_time
+        # Appointment times are local wall-clock times, as when booking
+        if start <= datetime.now():
+            return None
+
+        # The booking and closing the customer's entries commit together, under
+        # the same per-staff lock as regular bookings
+        try:
+            with staff_booking_lock(self.db, slot.staff_id):
+                if self._overlaps(Appointment.staff_id, slot.staff_id, start, end):
+                    self.db.rollback()
+                    return None
+
+                for entry in self._candidates(slot):
+                    if self._overlaps(Appointment.customer_id, entry.customer_id, start, end):
+                        continue
+                    appointment = Appointment(
+                        customer_id=entry.customer_id,
+                        staff_id=slot.staff_id,
+                        service_id=slot.service_id,
+                        branch_id=slot.branch_id,
+                        appointment_time=start,
+                        end_time=end,
+                        notes="Booked from the waitlist",
+                        status=AppointmentStatus.SCHEDULED
+                    )
+                    self.db.add(appointment)
+                    self.db.flush()
+                    self.db.execute(
+                        update(WaitlistEntry).where(
+                            WaitlistEntry.customer_id == entry.customer_id,
+                            WaitlistEntry.service_id == entry.service_id,
+                            WaitlistEntry.branch_id == entry.branch_id,
+                            WaitlistEntry.status == WaitlistStatus.WAITING
+                        ).values(
+                            status=WaitlistStatus.BOOKED,
+                            appointment_id=appointment.id,
+                            updated_at=datetime.utcnow()
+                        ).execution_options(synchronize_session=False)
+                    )
+                    self.db.commit()
+                    logger.info(
+                        f"Waitlist entry {entry.id} booked into appointment {appointment.id} "
+                        f"freed by cancelled appointment {appointment_id}"
+                    )
+                    return appointment_to_dict(appointment)
+
+                self.db.rollback()
+                return None
+        except IntegrityError:
+            # The PostgreSQL exclusion constraint caught an overlap
+            self.db.rollback()
+            return None
+
+
+async def fill_cancelled_slot(appointment_id: int, session_factory=AsyncSessionLocal) -> None:
+    """
+    Background task run after a cancellation. Uses its own session, since the
+    request's session is closed by the time it runs.
+    """
+    try:
+        async with session_factory() as db:
+            await WaitlistService(db).fill_slot(appointment_id)
+    except Exception as e:
+        logger.error(f"Waitlist fill for cancelled appointment {appointment_id} failed: {e}")
@@ -0,0 +1,147 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional
+import certifi
+import numpy as np
+import whisper
+from app.core.metrics import metrics
+from app.services.audio import decode_audio
+
+logger = logging.getLogger(__name__)
+
+# One second of silence at Whisper's input rate, enough to run every stage of
+# transcribe once
+WARM_UP_SECONDS = 1
+
+model_memory = metrics.gauge(
+    "whisper_model_memory_bytes",
+    "Parameter and buffer memory of each loaded Whisper model"
+)
+model_load_seconds = metrics.gauge(
+    "whisper_model_load_seconds",
+    "Time taken to load each Whisper model"
+)
+
+
+def load_whisper_model(name: str) -> Any:
+    # Set SSL certificate verification for macOS, used to download weights
+    if os.path.exists("/private/etc/ssl/cert.pem"):
+        os.environ["SSL_CERT_FILE"] = "/private/etc/ssl/cert.pem"
+    else:
+        os.environ["SSL_CERT_FILE"] = certifi.where()
+    return whisper.load_model(name)
+
+
+def model_footprint(model: Any) -> Optional[int]:
+    """
+    Bytes held by a torch model's parameters and buffers, or None for objects
+    that are not torch modules
+    """
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    except (AttributeError, TypeError):
+        return None
+
+
+class WhisperModelRegistry:
+    """
+    Process-wide Whisper models, each loaded once on first use (or by warm_up at
+    startup) and shared by every request. Loads of different models can run in
+    parallel; concurrent requests for the same model wait for a single load.
+    """
+
+    def __init__(self, loader: Callable[[str], Any] = load_whisper_model):
+        self.loader = loader
+        self._models: Dict[str, Any] = {}
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._locks = defaultdict(threading.Lock)
+        self._guard = threading.Lock()
+
+    def _lock(self, name: str) -> threading.Lock:
+        with self._guard:
+            return self._locks[name]
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock(name):
+            model = self._models.get(name)
+            if model is None:
+                started = time.perf_counter()
+                model = self.loader(name)
+                elapsed = time.perf_counter() - started
+                footprint = model_footprint(model)
+                self._info[name] = {
+                    "load_seconds": round(elapsed, 3),
+                    "memory_bytes": footprint,
+                    "device": str(getattr(model, "device", "")) or None,
+                    "warm_up_seconds": None
+                }
+                self._models[name] = model
+                model_load_seconds.set(elapsed, {"model": name})
+                if footprint is not None:
+                    model_memory.set(footprint, {"model": name})
+                logger.info(f"Loaded Whisper model {name} in {elapsed:.1f}s")
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warm_up(self, names: Iterable[str]) -> Dict[str, float]:
+        """
+        Load each model and run it once on silence, so the first real request
+        does not pay for lazy initialization. Returns seconds spent per model.
+        """
+        timings = {}
+        for name in names:
+            started = time.perf_counter()
+            model = self.get(name)
+            model.transcribe(np.zeros(whisper.audio.SAMPLE_RATE * WARM_UP_SECONDS, dtype=np.float32))
+            timings[name] = time.perf_counter() - started
+            self._info[name]["warm_up_seconds"] = round(timings[name], 3)
+        return timings
+
+    def info(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Load time, warm-up time, device and memory footprint of each loaded model
+        """
+        return {name: dict(details) for name, details in self._info.items()}
+
+    def unload(self, name: Optional[str] = None) -> None:
+        with self._guard:
+            names = [name] if name else list(self._models)
+            for model_name in names:
+                self._models.pop(model_name, None)
+                self._info.pop(model_name, None)
+                model_memory.set(0, {"model": model_name})
+
+
+whisper_models = WhisperModelRegistry()
+
+
+def warm_up_worker(names: Iterable[str]) -> None:
+    """
+    STT worker initializer. Failures are only logged, since a raising
+    initializer would break the whole pool; the model then loads on first use.
+    """
+    try:
+        whisper_models.warm_up(names)
+    except Exception as e:
+        logger.error(f"Whisper warm-up failed, loading on first use instead: {e}")
+
+
+def transcribe_samples(name: str, samples: np.ndarray) -> Dict[str, Any]:
+    """
+    Transcribe 16 kHz float32 samples with a registry model. Module level so
+    an STT process pool can run it, each worker process loading its own model.
+    """
+    return whisper_models.get(name).transcribe(samples)
+
+
+def transcribe_audio(name: str, data: bytes) -> Dict[str, Any]:
+    return transcribe_samples(name, decode_audio(data))
@@ -0,0 +1,21 @@
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.main import app
+
+def test_occupancy_rebuild_requires_the_admin_key(monkeypatch):
+    rebuild = AsyncMock(return_value=3)
+    monkeypatch.setattr("app.api.api_v1.endpoints.analytics.OccupancyRollupService.rebuild", rebuild)
+    client = TestClient(app)
+
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", None)
+    assert client.post("/api/v1/analytics/occupancy/rebuild", headers={"X-Admin-Key": "secret"}).status_code == 403
+
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "secret")
+    assert client.post("/api/v1/analytics/occupancy/rebuild").status_code == 401
+    assert client.post("/api/v1/analytics/occupancy/rebuild", headers={"X-Admin-Key": "wrong"}).status_code == 401
+    rebuild.assert_not_awaited()
+
+    response = client.post("/api/v1/analytics/occupancy/rebuild", headers={"X-Admin-Key": "secret"})
+    assert response.status_code == 200
+    assert response.json() == {"rows": 3}
@@ -5,6 +5,7 @@ from fastapi.testclient import TestClient
 from unittest.mock import Mock, AsyncMock
 from app.main import app
 from app.services.appointment_service import AppointmentService
+from app.services.availability_cache import availability_cache, branch_day_version
 from app.models import AppointmentStatus
 
 # Add this at the top of your test file
@@ -25,6 +26,9 @@ def mock_appointment_service():
     service.get_appointment = AsyncMock()
     service.cancel_appointment = AsyncMock()
     service.check_availability = AsyncMock()
+    service.check_availability_range = AsyncMock()
+    service.get_appointment_version = AsyncMock(return_value=None)
+    service.find_next_available = AsyncMock()
     return service
 
 # Patch the AppointmentService initialization
@@ -92,26 +96,52 @@ async def test_create_appointment_failure(client, mock_appointment_service, samp
 
 # Tests for get_appointments
 async def test_get_appointments_success(client, mock_appointment_service, sample_appointment_response):
-    mock_appointment_service.get_customer_appointments.return_value = [sample_appointment_response]
+    mock_appointment_service.get_customer_appointments.return_value = {
+        "items": [sample_appointment_response],
+        "next_cursor": None
+    }
     
     response = client.get("/api/v1/appointments/", params={"customer_id": "1"})
     
     assert response.status_code == 200
     assert response.json() == [sample_appointment_response]
+    assert "X-Next-Cursor" not in response.headers
     mock_appointment_service.get_customer_appointments.assert_awaited_once_with(
         customer_id=1,
         start_date=None,
-        end_date=None
+        end_date=None,
+        limit=100,
+        cursor=None
     )
 
 async def test_get_appointments_empty(client, mock_appointment_service):
-    mock_appointment_service.get_customer_appointments.return_value = []
+    mock_appointment_service.get_customer_appointments.return_value = {"items": [], "next_cursor": None}
     
     response = client.get("/api/v1/appointments/")
     
     assert response.status_code == 200
     assert response.json() == []
 
+async def test_get_appointments_next_page(client, mock_appointment_service, sample_appointment_response):
+    mock_appointment_service.get_customer_appointments.return_value = {
+        "items": [sample_appointment_response],
+        "next_cursor": "next-page"
+    }
+
+    response = client.get("/api/v1/appointments/", params={"limit": "1", "cursor": "this-page"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Next-Cursor"] == "next-page"
+    kwargs = mock_appointment_service.get_customer_appointments.await_args.kwargs
+    assert kwargs["limit"] == 1
+    assert kwargs["cursor"] == "this-page"
+
+async def test_get_appointments_page_size_is_capped(client, mock_appointment_service):
+    response = client.get("/api/v1/appointments/", params={"limit": "501"})
+
+    assert response.status_code == 422
+    mock_appointment_service.get_customer_appointments.assert_not_awaited()
+
 # Tests for get_appointment
 async def test_get_appointment_success(client, mock_appointment_service, sample_appointment_response):
     mock_appointment_service.get_appointment.return_value = sample_appointment_response
@@ -131,24 +161,31 @@ async def test_get_appointment_not_found(client, mock_appointment_service):
     assert "Appointment not found" in response.json()["detail"]
 
 # Tests for cancel_appointment
-async def test_cancel_appointment_success(client, mock_appointment_service, sample_appointment_response):
+async def test_cancel_appointment_success(client, mock_appointment_service, sample_appointment_response, monkeypatch):
     cancelled_appointment = dict(sample_appointment_response)
     cancelled_appointment["status"] = "CANCELLED"
     mock_appointment_service.cancel_appointment.return_value = cancelled_appointment
+    fill_cancelled_slot = AsyncMock()
+    monkeypatch.setattr("app.api.api_v1.endpoints.appointments.fill_cancelled_slot", fill_cancelled_slot)
     
     response = client.post("/api/v1/appointments/1/cancel")
     
     assert response.status_code == 200
     assert response.json()["status"] == "CANCELLED"
     mock_appointment_service.cancel_appointment.assert_awaited_once_with(appointment_id=1)
+    # The waitlist is offered the slot in a background task
+    fill_cancelled_slot.assert_awaited_once_with(1)
 
-async def test_cancel_appointment_not_found(client, mock_appointment_service):
+async def test_cancel_appointment_not_found(client, mock_appointment_service, monkeypatch):
     mock_appointment_service.cancel_appointment.side_effect = HTTPException(status_code=404, detail="Appointment not found")
+    fill_cancelled_slot = AsyncMock()
+    monkeypatch.setattr("app.api.api_v1.endpoints.appointments.fill_cancelled_slot", fill_cancelled_slot)
     
     response = client.post("/api/v1/appointments/999/cancel")
     
     assert response.status_code == 404
     assert "Appointment not found" in response.json()["detail"]
+    fill_cancelled_slot.assert_not_awaited()
 
 # Tests for check_availability
 async def test_check_availability_success(client, mock_appointment_service):
@@ -196,4 +233,186 @@ async def test_check_availability_no_slots(client, mock_appointment_service):
     print(response.json())
     
     assert response.status_code == 200
-    assert response.json() == [] 
\ No newline at end of file
+    assert response.json() == []
+
+async def test_check_availability_range_success(client, mock_appointment_service):
+    slot_matrix = {
+        "service_id": 1,
+        "duration_minutes": 60,
+        "dates": ["2024-03-10", "2024-03-11"],
+        "slot_times": ["09:00", "09:30"],
+        "branches": [{"branch_id": 1, "days": ["10", "11"]}]
+    }
+    mock_appointment_service.check_availability_range.return_value = slot_matrix
+
+    response = client.get(
+        "/api/v1/appointments/availability/range",
+        params={
+            "service_id": 1,
+            "start_date": datetime(2024, 3, 10).isoformat(),
+            "end_date": datetime(2024, 3, 11).isoformat(),
+            "branch_ids": [1, 2]
+        }
+    )
+
+    assert response.status_code == 200
+    assert response.json() == slot_matrix
+    mock_appointment_service.check_availability_range.assert_awaited_once_with(
+        service_id=1,
+        start_date=datetime(2024, 3, 10),
+        end_date=datetime(2024, 3, 11),
+        branch_ids=[1, 2],
+        staff_ids=None
+    )
+
+async def test_availability_cache_stats(client):
+    response = client.get("/api/v1/appointments/availability/cache-stats")
+
+    assert response.status_code == 200
+    assert {"hits", "misses", "hit_rate", "size"} <= set(response.json())
+
+async def test_import_appointments_returns_report(client, monkeypatch):
+    report = {"total_rows": 1, "valid_rows": 1, "imported": 1, "failed": 0, "dry_run": False, "errors": []}
+    import_service = Mock()
+    import_service.import_stream.return_value = report
+    monkeypatch.setattr(
+        "app.api.api_v1.endpoints.appointments.AppointmentImportService",
+        lambda db: import_service
+    )
+
+    response = client.post(
+        "/api/v1/appointments/import",
+        files={"file": ("bookings.ndjson", b'{"customer_id": 1}\n', "application/x-ndjson")}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == report
+    assert import_service.import_stream.call_args.args[1:] == ("ndjson", False)
+
+async def test_import_appointments_rejects_unknown_format(client):
+    response = client.post(
+        "/api/v1/appointments/import",
+        params={"format": "xml"},
+        files={"file": ("bookings.xml", b"<xml/>", "application/xml")}
+    )
+
+    assert response.status_code == 422
+
+async def test_metrics_endpoint_exports_pool_telemetry(client):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE db_pool_checkout_wait_seconds histogram" in response.text
+
+async def test_export_appointments_streams_rows(client, monkeypatch):
+    calls = {}
+
+    class FakeExportService:
+        def __init__(self, db):
+            pass
+
+        async def export(self, fmt, **filters):
+            calls.update(filters, fmt=fmt)
+            yield '{"id": 1}\n'
+            yield '{"id": 2}\n'
+
+    monkeypatch.setattr("app.api.api_v1.endpoints.appointments.AppointmentExportService", FakeExportService)
+
+    response = client.get("/api/v1/appointments/export", params={"status": "cancelled", "customer_id": "3"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text == '{"id": 1}\n{"id": 2}\n'
+    assert calls["fmt"] == "ndjson"
+    assert calls["customer_id"] == 3
+    assert calls["status"] == AppointmentStatus.CANCELLED
+
+async def test_export_appointments_rejects_unknown_format(client):
+    response = client.get("/api/v1/appointments/export", params={"format": "xlsx"})
+
+    assert response.status_code == 422
+
+async def test_get_appointment_returns_304_for_matching_etag(client, mock_appointment_service, sample_appointment_response):
+    mock_appointment_service.get_appointment_version.return_value = datetime(2024, 3, 1, 12, 0)
+    mock_appointment_service.get_appointment.return_value = sample_appointment_response
+
+    first = client.get("/api/v1/appointments/1")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    repeat = client.get("/api/v1/appointments/1", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.headers["ETag"] == etag
+    assert mock_appointment_service.get_appointment.await_count == 1
+
+    mock_appointment_service.get_appointment_version.return_value = datetime(2024, 3, 1, 12, 5)
+    changed = client.get("/api/v1/appointments/1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+async def test_check_availability_returns_304_without_computing_slots(client, mock_appointment_service):
+    mock_appointment_service.check_availability.return_value = []
+    params = {"branch_id": "1", "service_id": "1", "date": "2024-03-10T00:00:00"}
+
+    first = client.get("/api/v1/appointments/availability", params=params)
+    etag = first.headers["ETag"]
+    repeat = client.get("/api/v1/appointments/availability", params=params, headers={"If-None-Match": f'"other", {etag}'})
+
+    assert repeat.status_code == 304
+    assert mock_appointment_service.check_availability.await_count == 1
+
+    availability_cache.bump_versions([branch_day_version(1, datetime(2024, 3, 10).date())])
+    changed = client.get("/api/v1/appointments/availability", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert mock_appointment_service.check_availability.await_count == 2
+
+async def test_find_next_available(client, mock_appointment_service):
+    option = {
+        "appointment_time": "2024-03-11T09:00:00",
+        "end_time": "2024-03-11T10:00:00",
+        "branch_id": 1,
+        "staff_id": 2
+    }
+    mock_appointment_service.find_next_available.return_value = [option]
+
+    response = client.get(
+        "/api/v1/appointments/availability/next",
+        params={"service_id": "3", "branch_ids": ["1", "2"], "limit": "3"}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [option]
+    mock_appointment_service.find_next_available.assert_awaited_once_with(
+        service_id=3,
+        after=None,
+        branch_ids=[1, 2],
+        staff_ids=None,
+        limit=3
+    )
+
+async def test_export_streams_from_its_own_session(client, monkeypatch):
+    sessions = []
+
+    class FakeSession:
+        async def __aenter__(self):
+            sessions.append("open")
+            return self
+
+        async def __aexit__(self, *exc_info):
+            sessions.append("closed")
+
+    class FakeExportService:
+        def __init__(self, db):
+            assert sessions == ["open"]
+
+        async def export(self, fmt, **filters):
+            yield "row\n"
+
+    monkeypatch.setattr("app.api.api_v1.endpoints.appointments.async_read_router.reader", lambda last_write: FakeSession)
+    monkeypatch.setattr("app.api.api_v1.endpoints.appointments.AppointmentExportService", FakeExportService)
+
+    response = client.get("/api/v1/appointments/export")
+
+    assert response.text == "row\n"
+    assert sessions == ["open", "closed"]
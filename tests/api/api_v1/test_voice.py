@@ -0,0 +1,67 @@
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from app.core.exceptions import ServiceUnavailableError
+from app.main import app
+from tests.services.test_streaming_stt import chunks, pcm
+
+def test_busy_speech_recognition_returns_503(monkeypatch):
+    monkeypatch.setattr(
+        "app.api.api_v1.endpoints.voice.voice_service.speech_to_text",
+        AsyncMock(side_effect=ServiceUnavailableError("Speech recognition is busy", retry_after=3))
+    )
+
+    response = TestClient(app).post(
+        "/api/v1/voice/speech-to-text",
+        files={"audio": ("turn.wav", b"RIFF", "audio/wav")}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+def test_streaming_conversation_hands_final_text_to_rasa(monkeypatch):
+    async def transcribe(samples):
+        return "book a haircut"
+
+    converse = AsyncMock(return_value={"session_id": "abc", "user_text": "book a haircut", "bot_text": "When?"})
+    monkeypatch.setattr("app.api.api_v1.endpoints.voice.voice_service.transcribe_samples", transcribe)
+    monkeypatch.setattr("app.api.api_v1.endpoints.voice.voice_service.converse", converse)
+
+    with TestClient(app).websocket_connect("/api/v1/voice/stream?session_id=abc") as websocket:
+        assert websocket.receive_json() == {"type": "session", "session_id": "abc"}
+        for chunk in chunks(pcm(0.5) + pcm(1.5, 0.3) + pcm(1.0)):
+            websocket.send_bytes(chunk)
+        messages = [websocket.receive_json()]
+        while messages[-1]["type"] != "response":
+            messages.append(websocket.receive_json())
+
+    assert [message["type"] for message in messages] == ["partial", "partial", "final", "response"]
+    assert messages[-2]["text"] == "book a haircut"
+    assert messages[-1]["bot_text"] == "When?"
+    converse.assert_awaited_once_with("book a haircut", "abc")
+
+def test_streaming_reports_busy_recognition(monkeypatch):
+    monkeypatch.setattr(
+        "app.api.api_v1.endpoints.voice.voice_service.transcribe_samples",
+        AsyncMock(side_effect=ServiceUnavailableError(retry_after=2))
+    )
+
+    with TestClient(app).websocket_connect("/api/v1/voice/stream") as websocket:
+        websocket.receive_json()
+        websocket.send_bytes(pcm(0.5) + pcm(0.5, 0.3))
+        websocket.send_text('{"type": "end"}')
+        error = websocket.receive_json()
+
+    assert error["type"] == "error"
+    assert error["status_code"] == 503 and error["retry_after"] == "2"
+
+def test_streaming_rejects_control_messages_that_are_not_objects():
+    with TestClient(app).websocket_connect("/api/v1/voice/stream") as websocket:
+        websocket.receive_json()
+        for text in ("[1]", '"x"', "{not json"):
+            websocket.send_text(text)
+            error = websocket.receive_json()
+            assert error["type"] == "error" and error["status_code"] == 400
+        # The stream is still open for audio
+        websocket.send_text('{"type": "end"}')
+        websocket.send_text("[]")
+        assert websocket.receive_json()["status_code"] == 400
@@ -0,0 +1,26 @@
+import asyncio
+import gc
+from unittest.mock import Mock
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import locks
+from app.db.locks import async_staff_booking_lock
+
+def sqlite_session():
+    db = Mock(spec=AsyncSession)
+    db.sync_session = Mock()
+    db.sync_session.get_bind.return_value.dialect.name = "sqlite"
+    return db
+
+def test_async_locks_are_dropped_with_their_event_loop():
+    async def book():
+        async with async_staff_booking_lock(sqlite_session(), 1):
+            return asyncio.get_running_loop()
+
+    loops = len(locks._async_locks)
+    loop = asyncio.new_event_loop()
+    assert loop.run_until_complete(book()) in locks._async_locks
+    assert len(locks._async_locks) == loops + 1
+    loop.close()
+    del loop
+    gc.collect()
+    assert len(locks._async_locks) == loops
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+from app.db.init_db import alembic_config
+from app.db.session import Base
+from app.models import Branch, Customer, Service, Staff
+from app.services.appointment_service import AppointmentService, encode_cursor
+
+@pytest.fixture
+def migrated_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def captured_sql(migrated_engine):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "appointments" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(migrated_engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(migrated_engine, "before_cursor_execute", capture)
+
+def query_plan(engine, statement, parameters):
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+def test_migrations_match_models(migrated_engine):
+    with migrated_engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+    assert diff == []
+
+def test_downgrade_to_base_removes_schema(migrated_engine):
+    config = alembic_config()
+    with migrated_engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.downgrade(config, "0001")
+        assert "ix_appointments_staff_active_time" not in {
+            index["name"] for index in inspect(connection).get_indexes("appointments")
+        }
+        command.downgrade(config, "base")
+        assert inspect(connection).get_table_names() == ["alembic_version"]
+
+def test_hot_queries_use_appointment_indexes(migrated_engine, captured_sql):
+    db = sessionmaker(bind=migrated_engine)()
+    branch = Branch(name="Downtown", address="1 Main St", city="SF", state="CA", phone="555-0001")
+    service = Service(name="Haircut", duration_minutes=60, price=50.0, category="Hair")
+    customer = Customer(name="Customer", email="customer@example.com")
+    db.add_all([branch, service, customer])
+    db.commit()
+    db.add(Staff(name="Stylist", email="stylist@salon.com", role="Stylist", branch_id=branch.id))
+    db.commit()
+
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    appointments = AppointmentService(db)
+    appointments._check_availability(branch.id, service.id, day)
+    appointments._get_customer_appointments(customer.id, day, day + timedelta(days=7))
+    appointments._get_customer_appointments(None, day, day + timedelta(days=7))
+    appointments._get_customer_appointments(None, cursor=encode_cursor(day, 1))
+    db.close()
+
+    plans = [query_plan(migrated_engine, statement, parameters) for statement, parameters in captured_sql]
+    assert len(plans) == 4
+    occupancy, by_customer, by_range, next_page = plans
+    assert "USING INDEX ix_appointments_staff_active_time" in occupancy
+    assert "USING INDEX ix_appointments_customer_time" in by_customer
+    assert "USING INDEX ix_appointments_time" in by_range
+    assert "USING INDEX ix_appointments_time" in next_page
+    for plan in plans:
+        assert "SCAN appointments" not in plan
+    # Listings read in (appointment_time, id) order straight from the index
+    for plan in plans[1:]:
+        assert "TEMP B-TREE" not in plan
+
+def test_specialties_migrate_to_staff_skills(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'skills.db'}")
+    config = alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "0005")
+        connection.exec_driver_sql(
+            "INSERT INTO branches (id, name, address, city, state, phone) VALUES (1, 'Downtown', '1 Main St', 'SF', 'CA', '555')"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO staff (id, name, email, role, branch_id, specialties) VALUES "
+            "(1, 'A', 'a@salon.com', 'Stylist', 1, ' Hair, Color ,hair'), "
+            "(2, 'B', 'b@salon.com', 'Stylist', 1, NULL)"
+        )
+
+        command.upgrade(config, "head")
+        assert connection.exec_driver_sql(
+            "SELECT staff_id, skill FROM staff_skills ORDER BY staff_id, skill"
+        ).fetchall() == [(1, "color"), (1, "hair")]
+        assert "specialties" not in {column["name"] for column in inspect(connection).get_columns("staff")}
+
+        command.downgrade(config, "0005")
+        assert connection.exec_driver_sql("SELECT id, specialties FROM staff ORDER BY id").fetchall() == [
+            (1, "Color,Hair"), (2, None)
+        ]
+    engine.dispose()
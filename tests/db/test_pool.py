@@ -0,0 +1,110 @@
+import threading
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.core.config import Settings
+from app.core.metrics import MetricsRegistry, metrics
+from app.db.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    engine_options,
+    instrument_engine,
+    pool_status,
+)
+
+@pytest.fixture
+def pooled_engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.2,
+        connect_args={"check_same_thread": False}
+    )
+    instrument_engine(engine, f"test-{id(engine)}")
+    yield engine
+    engine.dispose()
+
+def test_engine_options_from_settings():
+    settings = Settings(
+        GOOGLE_CLOUD_PROJECT="x", DIALOGFLOW_PROJECT_ID="x",
+        STRIPE_SECRET_KEY="x", STRIPE_WEBHOOK_SECRET="x",
+        DB_POOL_SIZE=20, DB_MAX_OVERFLOW=5, DB_POOL_TIMEOUT=2, DB_POOL_RECYCLE=600, DB_POOL_PRE_PING=False
+    )
+
+    options = engine_options("postgresql://u:p@db/salon", settings)
+    assert options == {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": 20,
+        "max_overflow": 5,
+        "pool_timeout": 2,
+        "pool_recycle": 600,
+        "pool_pre_ping": False,
+    }
+    assert engine_options("postgresql://u:p@db/salon", settings, is_async=True)["poolclass"] is InstrumentedAsyncQueuePool
+    # SQLite keeps its default pool, which rejects sizing options
+    assert set(engine_options("sqlite:///salon.db", settings)) == {"pool_recycle", "pool_pre_ping"}
+
+def test_checkouts_are_timed_and_counted(pooled_engine):
+    with pooled_engine.connect() as first:
+        first.execute(text("SELECT 1"))
+        with pooled_engine.connect() as second:
+            second.execute(text("SELECT 1"))
+            status = pool_status(pooled_engine)
+            assert status["checked_out"] == 2
+            assert status["overflow"] == 1
+
+            # Pool and overflow are exhausted, so a third checkout waits and times out
+            with pytest.raises(PoolTimeoutError):
+                pooled_engine.connect()
+
+    status = pool_status(pooled_engine)
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 3
+    assert status["timeouts"] == 1
+    assert status["wait_seconds_total"] >= 0.2
+
+def test_waiting_checkout_records_wait_time(pooled_engine):
+    held = [pooled_engine.connect(), pooled_engine.connect()]
+    release = threading.Timer(0.05, lambda: held.pop().close())
+    release.start()
+    with pooled_engine.connect():
+        pass
+    release.join()
+    held[0].close()
+
+    label = {"engine": pooled_engine.pool.metrics_label}
+    wait = metrics.histogram("db_pool_checkout_wait_seconds", "")
+    assert wait.count(label) == 3
+    assert wait.sum(label) >= 0.04
+
+def test_gauges_follow_pool_across_dispose(pooled_engine):
+    label = {"engine": pooled_engine.pool.metrics_label}
+    checked_out = metrics.gauge("db_pool_checked_out_connections", "")
+    with pooled_engine.connect():
+        assert checked_out.value(label) == 1
+    pooled_engine.dispose()
+    assert pooled_engine.pool.metrics_label == label["engine"]
+    with pooled_engine.connect():
+        assert checked_out.value(label) == 1
+    assert checked_out.value(label) == 0
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").inc(labels={"path": "/"})
+    registry.gauge("in_use", "In use").set_function(lambda: 3)
+    histogram = registry.histogram("wait_seconds", "Wait", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    body = registry.render()
+    assert '# TYPE requests_total counter' in body
+    assert 'requests_total{path="/"} 1' in body
+    assert 'in_use 3' in body
+    assert 'wait_seconds_bucket{le="0.1"} 1' in body
+    assert 'wait_seconds_bucket{le="+Inf"} 2' in body
+    assert 'wait_seconds_count 2' in body
+    assert histogram.quantile(0.5) == 0.1
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests")
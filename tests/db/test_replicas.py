@@ -0,0 +1,137 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import Settings
+from app.db.replicas import LAST_WRITE_HEADER, READ_ONLY_INFO, ReplicaRouter, is_read_only, track_primary_writes
+from app.db.session import Base, last_write_time
+from app.models import Appointment, Branch, Customer, Service, Staff
+from app.services.appointment_service import AppointmentService
+from app.services.availability_cache import availability_cache
+from app.services.opening_hours import opening_hours_cache
+from app.services.staff_skills import staff_skill_cache
+
+DAY = datetime(2024, 3, 11)
+
+def seed(session_factory):
+    db = session_factory()
+    branch = Branch(name="Downtown", address="1 Main St", city="SF", state="CA", phone="555-0001")
+    service = Service(name="Haircut", duration_minutes=60, price=50.0, category="Hair")
+    customer = Customer(name="Customer", email="customer@example.com")
+    db.add_all([branch, service, customer])
+    db.commit()
+    db.add(Staff(name="Stylist", email="stylist@salon.com", role="Stylist", branch_id=branch.id))
+    db.commit()
+    db.close()
+
+@pytest.fixture
+def databases(tmp_path):
+    """
+    A primary and a replica that has not yet caught up with later writes
+    """
+    engines = [create_engine(f"sqlite:///{tmp_path / name}") for name in ("primary.db", "replica.db")]
+    for engine in engines:
+        Base.metadata.create_all(bind=engine)
+    primary = sessionmaker(bind=engines[0])
+    replica = sessionmaker(bind=engines[1], info={READ_ONLY_INFO: True})
+    seed(primary)
+    seed(sessionmaker(bind=engines[1]))  # Replicated state before the test's writes
+    availability_cache.clear()
+    opening_hours_cache.invalidate()
+    staff_skill_cache.invalidate()
+    yield primary, replica
+    for engine in engines:
+        engine.dispose()
+
+def test_router_prefers_replicas_except_right_after_a_write(databases):
+    primary, replica = databases
+    assert ReplicaRouter(primary, []).reader() is primary
+    assert ReplicaRouter(primary, [replica], sticky_seconds=0).reader() is replica
+
+    # Only the client that wrote sticks to the primary
+    router = ReplicaRouter(primary, [replica], sticky_seconds=60)
+    assert router.reader(time.time() - 1) is primary
+    assert router.reader(time.time() - 120) is replica
+    assert router.reader() is replica
+
+def test_writing_requests_hand_the_client_its_write_time(databases):
+    primary, _ = databases
+    app = FastAPI()
+    app.middleware("http")(track_primary_writes)
+
+    @app.post("/customers")
+    def add_customer():
+        db = primary()
+        db.add(Customer(name="Walk-in", email="walkin@example.com"))
+        db.commit()
+        db.close()
+
+    @app.get("/last-write")
+    def read(request: Request):
+        return last_write_time(request)
+
+    client = TestClient(app)
+    assert LAST_WRITE_HEADER not in client.get("/last-write").headers
+    written = client.post("/customers")
+    assert abs(float(written.headers[LAST_WRITE_HEADER]) - time.time()) < 5
+    # The cookie comes back on the client's next request
+    assert client.get("/last-write").json() == float(written.headers[LAST_WRITE_HEADER])
+    assert TestClient(app).get("/last-write").json() is None
+
+def test_router_round_robins_replicas(databases):
+    primary, replica = databases
+    other = sessionmaker(bind=replica.kw["bind"], info={READ_ONLY_INFO: True})
+    router = ReplicaRouter(primary, [replica, other], sticky_seconds=0)
+    assert [router.reader() for _ in range(4)] == [replica, other, replica, other]
+
+def test_replica_sessions_refuse_writes(databases):
+    _, replica = databases
+    db = replica()
+    assert is_read_only(db)
+    db.add(Customer(name="Walk-in", email="walkin@example.com"))
+    with pytest.raises(RuntimeError):
+        db.flush()
+    db.close()
+
+async def test_reads_use_replica_data_without_caching_it(databases):
+    primary, replica = databases
+    primary_db, replica_db = primary(), replica()
+    staff = primary_db.query(Staff).one()
+    service = primary_db.query(Service).one()
+
+    # Booked on the primary; the replica has not seen it yet
+    booked = await AppointmentService(primary_db).create_appointment(
+        customer_id=primary_db.query(Customer).one().id,
+        staff_id=staff.id,
+        service_id=service.id,
+        branch_id=staff.branch_id,
+        appointment_time=DAY + timedelta(hours=9)
+    )
+    assert replica_db.query(Appointment).count() == 0
+    opening_hours_cache.invalidate()
+    staff_skill_cache.invalidate()
+
+    replica_slots = await AppointmentService(replica_db).check_availability(staff.branch_id, service.id, DAY)
+    assert DAY + timedelta(hours=9) in replica_slots
+    assert availability_cache.stats()["size"] == 0
+    assert staff.branch_id not in opening_hours_cache._hours
+    assert staff_skill_cache._index is None
+
+    # The primary never sees the lagging replica's answer
+    primary_slots = await AppointmentService(primary_db).check_availability(staff.branch_id, service.id, DAY)
+    assert booked["appointment_time"] not in primary_slots
+    assert availability_cache.stats()["size"] == 1
+
+    primary_db.close()
+    replica_db.close()
+
+def test_replica_urls_accept_comma_separated_list():
+    settings = Settings(
+        GOOGLE_CLOUD_PROJECT="x", DIALOGFLOW_PROJECT_ID="x",
+        STRIPE_SECRET_KEY="x", STRIPE_WEBHOOK_SECRET="x",
+        READ_REPLICA_URLS="postgresql://replica-1/salon, postgresql://replica-2/salon"
+    )
+    assert settings.READ_REPLICA_URLS == ["postgresql://replica-1/salon", "postgresql://replica-2/salon"]
@@ -0,0 +1,79 @@
+import io
+import wave
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.session import Base, async_database_url
+from app.models import Branch, Customer, Service, Staff
+from app.services.availability_cache import availability_cache
+from app.services.opening_hours import opening_hours_cache
+from app.services.staff_skills import staff_skill_cache
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    availability_cache.clear()
+    opening_hours_cache.invalidate()
+    staff_skill_cache.invalidate()
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def salon(db):
+    branches = [
+        Branch(name="Downtown", address="1 Main St", city="SF", state="CA", phone="555-0001"),
+        Branch(name="Marina", address="2 Beach Ave", city="SF", state="CA", phone="555-0002"),
+    ]
+    haircut = Service(name="Haircut", duration_minutes=60, price=50.0, category="Hair")
+    customer = Customer(name="Customer", email="customer@example.com")
+    db.add_all(branches + [haircut, customer])
+    db.commit()
+
+    staff = [
+        Staff(name=f"Stylist {i}", email=f"stylist{i}@salon.com", role="Stylist",
+              branch_id=branches[i % 2].id, specialties="Hair,Color")
+        for i in range(4)
+    ]
+    db.add_all(staff)
+    db.commit()
+    return {"branches": branches, "service": haircut, "customer": customer, "staff": staff}
+
+@pytest.fixture
+async def async_sessions(tmp_path):
+    url = f"sqlite:///{tmp_path / 'salon.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+    availability_cache.clear()
+    opening_hours_cache.invalidate()
+    staff_skill_cache.invalidate()
+
+    engine = create_async_engine(async_database_url(url))
+    try:
+        yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    finally:
+        await engine.dispose()
+
+@pytest.fixture
+def wav_audio():
+    """
+    A tenth of a second of 16 kHz mono silence as WAV bytes
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(bytes(3200))
+    return buffer.getvalue()
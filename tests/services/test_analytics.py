@@ -0,0 +1,155 @@
+import json
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+import numpy as np
+import pytest
+from app.core.exceptions import AppointmentError
+from app.models import Appointment, AppointmentStatus, Service
+from app.services.analytics import (
+    AnalyticsService,
+    booked_minutes_by_hour_of_week,
+    open_minutes_by_hour_of_week,
+)
+from app.services.opening_hours import parse_opening_hours
+
+MONDAY = datetime(2024, 3, 11)
+
+def add_appointment(db, salon, staff, service, start, minutes=60, status=AppointmentStatus.SCHEDULED):
+    db.add(Appointment(
+        customer_id=salon["customer"].id,
+        staff_id=staff.id,
+        branch_id=staff.branch_id,
+        service_id=service.id,
+        appointment_time=start,
+        end_time=start + timedelta(minutes=minutes),
+        status=status
+    ))
+    db.commit()
+
+def test_booked_minutes_split_across_hours_and_weeks():
+    # Monday 9:30-11:00, Tuesday 23:30 past midnight, next Monday 9:00-9:15
+    starts = np.array([9 * 60 + 30, 1440 + 23 * 60 + 30, 7 * 1440 + 9 * 60])
+    ends = np.array([11 * 60, 2 * 1440 + 30, 7 * 1440 + 9 * 60 + 15])
+
+    heatmap = booked_minutes_by_hour_of_week(starts, ends, days=14, first_weekday=0)
+
+    assert heatmap[0, 9] == 30 + 15
+    assert heatmap[0, 10] == 60
+    assert heatmap[1, 23] == 30
+    assert heatmap[2, 0] == 30
+    assert heatmap.sum() == 90 + 60 + 15
+
+def test_booked_minutes_follow_range_weekday_and_end():
+    # A range starting on a Wednesday; the booking runs past the last day
+    heatmap = booked_minutes_by_hour_of_week(np.array([23 * 60]), np.array([25 * 60]), days=1, first_weekday=2)
+    assert heatmap[2, 23] == 60
+    assert heatmap.sum() == 60
+
+def test_open_minutes_by_hour_of_week():
+    hours = parse_opening_hours(json.dumps({"Mon": "9:30-11:00", "Tue-Sun": "Closed"}))
+    open_minutes = open_minutes_by_hour_of_week(hours)
+    assert open_minutes[0, 9] == 30
+    assert open_minutes[0, 10] == 60
+    assert open_minutes.sum() == 90
+
+async def test_utilization_heatmap(db, salon):
+    downtown = salon["branches"][0]
+    downtown.opening_hours = json.dumps({"Mon-Fri": "9:00-17:00"})
+    db.commit()
+    stylist = salon["staff"][0]
+    add_appointment(db, salon, stylist, salon["service"], MONDAY + timedelta(hours=9))
+    add_appointment(db, salon, stylist, salon["service"], MONDAY + timedelta(hours=10), status=AppointmentStatus.CANCELLED)
+
+    report = await AnalyticsService(db).get_utilization_heatmap(
+        MONDAY.date(), MONDAY.date() + timedelta(days=13), branch_id=downtown.id
+    )
+
+    assert report["days"][0] == "mon"
+    # Two active stylists at Downtown, two Mondays in the range
+    assert report["capacity_minutes"][0][9] == 2 * 2 * 60
+    assert report["capacity_minutes"][5][9] == 0
+    assert report["booked_minutes"][0][9] == 60
+    assert report["booked_minutes"][0][10] == 0
+    assert report["utilization"][0][9] == 0.25
+    assert report["utilization"][5][9] is None
+
+async def test_staff_with_unset_active_flag_count_towards_capacity(db, salon):
+    downtown = salon["branches"][0]
+    downtown.opening_hours = json.dumps({"Mon-Fri": "9:00-17:00"})
+    salon["staff"][0].is_active = None
+    db.commit()
+
+    report = await AnalyticsService(db).get_utilization_heatmap(MONDAY.date(), MONDAY.date(), branch_id=downtown.id)
+
+    assert report["capacity_minutes"][0][9] == 2 * 60
+
+def test_load_columns_fills_one_matrix_across_batches(db, salon, monkeypatch):
+    stylist = salon["staff"][0]
+    for hour in range(9, 14):
+        add_appointment(db, salon, stylist, salon["service"], MONDAY + timedelta(hours=hour))
+    monkeypatch.setattr("app.services.analytics.LOAD_BATCH_SIZE", 2)
+    service = AnalyticsService(db)
+
+    columns = service.load_columns(MONDAY.date(), MONDAY.date())
+    assert columns.start.tolist() == [540, 600, 660, 720, 780]
+    assert columns.start.base is columns.end.base
+
+    # Rows booked between the count and the fetch still fit
+    execute = db.connection().execute
+    def undercount(statement, *args, **kwargs):
+        if len(statement.selected_columns) == 1:
+            return Mock(scalar=Mock(return_value=1))
+        return execute(statement, *args, **kwargs)
+    monkeypatch.setattr(service.db.connection(), "execute", undercount)
+    assert service.load_columns(MONDAY.date(), MONDAY.date()).start.tolist() == [540, 600, 660, 720, 780]
+
+async def test_revenue_by_category(db, salon):
+    manicure = Service(name="Manicure", duration_minutes=30, price=25.0, category="Nails")
+    db.add(manicure)
+    db.commit()
+    stylist_a, stylist_b = salon["staff"][:2]
+    add_appointment(db, salon, stylist_a, salon["service"], MONDAY + timedelta(hours=9))
+    add_appointment(db, salon, stylist_b, salon["service"], MONDAY + timedelta(hours=9), status=AppointmentStatus.COMPLETED)
+    add_appointment(db, salon, stylist_a, manicure, MONDAY + timedelta(hours=11), minutes=30)
+    add_appointment(db, salon, stylist_a, manicure, MONDAY + timedelta(hours=12), minutes=30, status=AppointmentStatus.CANCELLED)
+
+    service = AnalyticsService(db)
+    assert await service.get_revenue_by_category(MONDAY.date(), MONDAY.date()) == [
+        {"category": "Hair", "appointment_count": 2, "revenue": 100.0},
+        {"category": "Nails", "appointment_count": 1, "revenue": 25.0},
+    ]
+    assert await service.get_revenue_by_category(MONDAY.date(), MONDAY.date(), branch_id=stylist_b.branch_id) == [
+        {"category": "Hair", "appointment_count": 1, "revenue": 50.0},
+    ]
+    assert await service.get_revenue_by_category(MONDAY.date() + timedelta(days=1), MONDAY.date() + timedelta(days=1)) == []
+
+async def test_revenue_by_category_keeps_booked_prices(db, salon):
+    stylist = salon["staff"][0]
+    add_appointment(db, salon, stylist, salon["service"], MONDAY + timedelta(hours=9))
+    salon["service"].price = 80.0
+    db.commit()
+    add_appointment(db, salon, stylist, salon["service"], MONDAY + timedelta(hours=10))
+
+    assert await AnalyticsService(db).get_revenue_by_category(MONDAY.date(), MONDAY.date()) == [
+        {"category": "Hair", "appointment_count": 2, "revenue": 130.0},
+    ]
+
+async def test_cancellation_rates(db, salon):
+    downtown, marina = salon["branches"]
+    stylist_a, stylist_b = salon["staff"][:2]
+    for hour in range(9, 13):
+        status = AppointmentStatus.CANCELLED if hour == 9 else AppointmentStatus.SCHEDULED
+        add_appointment(db, salon, stylist_a, salon["service"], MONDAY + timedelta(hours=hour), status=status)
+    add_appointment(db, salon, stylist_b, salon["service"], MONDAY + timedelta(hours=9))
+
+    assert await AnalyticsService(db).get_cancellation_rates(MONDAY.date(), MONDAY.date()) == [
+        {"branch_id": downtown.id, "name": "Downtown", "appointment_count": 4, "cancelled_count": 1, "cancellation_rate": 0.25},
+        {"branch_id": marina.id, "name": "Marina", "appointment_count": 1, "cancelled_count": 0, "cancellation_rate": 0.0},
+    ]
+
+async def test_analytics_rejects_bad_ranges(db, salon):
+    service = AnalyticsService(db)
+    with pytest.raises(AppointmentError):
+        await service.get_cancellation_rates(MONDAY.date(), MONDAY.date() - timedelta(days=1))
+    with pytest.raises(AppointmentError):
+        await service.get_revenue_by_category(MONDAY.date(), MONDAY.date() + timedelta(days=400))
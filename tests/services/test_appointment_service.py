@@ -0,0 +1,463 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.session import Base
+from app.models import Appointment, AppointmentStatus, Branch, Customer, Service, Staff
+from app.services.appointment_service import AppointmentService, appointment_to_dict
+from app.services.availability_cache import availability_cache
+from app.services.opening_hours import opening_hours_cache
+from app.services.staff_skills import staff_skill_cache
+
+DAY = datetime(2024, 3, 11)  # A Monday
+
+def book(db, salon, staff, start, minutes=60, status=AppointmentStatus.SCHEDULED):
+    appointment = Appointment(
+        customer_id=salon["customer"].id,
+        staff_id=staff.id,
+        branch_id=staff.branch_id,
+        service_id=salon["service"].id,
+        appointment_time=start,
+        end_time=start + timedelta(minutes=minutes),
+        status=status
+    )
+    db.add(appointment)
+    db.commit()
+    return appointment
+
+async def test_check_availability_range_returns_slot_matrix(db, salon):
+    downtown, marina = salon["branches"]
+    stylist_a, stylist_b, stylist_c, _ = salon["staff"]
+    # Downtown is only unavailable at 9:00 when both of its stylists are busy
+    book(db, salon, stylist_a, DAY + timedelta(hours=9))
+    book(db, salon, stylist_c, DAY + timedelta(hours=9))
+    book(db, salon, stylist_b, DAY + timedelta(days=1, hours=16))
+    book(db, salon, stylist_a, DAY + timedelta(hours=12), status=AppointmentStatus.CANCELLED)
+
+    result = await AppointmentService(db).check_availability_range(
+        service_id=salon["service"].id,
+        start_date=DAY,
+        end_date=DAY + timedelta(days=1)
+    )
+
+    assert result["dates"] == ["2024-03-11", "2024-03-12"]
+    assert result["slot_times"][0] == "09:00"
+    assert result["slot_times"][-1] == "16:00"
+    matrix = {branch["branch_id"]: branch["days"] for branch in result["branches"]}
+    assert matrix[downtown.id][0].startswith("001")
+    assert matrix[downtown.id][1] == "1" * len(result["slot_times"])
+    assert matrix[marina.id][0] == "1" * len(result["slot_times"])
+    assert matrix[marina.id][1] == "1" * len(result["slot_times"])
+
+    only_b = await AppointmentService(db).check_availability_range(
+        service_id=salon["service"].id,
+        start_date=DAY,
+        end_date=DAY + timedelta(days=1),
+        branch_ids=[marina.id],
+        staff_ids=[stylist_b.id]
+    )
+    assert only_b["branches"][0]["days"][1].endswith("100")
+
+async def test_check_availability_range_matches_single_day_queries(db, salon):
+    book(db, salon, salon["staff"][0], DAY + timedelta(hours=10, minutes=30))
+    book(db, salon, salon["staff"][2], DAY + timedelta(hours=10))
+    book(db, salon, salon["staff"][2], DAY + timedelta(hours=14))
+    service = AppointmentService(db)
+    downtown = salon["branches"][0]
+
+    result = await service.check_availability_range(
+        service_id=salon["service"].id,
+        start_date=DAY,
+        end_date=DAY,
+        branch_ids=[downtown.id]
+    )
+    single_day = await service.check_availability(
+        branch_id=downtown.id,
+        service_id=salon["service"].id,
+        date=DAY
+    )
+
+    free_times = [
+        time for time, free in zip(result["slot_times"], result["branches"][0]["days"][0])
+        if free == "1"
+    ]
+    assert free_times == [slot.strftime("%H:%M") for slot in single_day]
+    assert DAY + timedelta(hours=10) not in single_day
+    assert DAY + timedelta(hours=14) in single_day
+
+async def test_staff_booked_for_other_service_is_not_available(db, salon):
+    stylist = salon["staff"][0]
+    coloring = Service(name="Coloring", duration_minutes=120, price=120.0, category="Hair")
+    db.add(coloring)
+    db.commit()
+    book(db, salon, stylist, DAY + timedelta(hours=10), minutes=120)
+
+    slots = await AppointmentService(db).check_availability(
+        branch_id=stylist.branch_id,
+        service_id=salon["service"].id,
+        date=DAY,
+        staff_id=stylist.id
+    )
+
+    assert DAY + timedelta(hours=9) in slots
+    assert DAY + timedelta(hours=10) not in slots
+    assert DAY + timedelta(hours=11) not in slots
+    assert DAY + timedelta(hours=12) in slots
+
+async def test_appointment_from_previous_day_blocks_morning(db, salon):
+    stylist = salon["staff"][0]
+    book(db, salon, stylist, DAY - timedelta(hours=1), minutes=11 * 60)
+
+    slots = await AppointmentService(db).check_availability(
+        branch_id=stylist.branch_id,
+        service_id=salon["service"].id,
+        date=DAY,
+        staff_id=stylist.id
+    )
+
+    assert slots[0] == DAY + timedelta(hours=10)
+
+async def test_ineligible_staff_are_ignored(db, salon):
+    downtown = salon["branches"][0]
+    manicure = Service(name="Manicure", duration_minutes=45, price=35.0, category="Nails")
+    db.add(manicure)
+    db.commit()
+
+    slots = await AppointmentService(db).check_availability(
+        branch_id=downtown.id,
+        service_id=manicure.id,
+        date=DAY
+    )
+
+    assert slots == []
+
+async def test_slots_follow_branch_opening_hours(db, salon):
+    downtown = salon["branches"][0]
+    downtown.opening_hours = json.dumps({"Mon-Fri": "10:00-12:00", "Sat-Sun": "Closed"})
+    db.commit()
+    service = AppointmentService(db)
+
+    monday = await service.check_availability(downtown.id, salon["service"].id, DAY)
+    sunday = await service.check_availability(downtown.id, salon["service"].id, DAY - timedelta(days=1))
+
+    assert monday == [DAY + timedelta(hours=10), DAY + timedelta(hours=10, minutes=30), DAY + timedelta(hours=11)]
+    assert sunday == []
+
+    # Editing the branch invalidates the compiled calendar
+    downtown.opening_hours = json.dumps({"Mon-Sun": "8:00-9:00"})
+    db.commit()
+
+    assert await service.check_availability(downtown.id, salon["service"].id, DAY) == [DAY + timedelta(hours=8)]
+
+async def test_range_masks_slots_outside_each_branch_hours(db, salon):
+    downtown, marina = salon["branches"]
+    downtown.opening_hours = json.dumps({"Mon-Sun": "9:00-11:00"})
+    marina.opening_hours = json.dumps({"Mon-Sun": "10:00-12:00"})
+    db.commit()
+
+    result = await AppointmentService(db).check_availability_range(
+        service_id=salon["service"].id,
+        start_date=DAY,
+        end_date=DAY
+    )
+
+    assert result["slot_times"] == ["09:00", "09:30", "10:00", "10:30", "11:00"]
+    matrix = {branch["branch_id"]: branch["days"][0] for branch in result["branches"]}
+    assert matrix[downtown.id] == "11100"
+    assert matrix[marina.id] == "00111"
+
+async def test_next_available_matches_day_by_day_search(db, salon):
+    downtown, marina = salon["branches"]
+    downtown.opening_hours = json.dumps({"Mon-Fri": "9:00-11:00", "Sat-Sun": "Closed"})
+    marina.opening_hours = json.dumps({"Mon-Fri": "Closed", "Sat-Sun": "10:00-12:00"})
+    db.commit()
+    # Fill Downtown for the rest of Friday so the search has to cross the weekend
+    friday = DAY + timedelta(days=4)
+    for stylist in salon["staff"][0::2]:
+        book(db, salon, stylist, friday + timedelta(hours=9), minutes=120)
+    service = AppointmentService(db)
+    haircut = salon["service"].id
+
+    options = await service.find_next_available(haircut, after=friday + timedelta(hours=8, minutes=10), limit=6)
+
+    expected = []
+    for day in range(5):
+        date = friday + timedelta(days=day)
+        for branch in (downtown, marina):
+            for start in await service.check_availability(branch.id, haircut, date):
+                expected.append((start, branch.id))
+    expected.sort()
+    assert [(option["appointment_time"], option["branch_id"]) for option in options] == expected[:6]
+    assert options[0]["appointment_time"] == friday + timedelta(days=1, hours=10)
+    assert options[0]["end_time"] == options[0]["appointment_time"] + timedelta(hours=1)
+    assert options[0]["staff_id"] == salon["staff"][1].id
+
+async def test_next_available_skips_slots_already_started(db, salon):
+    downtown = salon["branches"][0]
+    stylist = salon["staff"][0]
+    options = await AppointmentService(db).find_next_available(
+        salon["service"].id,
+        after=DAY + timedelta(hours=10, minutes=5),
+        branch_ids=[downtown.id],
+        staff_ids=[stylist.id],
+        limit=2
+    )
+
+    assert [option["appointment_time"] for option in options] == [
+        DAY + timedelta(hours=10, minutes=30),
+        DAY + timedelta(hours=11)
+    ]
+    assert {option["staff_id"] for option in options} == {stylist.id}
+
+async def test_next_available_with_no_eligible_staff_is_empty(db, salon):
+    nails = Service(name="Manicure", duration_minutes=30, price=20.0, category="Nails")
+    db.add(nails)
+    db.commit()
+
+    assert await AppointmentService(db).find_next_available(nails.id, after=DAY) == []
+    with pytest.raises(HTTPException):
+        await AppointmentService(db).find_next_available(nails.id, after=DAY, limit=0)
+
+async def test_availability_is_cached_until_an_appointment_is_written(db, salon):
+    stylist = salon["staff"][0]
+    service = AppointmentService(db)
+    availability_cache.hits = availability_cache.misses = 0
+
+    first = await service.check_availability(stylist.branch_id, salon["service"].id, DAY, stylist.id)
+    second = await service.check_availability(stylist.branch_id, salon["service"].id, DAY, stylist.id)
+    assert first == second
+    assert (availability_cache.hits, availability_cache.misses) == (1, 1)
+
+    appointment = book(db, salon, stylist, DAY + timedelta(hours=9))
+    booked = await service.check_availability(stylist.branch_id, salon["service"].id, DAY, stylist.id)
+    assert DAY + timedelta(hours=9) not in booked
+
+    appointment.status = AppointmentStatus.CANCELLED
+    db.commit()
+    cancelled = await service.check_availability(stylist.branch_id, salon["service"].id, DAY, stylist.id)
+    assert cancelled == first
+
+async def test_availability_etag_changes_only_with_relevant_writes(db, salon):
+    downtown, marina = salon["branches"]
+    stylist_a, stylist_b = salon["staff"][:2]  # Downtown and Marina
+    haircut = salon["service"].id
+
+    def etag(branch, day=DAY):
+        return availability_cache.availability_etag(branch.id, day.date(), haircut)
+
+    before = (etag(downtown), etag(marina), etag(downtown, DAY + timedelta(days=1)))
+    assert before[0] == etag(downtown)
+    assert before[0] != availability_cache.availability_etag(downtown.id, DAY.date(), haircut, stylist_a.id)
+
+    # A booking moves only its own branch and day
+    book(db, salon, stylist_a, DAY + timedelta(hours=9))
+    assert etag(downtown) != before[0]
+    assert (etag(marina), etag(downtown, DAY + timedelta(days=1))) == before[1:]
+
+    # Staff and service changes move every day of the affected scope
+    booked = etag(downtown)
+    stylist_b.specialties = "Nails"
+    db.commit()
+    assert etag(marina) != before[1]
+    assert etag(downtown) == booked
+
+    salon["service"].duration_minutes = 45
+    db.commit()
+    assert etag(downtown) != booked
+
+async def test_create_appointment_rejects_overlapping_booking(db, salon):
+    stylist = salon["staff"][0]
+    service = AppointmentService(db)
+    booking = dict(
+        customer_id=salon["customer"].id,
+        staff_id=stylist.id,
+        service_id=salon["service"].id,
+        branch_id=stylist.branch_id
+    )
+
+    created = await service.create_appointment(appointment_time=DAY + timedelta(hours=10), **booking)
+    assert created["end_time"] == DAY + timedelta(hours=11)
+
+    with pytest.raises(HTTPException, match="not available"):
+        await service.create_appointment(appointment_time=DAY + timedelta(hours=10, minutes=30), **booking)
+    with pytest.raises(HTTPException, match="not available"):
+        await service.create_appointment(appointment_time=DAY + timedelta(hours=11, minutes=15), **booking)
+    with pytest.raises(HTTPException, match="not available"):
+        await service.create_appointment(appointment_time=DAY + timedelta(hours=16, minutes=30), **booking)
+
+    assert await service.create_appointment(appointment_time=DAY + timedelta(hours=11), **booking)
+
+async def test_create_appointment_stays_inside_split_opening_hours(db, salon):
+    stylist = salon["staff"][0]
+    branch = salon["branches"][0]
+    branch.opening_hours = json.dumps({"Mon-Sun": "9:00-12:00, 13:00-15:00"})
+    db.commit()
+    service = AppointmentService(db)
+    booking = dict(
+        customer_id=salon["customer"].id,
+        staff_id=stylist.id,
+        service_id=salon["service"].id,
+        branch_id=branch.id
+    )
+
+    # An hour from 11:30 would run into the lunch break
+    with pytest.raises(HTTPException, match="not available"):
+        await service.create_appointment(appointment_time=DAY + timedelta(hours=11, minutes=30), **booking)
+    assert await service.create_appointment(appointment_time=DAY + timedelta(hours=13), **booking)
+
+async def test_create_appointment_rejects_staff_from_another_branch(db, salon):
+    stylist = salon["staff"][0]
+    other_branch = salon["branches"][1]
+
+    with pytest.raises(HTTPException, match="cannot provide"):
+        await AppointmentService(db).create_appointment(
+            customer_id=salon["customer"].id,
+            staff_id=stylist.id,
+            service_id=salon["service"].id,
+            branch_id=other_branch.id,
+            appointment_time=DAY + timedelta(hours=10)
+        )
+
+async def test_appointment_pages_follow_time_then_id(db, salon):
+    stylists = salon["staff"]
+    # Several appointments share a start time, so the id breaks ties
+    for hour in (9, 10, 11):
+        for stylist in stylists[:3]:
+            book(db, salon, stylist, DAY + timedelta(hours=hour))
+    service = AppointmentService(db)
+
+    seen = []
+    cursor = None
+    while True:
+        page = await service.get_customer_appointments(limit=4, cursor=cursor)
+        assert len(page["items"]) <= 4
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 9
+    assert [(a["appointment_time"], a["id"]) for a in seen] == sorted(
+        (a["appointment_time"], a["id"]) for a in seen
+    )
+    assert len({a["id"] for a in seen}) == 9
+
+    # A page that exactly ends the results has no cursor
+    assert (await service.get_customer_appointments(limit=9))["next_cursor"] is None
+
+    # Filters still apply to later pages
+    first = await service.get_customer_appointments(start_date=DAY + timedelta(hours=10), limit=2)
+    rest = await service.get_customer_appointments(start_date=DAY + timedelta(hours=10), cursor=first["next_cursor"])
+    assert len(first["items"]) + len(rest["items"]) == 6
+
+async def test_listing_rows_match_orm_serialization(db, salon):
+    appointment = book(db, salon, salon["staff"][0], DAY + timedelta(hours=9))
+    appointment.notes = "Window seat"
+    db.commit()
+
+    page = await AppointmentService(db).get_customer_appointments()
+
+    assert page["items"] == [appointment_to_dict(appointment)]
+
+async def test_invalid_cursor_and_page_size_are_rejected(db, salon):
+    service = AppointmentService(db)
+    for kwargs in ({"cursor": "not-a-cursor"}, {"limit": 0}, {"limit": 501}):
+        with pytest.raises(HTTPException) as exc_info:
+            await service.get_customer_appointments(**kwargs)
+        assert exc_info.value.status_code == 422
+
+def test_concurrent_bookings_never_double_book(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'bookings.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    availability_cache.clear()
+    opening_hours_cache.invalidate()
+    staff_skill_cache.invalidate()
+
+    setup = Session()
+    branch = Branch(name="Downtown", address="1 Main St", city="SF", state="CA", phone="555-0001")
+    haircut = Service(name="Haircut", duration_minutes=60, price=50.0, category="Hair")
+    customer = Customer(name="Customer", email="customer@example.com")
+    setup.add_all([branch, haircut, customer])
+    setup.commit()
+    stylists = [
+        Staff(name=f"Stylist {i}", email=f"stylist{i}@salon.com", role="Stylist", branch_id=branch.id)
+        for i in range(2)
+    ]
+    setup.add_all(stylists)
+    setup.commit()
+    ids = dict(customer_id=customer.id, service_id=haircut.id, branch_id=branch.id)
+    stylist_ids = [stylist.id for stylist in stylists]
+    setup.close()
+
+    attempts = 16
+    barrier = threading.Barrier(attempts)
+
+    def attempt(i):
+        session = Session()
+        try:
+            barrier.wait()
+            asyncio.run(AppointmentService(session).create_appointment(
+                staff_id=stylist_ids[i % 2],
+                appointment_time=DAY + timedelta(hours=10, minutes=30 * (i % 4 // 2)),
+                **ids
+            ))
+            return True
+        except HTTPException:
+            return False
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=attempts) as pool:
+        results = list(pool.map(attempt, range(attempts)))
+
+    # Each stylist can take exactly one of the two overlapping start times
+    assert sum(results) == 2
+    check = Session()
+    booked = check.query(Appointment).all()
+    check.close()
+    engine.dispose()
+    assert sorted(appointment.staff_id for appointment in booked) == sorted(stylist_ids)
+
+async def test_async_session_path(async_sessions):
+    async with async_sessions() as db:
+        branch = Branch(name="Downtown", address="1 Main St", city="SF", state="CA", phone="555-0001")
+        haircut = Service(name="Haircut", duration_minutes=60, price=50.0, category="Hair")
+        customer = Customer(name="Customer", email="customer@example.com")
+        db.add_all([branch, haircut, customer])
+        await db.commit()
+        stylist = Staff(name="Stylist", email="stylist@salon.com", role="Stylist", branch_id=branch.id)
+        db.add(stylist)
+        await db.commit()
+
+    booking = dict(customer_id=customer.id, staff_id=stylist.id, service_id=haircut.id, branch_id=branch.id)
+
+    async def book_concurrently():
+        async with async_sessions() as db:
+            return await AppointmentService(db).create_appointment(
+                appointment_time=DAY + timedelta(hours=10),
+                **booking
+            )
+
+    results = await asyncio.gather(*(book_concurrently() for _ in range(3)), return_exceptions=True)
+    created = [result for result in results if isinstance(result, dict)]
+    assert len(created) == 1
+
+    async with async_sessions() as db:
+        service = AppointmentService(db)
+        slots = await service.check_availability(branch.id, haircut.id, DAY)
+        assert DAY + timedelta(hours=10) not in slots
+        assert DAY + timedelta(hours=11) in slots
+
+        assert (await service.get_appointment(created[0]["id"]))["status"] == "scheduled"
+        cancelled = await service.cancel_appointment(created[0]["id"])
+        assert cancelled["status"] == "cancelled"
+        assert len((await service.get_customer_appointments(customer_id=customer.id))["items"]) == 1
@@ -0,0 +1,134 @@
+import io
+import shutil
+import struct
+import wave
+from unittest.mock import Mock
+import numpy as np
+import pytest
+from app.services import audio
+from app.services.audio import AudioDecodeError, SAMPLE_RATE, decode_audio, decode_wav, resample
+from app.services.voice_service import VoiceService
+
+def tone(rate, seconds=0.5, frequency=440.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return 0.5 * np.sin(2 * np.pi * frequency * t)
+
+def pcm_wav(samples, rate, width=2, channels=1):
+    """
+    WAV bytes for float samples in [-1, 1], repeated across channels
+    """
+    if width == 1:
+        frames = np.round(samples * 127 + 128).astype(np.uint8).tobytes()
+    else:
+        scaled = np.round(samples * (2 ** (8 * width - 1) - 1)).astype("<i4")
+        frames = b"".join(value.to_bytes(width, "little", signed=True) for value in scaled.tolist())
+    frames = b"".join(frames[i:i + width] * channels for i in range(0, len(frames), width))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+def float_wav(samples, rate, extensible=False):
+    data = samples.astype("<f4").tobytes()
+    if extensible:
+        guid = struct.pack("<H", 3) + b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+        fmt = struct.pack("<HHIIHHHHI", 0xFFFE, 1, rate, rate * 4, 4, 32, 22, 32, 0) + guid
+    else:
+        fmt = struct.pack("<HHIIHH", 3, 1, rate, rate * 4, 4, 32)
+    chunks = b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    # An unrelated odd-sized chunk before the samples, padded to a word boundary
+    chunks += b"LIST" + struct.pack("<I", 3) + b"abc\x00"
+    chunks += b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+@pytest.mark.parametrize("width", [1, 2, 3, 4])
+def test_pcm_wav_decodes_to_float32(width):
+    samples = tone(SAMPLE_RATE)
+    decoded = decode_audio(pcm_wav(samples, SAMPLE_RATE, width=width))
+
+    assert decoded.dtype == np.float32
+    assert decoded.shape == samples.shape
+    assert np.abs(decoded - samples).max() < (0.02 if width == 1 else 1e-3)
+
+@pytest.mark.parametrize("extensible", [False, True])
+def test_float_wav_with_extra_chunks(extensible):
+    samples = tone(SAMPLE_RATE)
+    decoded = decode_audio(float_wav(samples, SAMPLE_RATE, extensible=extensible))
+
+    np.testing.assert_allclose(decoded, samples, atol=1e-6)
+
+def test_pcm_samples_are_read_in_place(monkeypatch):
+    data = pcm_wav(tone(SAMPLE_RATE), SAMPLE_RATE)
+    seen = []
+    original = np.frombuffer
+
+    def frombuffer(buffer, *args, **kwargs):
+        seen.append(buffer)
+        return original(buffer, *args, **kwargs)
+
+    monkeypatch.setattr(audio.np, "frombuffer", frombuffer)
+    decode_wav(data)
+
+    assert isinstance(seen[0], memoryview) and seen[0].obj is data
+
+def test_stereo_is_mixed_down_and_resampled():
+    rate = 44100
+    samples = tone(rate, seconds=1.0)
+    decoded = decode_audio(pcm_wav(samples, rate, channels=2))
+
+    assert decoded.dtype == np.float32
+    assert decoded.shape == (SAMPLE_RATE,)
+    np.testing.assert_allclose(decoded[100:-100], tone(SAMPLE_RATE, seconds=1.0)[100:-100], atol=1e-2)
+
+def test_downsampling_removes_frequencies_above_nyquist():
+    rate = 48000
+    t = np.arange(rate) / rate
+    decoded = resample(np.sin(2 * np.pi * 12000 * t).astype(np.float32), rate)
+
+    # 12 kHz cannot be represented at 16 kHz and must not alias down to 4 kHz
+    assert np.abs(decoded).max() < 1e-3
+
+def test_invalid_input_is_rejected():
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"")
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"RIFF\x04\x00\x00\x00WAVE")
+    with pytest.raises(AudioDecodeError):
+        decode_wav(pcm_wav(tone(SAMPLE_RATE), SAMPLE_RATE).replace(b"\x01\x00\x01\x00", b"\x02\x00\x01\x00", 1))
+
+def test_compressed_audio_is_piped_through_ffmpeg(monkeypatch):
+    run = Mock(return_value=Mock(stdout=np.array([0, 16384, -32768], dtype="<i2").tobytes()))
+    monkeypatch.setattr(audio.subprocess, "run", run)
+
+    decoded = decode_audio(b"ID3 compressed")
+
+    np.testing.assert_array_equal(decoded, np.array([0, 0.5, -1], dtype=np.float32))
+    command = run.call_args.args[0]
+    assert command[0] == "ffmpeg" and "pipe:0" in command and command[-1] == "pipe:1"
+    assert run.call_args.kwargs["input"] == b"ID3 compressed"
+
+def test_missing_ffmpeg_is_a_decode_error(monkeypatch):
+    monkeypatch.setattr(audio.subprocess, "run", Mock(side_effect=FileNotFoundError))
+    with pytest.raises(AudioDecodeError, match="ffmpeg"):
+        decode_audio(b"OggS compressed")
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_ffmpeg_rejects_garbage():
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"not audio at all")
+
+async def test_whisper_transcribes_without_temp_files(monkeypatch):
+    monkeypatch.setattr("tempfile.NamedTemporaryFile", Mock(side_effect=AssertionError("temp file used")))
+    service = VoiceService()
+    service.settings.STT_PROVIDER = "whisper"
+    service.whisper_model = Mock(transcribe=Mock(return_value={"text": " hello "}))
+    samples = tone(SAMPLE_RATE)
+
+    assert await service.speech_to_text(io.BytesIO(pcm_wav(samples, SAMPLE_RATE))) == "hello"
+
+    decoded = service.whisper_model.transcribe.call_args.args[0]
+    assert isinstance(decoded, np.ndarray) and decoded.dtype == np.float32
+    assert decoded.flags.writeable
@@ -0,0 +1,86 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.services.availability import MINUTES_PER_DAY, OccupancyGrid, StaffIntervalIndex, slot_offsets
+
+DAY = datetime(2024, 3, 10)
+
+def reference_slots(appointments, duration_minutes, open_hour=9, close_hour=17):
+    """The original nested-loop slot scan, used as the oracle."""
+    slots = []
+    current = DAY + timedelta(hours=open_hour)
+    end = DAY + timedelta(hours=close_hour)
+    while current < end:
+        slot_end = current + timedelta(minutes=duration_minutes)
+        if slot_end > end:
+            break
+        if all(not (current < a_end and slot_end > a_start) for _, a_start, a_end in appointments):
+            slots.append(current)
+        current += timedelta(minutes=30)
+    return slots
+
+def free_slots(grid, duration_minutes, day=0):
+    """Slots from 9:00 to 17:00 where every row is free, read off free_mask as the service does."""
+    offsets = slot_offsets(duration_minutes, 9 * 60, 17 * 60)
+    mask = grid.free_mask(duration_minutes, offsets + day * MINUTES_PER_DAY).all(axis=0)
+    return [DAY + timedelta(days=day, minutes=int(minute)) for minute in offsets[mask]]
+
+def random_appointments(rng, count, rows):
+    appointments = []
+    for _ in range(count):
+        start = DAY + timedelta(minutes=rng.randint(6 * 60, 20 * 60), seconds=rng.choice([0, 0, 0, 17]))
+        appointments.append((rng.randrange(rows), start, start + timedelta(minutes=rng.choice([15, 45, 60, 120]))))
+    return appointments
+
+def test_empty_day_returns_every_slot():
+    occupancy = OccupancyGrid(DAY)
+    slots = free_slots(occupancy, 60)
+    assert slots == reference_slots([], 60)
+    assert slots[0] == DAY + timedelta(hours=9)
+    assert slots[-1] == DAY + timedelta(hours=16)
+
+def test_appointment_blocks_overlapping_slots():
+    appointments = [(0, DAY + timedelta(hours=10), DAY + timedelta(hours=11))]
+    occupancy = OccupancyGrid.from_intervals(DAY, appointments)
+    slots = free_slots(occupancy, 60)
+    assert DAY + timedelta(hours=9) in slots
+    assert DAY + timedelta(hours=9, minutes=30) not in slots
+    assert DAY + timedelta(hours=10, minutes=30) not in slots
+    assert DAY + timedelta(hours=11) in slots
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_reference_scan(seed):
+    rng = random.Random(seed)
+    rows = rng.randint(1, 4)
+    appointments = random_appointments(rng, rng.randint(0, 12), rows)
+    duration = rng.choice([30, 45, 60, 120])
+
+    occupancy = OccupancyGrid.from_intervals(DAY, appointments, rows=rows)
+
+    assert free_slots(occupancy, duration) == reference_slots(appointments, duration)
+
+def test_multi_day_grid_matches_single_day_grids():
+    rng = random.Random(7)
+    appointments = []
+    for day in range(3):
+        for row, start, end in random_appointments(rng, 6, 2):
+            shift = timedelta(days=day)
+            appointments.append((row, start + shift, end + shift))
+
+    grid = OccupancyGrid.from_intervals(DAY, appointments, days=3, rows=2)
+
+    for day in range(3):
+        shift = timedelta(days=day)
+        single_day = [(row, start - shift, end - shift) for row, start, end in appointments]
+        expected = [slot + shift for slot in reference_slots(single_day, 60)]
+        assert free_slots(grid, 60, day=day) == expected
+
+def test_interval_index_sees_long_intervals_behind_overlapping_ones():
+    index = StaffIntervalIndex()
+    # Legacy data can overlap: a long booking followed by a short one inside it
+    index.add(1, DAY + timedelta(hours=9), DAY + timedelta(hours=17))
+    index.add(1, DAY + timedelta(hours=10), DAY + timedelta(hours=11))
+
+    assert index.overlaps(1, DAY + timedelta(hours=12), DAY + timedelta(hours=13))
+    assert not index.overlaps(1, DAY + timedelta(hours=17), DAY + timedelta(hours=18))
+    assert not index.overlaps(2, DAY + timedelta(hours=12), DAY + timedelta(hours=13))
@@ -0,0 +1,76 @@
+from datetime import date, datetime
+from unittest.mock import patch
+from app.services.availability_cache import (
+    AvailabilityCache,
+    AvailabilityKey,
+    InMemoryAvailabilityBackend,
+)
+
+DAY = date(2024, 3, 11)
+
+def key(staff_id=1, duration=60, day=DAY, branch_id=1):
+    return AvailabilityKey(branch_id, staff_id, duration, day)
+
+def test_hits_and_misses_are_counted():
+    cache = AvailabilityCache(InMemoryAvailabilityBackend(max_entries=10, ttl_seconds=60))
+    cache.set_many({key(): (540, 570)})
+
+    assert cache.get_many([key(), key(staff_id=2)]) == {key(): (540, 570)}
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    backend = InMemoryAvailabilityBackend(max_entries=2, ttl_seconds=60)
+    backend.set_many({key(staff_id=1): (), key(staff_id=2): ()})
+    backend.get_many([key(staff_id=1)])
+    backend.set_many({key(staff_id=3): ()})
+
+    assert set(backend.get_many([key(staff_id=1), key(staff_id=2), key(staff_id=3)])) == {
+        key(staff_id=1), key(staff_id=3)
+    }
+
+def test_entries_expire_after_ttl():
+    backend = InMemoryAvailabilityBackend(max_entries=10, ttl_seconds=30)
+    with patch("app.services.availability_cache.time.monotonic", return_value=100.0):
+        backend.set_many({key(): (540,)})
+    with patch("app.services.availability_cache.time.monotonic", return_value=131.0):
+        assert backend.get_many([key()]) == {}
+    assert backend.size() == 0
+
+def test_invalidation_drops_every_duration_for_the_staff_day_only():
+    cache = AvailabilityCache(InMemoryAvailabilityBackend(max_entries=10, ttl_seconds=60))
+    other_day = date(2024, 3, 12)
+    cache.set_many({
+        key(duration=45): (),
+        key(duration=60): (),
+        key(staff_id=2): (),
+        key(day=other_day): (),
+    })
+
+    cache.invalidate_appointment(1, datetime(2024, 3, 11, 10), datetime(2024, 3, 11, 11))
+
+    remaining = cache.get_many([key(duration=45), key(duration=60), key(staff_id=2), key(day=other_day)])
+    assert set(remaining) == {key(staff_id=2), key(day=other_day)}
+
+def test_slots_computed_before_an_invalidation_are_not_stored():
+    cache = AvailabilityCache(InMemoryAvailabilityBackend(max_entries=10, ttl_seconds=60))
+    generation = cache.generation
+
+    cache.invalidate(1, DAY)
+    cache.set_many({key(): (540,)}, generation)
+    assert cache.get_many([key()]) == {}
+
+    cache.set_many({key(): (540,)}, cache.generation)
+    assert cache.get_many([key()]) == {key(): (540,)}
+
+def test_backend_failures_during_invalidation_are_logged():
+    backend = InMemoryAvailabilityBackend(max_entries=10, ttl_seconds=60)
+    cache = AvailabilityCache(backend)
+    with patch.object(backend, "invalidate", side_effect=ConnectionError("down")), \
+            patch.object(backend, "invalidate_branch", side_effect=ConnectionError("down")), \
+            patch("app.services.availability_cache.logger") as logger:
+        cache.invalidate(1, DAY)
+        cache.invalidate_branch(1)
+    assert logger.warning.call_count == 2
@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from app.models import Appointment, AppointmentStatus, Branch, Customer, Service, Staff
+from app.services.export_service import EXPORT_COLUMNS, AppointmentExportService
+
+DAY = datetime(2024, 3, 11)
+
+async def seed(async_sessions, count=7):
+    async with async_sessions() as db:
+        branch = Branch(name="Downtown", address="1 Main St", city="SF", state="CA", phone="555-0001")
+        service = Service(name="Haircut", duration_minutes=60, price=50.0, category="Hair")
+        customers = [Customer(name=f"Customer {i}", email=f"c{i}@example.com") for i in range(2)]
+        db.add_all([branch, service] + customers)
+        await db.flush()
+        stylist = Staff(name="Stylist", email="stylist@salon.com", role="Stylist", branch_id=branch.id)
+        db.add(stylist)
+        await db.flush()
+        db.add_all([
+            Appointment(
+                customer_id=customers[i % 2].id,
+                staff_id=stylist.id,
+                branch_id=branch.id,
+                service_id=service.id,
+                appointment_time=DAY + timedelta(hours=i),
+                end_time=DAY + timedelta(hours=i + 1),
+                status=AppointmentStatus.CANCELLED if i == 3 else AppointmentStatus.SCHEDULED,
+                notes="Line one, with a comma" if i == 0 else None
+            )
+            for i in range(count)
+        ])
+        await db.commit()
+        return [customer.id for customer in customers]
+
+async def collect(async_sessions, fmt, batch_size=2, **filters):
+    async with async_sessions() as db:
+        return [chunk async for chunk in AppointmentExportService(db, batch_size).export(fmt, **filters)]
+
+async def test_ndjson_export_streams_in_batches(async_sessions):
+    await seed(async_sessions)
+
+    chunks = await collect(async_sessions, "ndjson")
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+
+    assert len(chunks) == 4  # Seven rows in batches of two
+    assert [row["appointment_time"] for row in rows] == [
+        (DAY + timedelta(hours=i)).isoformat() for i in range(7)
+    ]
+    assert set(rows[0]) == set(EXPORT_COLUMNS)
+    assert rows[3]["status"] == "cancelled"
+
+async def test_csv_export_has_header_and_quotes_values(async_sessions):
+    await seed(async_sessions)
+
+    rows = list(csv.DictReader(io.StringIO("".join(await collect(async_sessions, "csv")))))
+
+    assert len(rows) == 7
+    assert rows[0]["notes"] == "Line one, with a comma"
+    assert rows[1]["notes"] == ""
+    assert rows[0]["end_time"] == (DAY + timedelta(hours=1)).isoformat()
+
+async def test_export_applies_listing_and_status_filters(async_sessions):
+    first_customer, _ = await seed(async_sessions)
+
+    chunks = await collect(
+        async_sessions,
+        "ndjson",
+        customer_id=first_customer,
+        start_date=DAY + timedelta(hours=1),
+        status=AppointmentStatus.SCHEDULED
+    )
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+
+    assert [row["appointment_time"] for row in rows] == [
+        (DAY + timedelta(hours=i)).isoformat() for i in (2, 4, 6)
+    ]
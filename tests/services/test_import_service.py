@@ -0,0 +1,137 @@
+import io
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+from app.models import Appointment, AppointmentStatus
+from app.services.import_service import AppointmentImportService, read_rows
+
+DAY = datetime(2024, 3, 11)
+
+def csv_file(salon, rows):
+    lines = ["customer_id,staff_id,service_id,branch_id,appointment_time,status,notes"]
+    for staff, start, status in rows:
+        lines.append(
+            f"{salon['customer'].id},{staff.id},{salon['service'].id},{staff.branch_id},"
+            f"{start.isoformat()},{status},imported"
+        )
+    return io.StringIO("\n".join(lines) + "\n")
+
+def test_imports_valid_rows_and_reports_conflicts(db, salon):
+    stylist, other = salon["staff"][0], salon["staff"][1]
+    db.add(Appointment(
+        customer_id=salon["customer"].id, staff_id=stylist.id, branch_id=stylist.branch_id,
+        service_id=salon["service"].id, appointment_time=DAY + timedelta(hours=9),
+        end_time=DAY + timedelta(hours=10), status=AppointmentStatus.SCHEDULED
+    ))
+    db.commit()
+
+    stream = csv_file(salon, [
+        (stylist, DAY + timedelta(hours=9, minutes=30), "scheduled"),   # clashes with existing
+        (stylist, DAY + timedelta(hours=10), "confirmed"),
+        (stylist, DAY + timedelta(hours=10, minutes=30), "scheduled"),  # clashes with row 2
+        (stylist, DAY + timedelta(hours=10, minutes=30), "cancelled"),  # cancelled never clash
+        (other, DAY + timedelta(hours=10), ""),
+    ])
+
+    report = AppointmentImportService(db, batch_size=2).import_stream(stream, "csv")
+
+    assert report["imported"] == 3
+    assert [error["row"] for error in report["errors"]] == [1, 3]
+    assert "Conflicts" in report["errors"][0]["error"]
+    assert db.query(Appointment).count() == 4
+    imported = db.query(Appointment).filter(Appointment.notes == "imported").order_by(Appointment.id).all()
+    assert imported[0].end_time == DAY + timedelta(hours=11)
+    assert imported[1].status == AppointmentStatus.CANCELLED
+
+def test_ndjson_rows_are_validated_against_reference_data(db, salon):
+    stylist = salon["staff"][0]
+    base = {
+        "customer_id": salon["customer"].id,
+        "staff_id": stylist.id,
+        "service_id": salon["service"].id,
+        "branch_id": stylist.branch_id,
+        "appointment_time": (DAY + timedelta(hours=12)).isoformat(),
+    }
+    lines = [
+        json.dumps(base),
+        "{not json",
+        json.dumps({**base, "service_id": 999}),
+        json.dumps({**base, "branch_id": salon["branches"][1].id}),
+        json.dumps({**base, "appointment_time": "tomorrow"}),
+        json.dumps({key: value for key, value in base.items() if key != "staff_id"}),
+    ]
+
+    report = AppointmentImportService(db).import_stream(io.StringIO("\n".join(lines)), "ndjson", dry_run=True)
+
+    assert report["valid_rows"] == 1
+    assert report["imported"] == 0
+    assert [error["row"] for error in report["errors"]] == [2, 3, 4, 5, 6]
+    assert db.query(Appointment).count() == 0
+
+def test_read_rows_skips_blank_ndjson_lines():
+    rows = list(read_rows(io.StringIO('{"a": 1}\n\n{"a": 2}\n'), "ndjson"))
+
+    assert rows == [(1, {"a": 1}), (2, {"a": 2})]
+
+def test_rows_booked_after_validation_are_not_imported(db, salon, monkeypatch):
+    stylist = salon["staff"][0]
+    stream = csv_file(salon, [
+        (stylist, DAY + timedelta(hours=9), "scheduled"),
+        (stylist, DAY + timedelta(hours=11), "scheduled"),
+    ])
+    service = AppointmentImportService(db)
+    validate = service._validate
+
+    def validate_then_book(*args):
+        accepted = validate(*args)
+        # A regular booking lands between validation and the insert
+        db.add(Appointment(
+            customer_id=salon["customer"].id, staff_id=stylist.id, branch_id=stylist.branch_id,
+            service_id=salon["service"].id, appointment_time=DAY + timedelta(hours=9, minutes=30),
+            end_time=DAY + timedelta(hours=10, minutes=30), status=AppointmentStatus.SCHEDULED
+        ))
+        db.commit()
+        return accepted
+
+    monkeypatch.setattr(service, "_validate", validate_then_book)
+    report = service.import_stream(stream, "csv")
+
+    assert report["imported"] == 1
+    assert [error["row"] for error in report["errors"]] == [1]
+    assert db.query(Appointment).count() == 2
+
+def test_dry_run_reports_conflicts_across_batches(db, salon):
+    stylist = salon["staff"][0]
+    stream = csv_file(salon, [
+        (stylist, DAY + timedelta(hours=9), "scheduled"),
+        (stylist, DAY + timedelta(hours=11), "scheduled"),
+        (stylist, DAY + timedelta(hours=9, minutes=30), "scheduled"),  # clashes with row 1
+    ])
+
+    report = AppointmentImportService(db, batch_size=2).import_stream(stream, "csv", dry_run=True)
+
+    assert report["total_rows"] == 3
+    assert report["valid_rows"] == 2
+    assert [error["row"] for error in report["errors"]] == [3]
+
+def test_failed_copy_batch_is_rolled_back_and_reported(db, salon, monkeypatch):
+    stylist = salon["staff"][0]
+    stream = csv_file(salon, [
+        (stylist, DAY + timedelta(hours=9), "scheduled"),
+        (stylist, DAY + timedelta(hours=11), "scheduled"),
+    ])
+    service = AppointmentImportService(db)
+    # Drive the COPY path with a raw driver cursor that rejects the batch
+    cursor = Mock(copy_expert=Mock(side_effect=sqlite3.IntegrityError("exclusion violation")))
+    monkeypatch.setattr(db, "connection", lambda: Mock(connection=Mock(cursor=Mock(return_value=cursor))))
+    monkeypatch.setattr(service, "_insert_batch", service._copy_batch)
+
+    report = service.import_stream(stream, "csv")
+
+    assert report["imported"] == 0
+    assert report["errors"] == [
+        {"row": 1, "error": "Batch insert failed"},
+        {"row": 2, "error": "Batch insert failed"},
+    ]
+    cursor.close.assert_called_once()
@@ -0,0 +1,116 @@
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app.models import Appointment, AppointmentStatus, DailyOccupancy
+from app.services.appointment_service import AppointmentService
+from app.services.import_service import AppointmentImportService
+from app.services.occupancy_rollup import OccupancyRollupService, rebuild_daily_occupancy
+
+DAY = datetime(2024, 3, 11)  # A Monday
+
+def rollup_rows(db):
+    return sorted(
+        (tuple(row) for row in db.execute(select(
+            DailyOccupancy.branch_id,
+            DailyOccupancy.staff_id,
+            DailyOccupancy.day,
+            DailyOccupancy.status,
+            DailyOccupancy.appointment_count,
+            DailyOccupancy.booked_minutes,
+            DailyOccupancy.revenue
+        ).where(DailyOccupancy.appointment_count != 0))),
+        key=lambda row: (row[:3], row[3].value)
+    )
+
+async def book(db, salon, staff, start):
+    return await AppointmentService(db).create_appointment(
+        customer_id=salon["customer"].id,
+        staff_id=staff.id,
+        service_id=salon["service"].id,
+        branch_id=staff.branch_id,
+        appointment_time=start
+    )
+
+async def test_rollup_follows_bookings_and_cancellations(db, salon):
+    stylist = salon["staff"][0]
+    first = await book(db, salon, stylist, DAY + timedelta(hours=9))
+    await book(db, salon, stylist, DAY + timedelta(hours=11))
+    await AppointmentService(db).cancel_appointment(first["id"])
+
+    assert rollup_rows(db) == [
+        (stylist.branch_id, stylist.id, DAY.date(), AppointmentStatus.CANCELLED, 1, 60, 50.0),
+        (stylist.branch_id, stylist.id, DAY.date(), AppointmentStatus.SCHEDULED, 1, 60, 50.0),
+    ]
+
+    appointment = db.get(Appointment, first["id"])
+    db.delete(appointment)
+    db.commit()
+    assert [row[3] for row in rollup_rows(db)] == [AppointmentStatus.SCHEDULED]
+
+async def test_price_changes_do_not_skew_booked_revenue(db, salon):
+    stylist = salon["staff"][0]
+    first = await book(db, salon, stylist, DAY + timedelta(hours=9))
+    salon["service"].price = 80.0
+    db.commit()
+    await book(db, salon, stylist, DAY + timedelta(hours=11))
+
+    # Cancelling takes back the 50.0 charged when booked, not today's price
+    await AppointmentService(db).cancel_appointment(first["id"])
+    assert rollup_rows(db) == [
+        (stylist.branch_id, stylist.id, DAY.date(), AppointmentStatus.CANCELLED, 1, 60, 50.0),
+        (stylist.branch_id, stylist.id, DAY.date(), AppointmentStatus.SCHEDULED, 1, 60, 80.0),
+    ]
+    incremental = rollup_rows(db)
+    rebuild_daily_occupancy(db)
+    assert rollup_rows(db) == incremental
+
+async def test_rebuild_matches_incremental_rollup(db, salon):
+    stylist_a, stylist_b = salon["staff"][:2]
+    await book(db, salon, stylist_a, DAY + timedelta(hours=9))
+    await book(db, salon, stylist_b, DAY + timedelta(days=1, hours=10))
+    cancelled = await book(db, salon, stylist_b, DAY + timedelta(days=1, hours=12))
+    await AppointmentService(db).cancel_appointment(cancelled["id"])
+    AppointmentImportService(db).import_records([(1, {
+        "customer_id": salon["customer"].id,
+        "staff_id": stylist_a.id,
+        "service_id": salon["service"].id,
+        "branch_id": stylist_a.branch_id,
+        "appointment_time": (DAY + timedelta(days=2, hours=9)).isoformat(),
+        "end_time": (DAY + timedelta(days=2, hours=9, minutes=90)).isoformat()
+    })])
+
+    incremental = rollup_rows(db)
+    assert len(incremental) == 4
+
+    assert rebuild_daily_occupancy(db) == 4
+    assert rollup_rows(db) == incremental
+
+    # A ranged rebuild only replaces its own days
+    assert rebuild_daily_occupancy(db, DAY.date() + timedelta(days=1), DAY.date() + timedelta(days=1)) == 2
+    assert rollup_rows(db) == incremental
+
+async def test_daily_occupancy_report(db, salon):
+    downtown = salon["branches"][0]
+    downtown.opening_hours = json.dumps({"Mon-Sun": "9:00-13:00"})
+    db.commit()
+    stylist = salon["staff"][0]
+    await book(db, salon, stylist, DAY + timedelta(hours=9))
+    cancelled = await book(db, salon, stylist, DAY + timedelta(hours=11))
+    await AppointmentService(db).cancel_appointment(cancelled["id"])
+
+    report = await OccupancyRollupService(db).get_daily_occupancy(DAY.date(), DAY.date() + timedelta(days=6))
+
+    assert report == [{
+        "branch_id": downtown.id,
+        "staff_id": stylist.id,
+        "day": DAY.date(),
+        "appointment_count": 1,
+        "cancelled_count": 1,
+        "booked_minutes": 60,
+        "revenue": 50.0,
+        "open_minutes": 240,
+        "utilization": 0.25
+    }]
+    assert await OccupancyRollupService(db).get_daily_occupancy(
+        DAY.date(), DAY.date(), staff_id=salon["staff"][2].id
+    ) == []
@@ -0,0 +1,55 @@
+import json
+from datetime import date
+from unittest.mock import patch
+import pytest
+from app.services.opening_hours import DEFAULT_HOURS, OpeningHoursCache, parse_opening_hours
+
+def test_parses_day_ranges_and_closed_days():
+    hours = parse_opening_hours(json.dumps({
+        "Mon-Fri": "9:00-20:00",
+        "Sat": "10:00-18:00",
+        "Sun": "Closed"
+    }))
+
+    assert hours.for_weekday(0) == ((540, 1200),)
+    assert hours.for_weekday(4) == ((540, 1200),)
+    assert hours.for_weekday(5) == ((600, 1080),)
+    assert hours.for_weekday(6) == ()
+    assert hours.for_date(date(2024, 3, 10)) == ()  # A Sunday
+
+def test_unlisted_days_are_closed_and_ranges_wrap():
+    hours = parse_opening_hours(json.dumps({"Sat-Mon": "10:00-17:00"}))
+
+    assert [bool(hours.for_weekday(day)) for day in range(7)] == [True, False, False, False, False, True, True]
+
+def test_split_intervals_produce_slots_in_each_interval():
+    hours = parse_opening_hours(json.dumps({"Mon-Sun": "9:00-12:00, 13:00-15:00"}))
+
+    assert hours.slot_offsets(0, 60).tolist() == [540, 570, 600, 630, 660, 780, 810, 840]
+
+@pytest.mark.parametrize("raw", [None, "", "not json", json.dumps({"Someday": "9:00-17:00"}), json.dumps({"Mon": "17:00-9:00"})])
+def test_missing_or_invalid_hours_fall_back_to_defaults(raw):
+    assert parse_opening_hours(raw) is DEFAULT_HOURS
+
+def test_cached_hours_expire_and_are_not_restored_after_invalidation(db, salon):
+    branch_id = salon["branches"][0].id
+    cache = OpeningHoursCache(ttl_seconds=60)
+    load = db.query
+    with patch.object(db, "query", wraps=load) as query:
+        with patch("app.services.opening_hours.time.monotonic", return_value=100.0):
+            cache.get(db, branch_id)
+            cache.get(db, branch_id)
+        assert query.call_count == 1
+        # Changed by another worker, so only the TTL reloads it
+        with patch("app.services.opening_hours.time.monotonic", return_value=161.0):
+            cache.get(db, branch_id)
+        assert query.call_count == 2
+
+    # An invalidation while hours are being loaded keeps them out of the cache
+    def query_then_invalidate(*entities):
+        cache.invalidate(branch_id)
+        return load(*entities)
+    cache.invalidate()
+    with patch.object(db, "query", side_effect=query_then_invalidate):
+        cache.get(db, branch_id)
+    assert cache._hours == {}
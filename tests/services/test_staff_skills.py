@@ -0,0 +1,75 @@
+from unittest.mock import patch
+from app.models import Service, Staff
+from app.services.appointment_service import AppointmentService
+from app.services.staff_skills import SkillIndex, StaffSkillCache, staff_skill_cache
+
+def test_skill_index_resolves_skills_and_generalists():
+    index = SkillIndex([
+        (1, 10, "hair"),
+        (1, 10, "color"),
+        (2, 10, "nails"),
+        (3, 10, None),
+        (4, 20, "hair"),
+    ])
+
+    assert index.eligible(10, "Hair") == (1, 3)
+    assert index.eligible(10, " NAILS ") == (2, 3)
+    assert index.eligible(10, "Massage") == (3,)
+    # Uncategorized services can be provided by everyone at the branch
+    assert index.eligible(10, None) == (1, 2, 3)
+    assert index.eligible(20, "hair") == (4,)
+    assert index.eligible(30, "hair") == ()
+
+def test_specialties_are_stored_as_skills(db, salon):
+    stylist = salon["staff"][0]
+    assert [skill.skill for skill in stylist.skills] == ["color", "hair"]
+
+    # Skills kept across an update keep their rows
+    color = stylist.skills[0]
+    stylist.specialties = "Nails, color"
+    db.commit()
+    assert stylist.specialties == "color,nails"
+    assert stylist.skills[0] is color
+
+async def test_eligible_staff_follow_committed_staff_changes(db, salon):
+    stylists = salon["staff"]
+    downtown = salon["branches"][0]
+    service = AppointmentService(db)
+    nails = Service(name="Manicure", duration_minutes=30, price=25.0, category="Nails")
+    db.add(nails)
+    db.commit()
+
+    assert service._eligible_staff(salon["service"], [downtown.id]) == {downtown.id: [stylists[0].id, stylists[2].id]}
+    assert service._eligible_staff(nails, [downtown.id]) == {downtown.id: []}
+    loaded = staff_skill_cache.get(db)
+    assert staff_skill_cache.get(db) is loaded
+
+    stylists[0].specialties = "Nails"
+    stylists[2].is_active = False
+    db.commit()
+    assert staff_skill_cache.get(db) is not loaded
+    assert service._eligible_staff(salon["service"], [downtown.id]) == {downtown.id: []}
+    assert service._eligible_staff(nails, [downtown.id]) == {downtown.id: [stylists[0].id]}
+
+    generalist = Staff(name="Generalist", email="generalist@salon.com", role="Stylist", branch_id=downtown.id)
+    db.add(generalist)
+    db.commit()
+    assert service._eligible_staff(nails, [downtown.id], [generalist.id]) == {downtown.id: [generalist.id]}
+
+    # An index loaded while this session has uncommitted staff changes is
+    # used for the session but not kept
+    staff_skill_cache.invalidate()
+    stylists[0].specialties = "Hair"
+    db.flush()
+    assert service._eligible_staff(salon["service"], [downtown.id]) == {downtown.id: [stylists[0].id, generalist.id]}
+    db.rollback()
+    assert service._eligible_staff(salon["service"], [downtown.id]) == {downtown.id: [generalist.id]}
+
+def test_index_is_reloaded_after_ttl_for_other_workers_changes(db, salon):
+    cache = StaffSkillCache(ttl_seconds=30)
+    with patch("app.services.staff_skills.time.monotonic", return_value=100.0):
+        loaded = cache.get(db)
+    with patch("app.services.staff_skills.time.monotonic", return_value=129.0):
+        assert cache.get(db) is loaded
+    with patch("app.services.staff_skills.time.monotonic", return_value=131.0):
+        assert cache.get(db) is not loaded
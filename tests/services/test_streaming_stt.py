@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+from app.core.exceptions import ServiceUnavailableError
+from app.services.streaming_stt import EnergyVAD, StreamingTranscriber
+
+RATE = 16000
+
+def pcm(seconds, amplitude=0.0, rate=RATE, seed=0):
+    """
+    16-bit PCM: quiet noise, or a 300 Hz tone standing in for speech
+    """
+    count = int(rate * seconds)
+    noise = np.random.default_rng(seed).standard_normal(count) * 0.001
+    tone = amplitude * np.sin(2 * np.pi * 300 * np.arange(count) / rate)
+    return (np.clip(noise + tone, -1, 1) * 32767).astype("<i2").tobytes()
+
+def chunks(data, ms=100, rate=RATE):
+    size = rate * ms // 1000 * 2
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+class FakeRecognizer:
+    def __init__(self, busy_partials=False):
+        self.calls = []
+        self.busy_partials = busy_partials
+
+    async def __call__(self, samples):
+        self.calls.append(samples)
+        if self.busy_partials and len(self.calls) % 2:
+            raise ServiceUnavailableError(retry_after=1)
+        return f"{len(samples) / RATE:.1f}s"
+
+async def stream(transcriber, data, ms=100, rate=RATE):
+    events = []
+    for chunk in chunks(data, ms, rate):
+        events.extend(await transcriber.feed(chunk))
+    return events
+
+def test_vad_detects_start_and_end_of_speech():
+    vad = EnergyVAD(min_speech_ms=90, end_silence_ms=300)
+    frames = np.frombuffer(pcm(0.6) + pcm(0.6, 0.3) + pcm(0.6), dtype="<i2").astype(np.float32) / 32768
+    changes = [
+        (i, change) for i, change in
+        enumerate(vad.update(frame) for frame in frames[:len(frames) // 480 * 480].reshape(-1, 480))
+        if change
+    ]
+
+    assert [change for _, change in changes] == ["start", "end"]
+    # 20 frames of noise, speech confirmed on its third frame, then 10 frames of silence
+    assert changes[0][0] == 22
+    assert changes[1][0] == 49
+
+async def test_partial_then_final_transcripts():
+    recognizer = FakeRecognizer()
+    transcriber = StreamingTranscriber(recognizer, partial_interval=1.0)
+
+    events = await stream(transcriber, pcm(0.5) + pcm(2.5, 0.3) + pcm(1.0))
+
+    assert [event["type"] for event in events] == ["partial", "partial", "final"]
+    final = recognizer.calls[-1]
+    # The utterance keeps a little audio from before speech was confirmed
+    assert 2.5 < len(final) / RATE < 3.5
+    assert len(recognizer.calls[0]) < len(recognizer.calls[1]) < len(final)
+
+async def test_silence_produces_nothing_and_flush_finalizes():
+    recognizer = FakeRecognizer()
+    transcriber = StreamingTranscriber(recognizer, partial_interval=10)
+
+    assert await stream(transcriber, pcm(2.0)) == []
+    assert await transcriber.flush() == []
+    assert recognizer.calls == []
+
+    await stream(transcriber, pcm(1.0, 0.3))
+    events = await transcriber.flush()
+    assert [event["type"] for event in events] == ["final"]
+    assert not transcriber.vad.in_speech
+
+async def test_busy_recognizer_skips_partials_only():
+    transcriber = StreamingTranscriber(FakeRecognizer(busy_partials=True), partial_interval=0.5)
+
+    events = await stream(transcriber, pcm(0.5) + pcm(2.0, 0.3) + pcm(1.0))
+
+    assert events[-1]["type"] == "final"
+    assert len([event for event in events if event["type"] == "partial"]) < 4
+
+async def test_other_sample_rates_and_odd_chunks_are_handled():
+    recognizer = FakeRecognizer()
+    transcriber = StreamingTranscriber(recognizer, sample_rate=8000, partial_interval=10)
+    data = pcm(0.5, rate=8000) + pcm(1.5, 0.3, rate=8000) + pcm(1.0, rate=8000)
+
+    events = []
+    # Chunks that split samples in half
+    for offset in range(0, len(data), 1601):
+        events.extend(await transcriber.feed(data[offset:offset + 1601]))
+
+    assert [event["type"] for event in events] == ["final"]
+    assert 1.5 < len(recognizer.calls[0]) / RATE < 2.5
+
+async def test_utterances_are_resampled_whole():
+    recognizer = FakeRecognizer()
+    transcriber = StreamingTranscriber(recognizer, sample_rate=8000, partial_interval=10)
+    data = pcm(0.5, rate=8000) + pcm(1.5, 0.3, rate=8000) + pcm(1.0, rate=8000)
+
+    # 1000-sample chunks, which resampled one by one drifted in length
+    for offset in range(0, len(data), 2000):
+        await transcriber.feed(data[offset:offset + 2000])
+
+    final = recognizer.calls[0]
+    # Whole 30 ms frames at 8 kHz become exactly twice as many samples
+    assert len(final) % (2 * transcriber.frame_samples) == 0
+    # No discontinuities at chunk boundaries: a 300 Hz tone at 16 kHz moves
+    # by at most 0.3 * 2 * pi * 300 / 16000 between samples
+    speech = final[int(0.4 * RATE):int(1.2 * RATE)]
+    assert np.max(np.abs(np.diff(speech))) < 0.05
+
+async def test_busy_final_is_kept_and_retried():
+    recognizer = FakeRecognizer()
+    busy = [True]
+
+    async def transcribe(samples):
+        if busy[0]:
+            raise ServiceUnavailableError(retry_after=1)
+        return await recognizer(samples)
+
+    transcriber = StreamingTranscriber(transcribe, partial_interval=10)
+    events = await stream(transcriber, pcm(0.5) + pcm(1.5, 0.3) + pcm(0.7) + pcm(0.5, 0.3))
+
+    # The error is reported and the speech that follows is still segmented
+    assert [event["type"] for event in events] == ["error"]
+    assert events[0]["status_code"] == 503 and events[0]["retry_after"] == "1"
+    assert transcriber.vad.in_speech
+
+    busy[0] = False
+    events = await transcriber.flush()
+    assert [event["type"] for event in events] == ["final", "final"]
+    assert 1.5 < len(recognizer.calls[0]) / RATE < 2.5
+    assert 0.3 < len(recognizer.calls[1]) / RATE < 1.0
@@ -0,0 +1,101 @@
+import threading
+from unittest.mock import Mock
+import numpy as np
+import pytest
+import torch
+import whisper
+from whisper.model import ModelDimensions, Whisper
+from app.services import stt_batching
+from app.services.stt_batching import WhisperBatcher, decode_batch, decode_windows
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    """
+    A randomly initialized single-layer Whisper, small enough to run in tests
+    """
+    torch.manual_seed(0)
+    dims = ModelDimensions(
+        n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=1,
+        n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=1
+    )
+    return Whisper(dims).eval()
+
+def utterances(count, seconds=1):
+    rng = np.random.default_rng(0)
+    return [(rng.standard_normal(16000 * seconds * (i + 1)) * 0.1).astype(np.float32) for i in range(count)]
+
+def test_batched_decoding_matches_one_by_one(tiny_model, monkeypatch):
+    audio = utterances(3)
+    expected = [decode_windows(tiny_model, [samples], language="en", sample_len=8)[0] for samples in audio]
+    decode = Mock(wraps=tiny_model.decode)
+    monkeypatch.setattr(tiny_model, "decode", decode)
+
+    results = decode_batch(tiny_model, audio, language="en", sample_len=8)
+
+    assert [result["text"] for result in results] == [result["text"] for result in expected]
+    decode.assert_called_once()
+    assert decode.call_args.args[0].shape == (3, 80, whisper.audio.N_FRAMES)
+
+def test_long_and_single_utterances_use_transcribe(tiny_model, monkeypatch):
+    transcribe = Mock(return_value={"text": "long"})
+    monkeypatch.setattr(tiny_model, "transcribe", transcribe)
+    long = np.zeros(whisper.audio.N_SAMPLES + 1, dtype=np.float32)
+
+    results = decode_batch(tiny_model, [long] + utterances(2), language="en", sample_len=4)
+    assert results[0] == {"text": "long"}
+    assert transcribe.call_count == 1
+
+    assert decode_batch(tiny_model, utterances(1)) == [{"text": "long"}]
+
+def run_concurrently(batcher, model, count):
+    results = [None] * count
+
+    def call(i):
+        results[i] = batcher.transcribe(model, np.full(10, i, dtype=np.float32))
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+def test_concurrent_callers_share_a_batch(monkeypatch):
+    batches = []
+
+    def fake_decode_batch(model, audio, **options):
+        batches.append(len(audio))
+        return [{"text": str(int(samples[0]))} for samples in audio]
+
+    monkeypatch.setattr(stt_batching, "decode_batch", fake_decode_batch)
+    results = run_concurrently(WhisperBatcher(max_batch_size=4, max_wait=5), Mock(), 4)
+
+    # Filled up before max_wait, and each caller gets its own transcript back
+    assert batches == [4]
+    assert [result["text"] for result in results] == ["0", "1", "2", "3"]
+
+def test_batch_runs_after_max_wait_and_shares_errors(monkeypatch):
+    monkeypatch.setattr(stt_batching, "decode_batch", Mock(return_value=[{"text": "alone"}]))
+    assert WhisperBatcher(max_batch_size=4, max_wait=0.01).transcribe(Mock(), np.zeros(10)) == {"text": "alone"}
+
+    monkeypatch.setattr(stt_batching, "decode_batch", Mock(side_effect=RuntimeError("decoder failed")))
+    batcher = WhisperBatcher(max_batch_size=2, max_wait=5)
+    model = Mock()
+    errors = []
+
+    def call():
+        try:
+            batcher.transcribe(model, np.zeros(10))
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["decoder failed", "decoder failed"]
+
+def test_batching_disabled_calls_transcribe_directly():
+    model = Mock(transcribe=Mock(return_value={"text": "direct"}))
+    assert WhisperBatcher(max_batch_size=1).transcribe(model, np.zeros(10)) == {"text": "direct"}
@@ -0,0 +1,113 @@
+import asyncio
+import operator
+import os
+import threading
+from unittest.mock import Mock
+import pytest
+from app.core.exceptions import ServiceUnavailableError
+from app.services.stt_executor import STT_QUEUE_WAIT, STT_REJECTED, SttExecutor
+from app.services.voice_service import VoiceService
+
+def blocking_job(release: threading.Event, result="done"):
+    release.wait(5)
+    return result
+
+async def wait_until(condition, timeout=5):
+    for _ in range(int(timeout * 100)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+async def test_jobs_run_off_the_event_loop():
+    executor = SttExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+    job = asyncio.ensure_future(executor.run(blocking_job, release))
+    try:
+        # The loop keeps serving other work while the worker is busy
+        await wait_until(lambda: executor.in_flight() == 1)
+        assert await asyncio.wait_for(asyncio.sleep(0, result="served"), 1) == "served"
+    finally:
+        release.set()
+    assert await job == "done"
+    executor.shutdown()
+
+async def test_full_queue_is_rejected_with_retry_after():
+    executor = SttExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+    waits = STT_QUEUE_WAIT.count()
+    rejected = STT_REJECTED.value()
+    running = asyncio.ensure_future(executor.run(blocking_job, release, "first"))
+    queued = asyncio.ensure_future(executor.run(blocking_job, release, "second"))
+    await wait_until(lambda: executor.queue_depth() == 1)
+
+    with pytest.raises(ServiceUnavailableError) as error:
+        await executor.run(blocking_job, release)
+    assert error.value.status_code == 503
+    assert int(error.value.headers["Retry-After"]) >= 1
+    assert STT_REJECTED.value() == rejected + 1
+
+    release.set()
+    assert await asyncio.gather(running, queued) == ["first", "second"]
+    assert STT_QUEUE_WAIT.count() == waits + 2
+    assert executor.status()["in_flight"] == executor.status()["queue_depth"] == 0
+    executor.shutdown()
+
+async def test_abandoned_jobs_hold_their_slot_until_done():
+    executor = SttExecutor(workers=1, max_queue=0)
+    release = threading.Event()
+    job = asyncio.ensure_future(executor.run(blocking_job, release))
+    await wait_until(lambda: executor.in_flight() == 1)
+    job.cancel()
+    await asyncio.sleep(0)
+
+    # The worker is still busy, so there is still no room
+    with pytest.raises(ServiceUnavailableError):
+        await executor.run(operator.add, 1, 2)
+
+    release.set()
+    await wait_until(lambda: executor.in_flight() == 0)
+    assert await executor.run(operator.add, 1, 2) == 3
+    executor.shutdown()
+
+def test_retry_after_follows_job_duration():
+    executor = SttExecutor(workers=2, max_queue=2)
+    executor._record(3.0)
+    executor._pending = 4
+    # Two waves of queued work ahead at 3 seconds each, rounded up
+    assert executor._retry_after() == 5
+
+async def test_process_pool_runs_module_level_jobs():
+    executor = SttExecutor(mode="process", workers=1)
+    try:
+        assert await executor.run(operator.add, 2, 3) == 5
+    finally:
+        executor.shutdown()
+
+async def test_voice_service_transcribes_on_the_executor(wav_audio):
+    service = VoiceService()
+    service.settings.STT_PROVIDER = "whisper"
+    service.stt_executor = SttExecutor(workers=1, max_queue=0)
+    caller = threading.get_ident()
+    threads = []
+
+    def transcribe(audio):
+        threads.append(threading.get_ident())
+        return {"text": "hello"}
+
+    service.whisper_model = Mock(transcribe=transcribe)
+    assert await service.speech_to_text(Mock(read=Mock(return_value=wav_audio))) == "hello"
+    assert threads and threads[0] != caller
+    service.stt_executor.shutdown()
+
+def record_worker(directory):
+    open(os.path.join(directory, str(os.getpid())), "w").close()
+
+async def test_start_runs_the_initializer_in_every_worker_process(tmp_path):
+    executor = SttExecutor(mode="process", workers=2, initializer=record_worker, initargs=(str(tmp_path),))
+    try:
+        executor.start()
+        # Spawned workers import torch and the app before initializing
+        await wait_until(lambda: len(os.listdir(tmp_path)) == 2, timeout=60)
+    finally:
+        executor.shutdown()
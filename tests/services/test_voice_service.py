@@ -23,12 +23,10 @@ def mock_dependencies(mock_settings):
         speech_v1=Mock(),
         texttospeech_v1=Mock(),
         SessionsClient=Mock(),
-        whisper=Mock(),
         sr=Mock(),
         gTTS=Mock(),
         os=Mock(),
         Path=Mock(),
-        certifi=Mock(),
         settings=Mock(**mock_settings)
     ) as mocks:
         yield mocks
@@ -50,8 +48,8 @@ def voice_service(mock_dependencies):
     return service
 
 @pytest.fixture
-def sample_audio():
-    return io.BytesIO(b"fake audio content")
+def sample_audio(wav_audio):
+    return io.BytesIO(wav_audio)
 
 # Test service validation
 @pytest.mark.parametrize("input_service,expected_result", [
@@ -93,6 +91,20 @@ async def test_speech_to_text_no_provider(voice_service, sample_audio):
     with pytest.raises(ValueError, match="No speech-to-text service available"):
         await voice_service.speech_to_text(sample_audio)
 
+def test_whisper_load_failure_is_logged_and_falls_back_per_call(voice_service, caplog):
+    voice_service._whisper_model = None
+    voice_service.stt_executor = Mock(uses_processes=False)
+    voice_service.speech_client = Mock()
+    with patch("app.services.voice_service.whisper_models.get", side_effect=RuntimeError("no weights")):
+        assert voice_service._stt_provider() == "google_cloud"
+        voice_service.speech_client = None
+        assert voice_service._stt_provider() is None
+
+    messages = [(record.levelname, record.getMessage()) for record in caplog.records if record.name == "app.services.voice_service"]
+    assert ("ERROR", "Failed to load Whisper model: no weights") in messages
+    assert ("WARNING", "Falling back to Google Cloud Speech-to-Text") in messages
+    assert ("ERROR", "No speech-to-text service available") in messages
+
 # Test text to speech conversion
 @pytest.mark.asyncio
 async def test_gtts_text_to_speech_success(voice_service):
@@ -160,7 +172,7 @@ def test_extract_service_from_rasa_no_service(voice_service):
 
 # Test process_voice_command
 @pytest.mark.asyncio
-async def test_process_voice_command_success(voice_service):
+async def test_process_voice_command_success(voice_service, wav_audio):
     # Set up STT provider and mock
     voice_service.settings.STT_PROVIDER = "whisper"
     voice_service.whisper_model.transcribe.return_value = {"text": "book appointment"}
@@ -183,7 +195,7 @@ async def test_process_voice_command_success(voice_service):
         mock_text_input.return_value = Mock()
         mock_query_input.return_value = Mock()
 
-        result = await voice_service.process_voice_command(b"fake audio", "test_session")
+        result = await voice_service.process_voice_command(wav_audio, "test_session")
         
         # Verify the result
         assert result["intent"] == "booking"
@@ -214,4 +226,22 @@ async def test_handle_conversation_success(voice_service):
     
     assert "Booking confirmed" in result["text"]
     assert result["audio"] == b"fake audio response"
-    assert "command_data" in result 
\ No newline at end of file
+    assert "command_data" in result
+
+
+# Test converse
+@pytest.mark.asyncio
+async def test_converse_replaces_reply_for_invalid_service(voice_service):
+    mock_rasa = AsyncMock()
+    mock_rasa.detect_intent = AsyncMock(return_value={
+        "text": "Sure, when?",
+        "entities": [{"entity": "service", "value": "tattoo"}]
+    })
+
+    with patch.dict('sys.modules', {'app.services.rasa_service': Mock(rasa_service=mock_rasa)}):
+        result = await voice_service.converse("book a tattoo", "test_session")
+
+    assert result["user_text"] == "book a tattoo"
+    assert "not a service we offer" in result["bot_text"]
+    assert result["service_validation"] == {"service": "tattoo", "normalized_service": "tattoo", "is_valid": False}
+    mock_rasa.detect_intent.assert_awaited_once_with("book a tattoo", "test_session")
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app.core.exceptions import ValidationError
+from app.models import Appointment, AppointmentStatus, Branch, Customer, Service, Staff, WaitlistStatus
+from app.services.appointment_service import AppointmentService
+from app.services.waitlist_service import WaitlistService, fill_cancelled_slot
+
+# A Monday comfortably in the future, since only future slots are refilled
+_today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+DAY = _today + timedelta(days=14 - _today.weekday())
+
+@pytest.fixture
+def customers(db):
+    customers = [Customer(name=f"Waiting {i}", email=f"waiting{i}@example.com") for i in range(3)]
+    db.add_all(customers)
+    db.commit()
+    return customers
+
+async def book(db, salon, staff, start, customer=None):
+    return await AppointmentService(db).create_appointment(
+        customer_id=(customer or salon["customer"]).id,
+        staff_id=staff.id,
+        service_id=salon["service"].id,
+        branch_id=staff.branch_id,
+        appointment_time=start
+    )
+
+async def join(db, salon, customer, *windows, staff_id=None, branch=None):
+    return await WaitlistService(db).join_waitlist(
+        customer_id=customer.id,
+        service_id=salon["service"].id,
+        branch_id=(branch or salon["branches"][0]).id,
+        windows=list(windows),
+        staff_id=staff_id
+    )
+
+async def cancel_and_fill(db, appointment):
+    await AppointmentService(db).cancel_appointment(appointment["id"])
+    return await WaitlistService(db).fill_slot(appointment["id"])
+
+async def test_cancelled_slot_goes_to_longest_waiting_match(db, salon, customers):
+    stylist = salon["staff"][0]
+    booked = await book(db, salon, stylist, DAY + timedelta(hours=10))
+    first, second, elsewhere = customers
+    # Window misses the slot
+    await join(db, salon, elsewhere, (DAY + timedelta(hours=12), DAY + timedelta(hours=15)))
+    await join(db, salon, first, (DAY + timedelta(hours=9), DAY + timedelta(hours=12)),
+               (DAY + timedelta(days=1), DAY + timedelta(days=2)))
+    await join(db, salon, second, (DAY, DAY + timedelta(days=1)))
+
+    filled = await cancel_and_fill(db, booked)
+
+    assert filled["customer_id"] == first.id
+    assert filled["staff_id"] == stylist.id
+    assert filled["appointment_time"] == DAY + timedelta(hours=10)
+    # Every window of the booked customer is closed, the others keep waiting
+    assert await WaitlistService(db).get_customer_waitlist(first.id) == []
+    assert len(await WaitlistService(db).get_customer_waitlist(second.id)) == 1
+    appointment = db.get(Appointment, filled["id"])
+    assert appointment.status == AppointmentStatus.SCHEDULED
+    assert appointment.notes == "Booked from the waitlist"
+
+async def test_staff_preference_and_branch_are_respected(db, salon, customers):
+    stylist_a, stylist_b, stylist_c = salon["staff"][:3]
+    booked = await book(db, salon, stylist_a, DAY + timedelta(hours=10))
+    window = (DAY + timedelta(hours=9), DAY + timedelta(hours=12))
+    await join(db, salon, customers[0], window, staff_id=stylist_c.id)
+    await join(db, salon, customers[1], window, branch=salon["branches"][1])
+    await join(db, salon, customers[2], window, staff_id=stylist_a.id)
+
+    filled = await cancel_and_fill(db, booked)
+
+    assert filled["customer_id"] == customers[2].id
+
+async def test_customer_already_busy_is_skipped(db, salon, customers):
+    stylist_a, stylist_b = salon["staff"][:2]
+    booked = await book(db, salon, stylist_a, DAY + timedelta(hours=10))
+    await book(db, salon, stylist_b, DAY + timedelta(hours=10), customer=customers[0])
+    window = (DAY + timedelta(hours=9), DAY + timedelta(hours=12))
+    await join(db, salon, customers[0], window)
+    await join(db, salon, customers[1], window)
+
+    filled = await cancel_and_fill(db, booked)
+
+    assert filled["customer_id"] == customers[1].id
+
+async def test_slot_taken_again_is_not_filled(db, salon, customers):
+    stylist = salon["staff"][0]
+    booked = await book(db, salon, stylist, DAY + timedelta(hours=10))
+    await join(db, salon, customers[0], (DAY + timedelta(hours=9), DAY + timedelta(hours=12)))
+    await AppointmentService(db).cancel_appointment(booked["id"])
+    await book(db, salon, stylist, DAY + timedelta(hours=10), customer=customers[1])
+
+    assert await WaitlistService(db).fill_slot(booked["id"]) is None
+    assert len(await WaitlistService(db).get_customer_waitlist(customers[0].id)) == 1
+
+async def test_active_or_past_appointments_are_not_filled(db, salon, customers):
+    stylist = salon["staff"][0]
+    active = await book(db, salon, stylist, DAY + timedelta(hours=10))
+    past = await book(db, salon, stylist, DAY - timedelta(days=28) + timedelta(hours=10))
+    await join(db, salon, customers[0], (DAY - timedelta(days=28), DAY - timedelta(days=27)))
+    await join(db, salon, customers[0], (DAY + timedelta(hours=9), DAY + timedelta(hours=12)))
+
+    assert await WaitlistService(db).fill_slot(active["id"]) is None
+    assert await cancel_and_fill(db, past) is None
+
+async def test_matching_uses_the_waiting_window_index(db, salon, customers):
+    stylist = salon["staff"][0]
+    booked = await book(db, salon, stylist, DAY + timedelta(hours=10))
+    await join(db, salon, customers[0], (DAY + timedelta(hours=9), DAY + timedelta(hours=12)))
+    await AppointmentService(db).cancel_appointment(booked["id"])
+
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if "FROM waitlist_entries" in statement and statement.lstrip().startswith("SELECT"):
+            plans.append(conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall())
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", explain)
+    try:
+        await WaitlistService(db).fill_slot(booked["id"])
+    finally:
+        event.remove(engine, "before_cursor_execute", explain)
+
+    assert any("ix_waitlist_entries_waiting_window" in row[-1] for plan in plans for row in plan)
+
+async def test_join_and_leave_waitlist(db, salon, customers):
+    entries = await join(db, salon, customers[0], (DAY + timedelta(hours=9), DAY + timedelta(hours=12)))
+    assert entries[0]["status"] == WaitlistStatus.WAITING.value
+
+    removed = await WaitlistService(db).leave_waitlist(entries[0]["id"])
+    assert removed["status"] == WaitlistStatus.REMOVED.value
+    assert await WaitlistService(db).get_customer_waitlist(customers[0].id) == []
+
+    with pytest.raises(ValidationError):
+        await join(db, salon, customers[0], (DAY, DAY - timedelta(hours=1)))
+    with pytest.raises(ValidationError):
+        await join(db, salon, customers[0], (DAY, DAY + timedelta(days=30)))
+
+async def test_background_fill_uses_its_own_session(async_sessions):
+    async with async_sessions() as db:
+        branch = Branch(name="Downtown", address="1 Main St", city="SF", state="CA", phone="555-0001")
+        service = Service(name="Haircut", duration_minutes=60, price=50.0, category="Hair")
+        customers = [Customer(name=f"Customer {i}", email=f"customer{i}@example.com") for i in range(2)]
+        db.add_all([branch, service] + customers)
+        await db.commit()
+        stylist = Staff(name="Stylist", email="stylist@salon.com", role="Stylist", branch_id=branch.id)
+        db.add(stylist)
+        await db.commit()
+
+        booked = await AppointmentService(db).create_appointment(
+            customer_id=customers[0].id,
+            staff_id=stylist.id,
+            service_id=service.id,
+            branch_id=branch.id,
+            appointment_time=DAY + timedelta(hours=10)
+        )
+        await WaitlistService(db).join_waitlist(
+            customer_id=customers[1].id,
+            service_id=service.id,
+            branch_id=branch.id,
+            windows=[(DAY, DAY + timedelta(days=1))]
+        )
+        await AppointmentService(db).cancel_appointment(booked["id"])
+
+    await fill_cancelled_slot(booked["id"], session_factory=async_sessions)
+
+    async with async_sessions() as db:
+        page = await AppointmentService(db).get_customer_appointments(customer_id=customers[1].id)
+    assert [item["appointment_time"] for item in page["items"]] == [DAY + timedelta(hours=10)]
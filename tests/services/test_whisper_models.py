@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, Mock
+import numpy as np
+import pytest
+import torch
+from app.core.metrics import metrics
+from app.services.voice_service import VoiceService, VoiceServiceSettings, create_stt_executor
+from app.services.whisper_models import WhisperModelRegistry, model_footprint, warm_up_worker
+
+class FakeModel(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(4, 2)  # 8 weights + 2 biases, float32
+        self.register_buffer("mel_filters", torch.zeros(3))
+        self.transcribed = []
+
+    def transcribe(self, audio):
+        self.transcribed.append(audio)
+        return {"text": " hello "}
+
+def test_each_model_loads_once_across_threads():
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        time.sleep(0.05)
+        return FakeModel()
+
+    registry = WhisperModelRegistry(loader=loader)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(registry.get, ["tiny"] * 8 + ["base"] * 4))
+
+    assert sorted(loads) == ["base", "tiny"]
+    assert len({id(model) for model in models[:8]}) == 1
+    assert registry.is_loaded("tiny") and registry.is_loaded("base")
+
+def test_warm_up_and_footprint():
+    registry = WhisperModelRegistry(loader=lambda name: FakeModel())
+    assert registry.info() == {}
+
+    timings = registry.warm_up(["tiny"])
+
+    model = registry.get("tiny")
+    assert set(timings) == {"tiny"}
+    assert len(model.transcribed) == 1
+    assert model.transcribed[0].dtype == np.float32
+    info = registry.info()["tiny"]
+    assert info["memory_bytes"] == (8 + 2 + 3) * 4
+    assert info["warm_up_seconds"] is not None
+    assert metrics.gauge("whisper_model_memory_bytes", "").value({"model": "tiny"}) == 52
+
+    registry.unload("tiny")
+    assert not registry.is_loaded("tiny")
+    assert model_footprint(Mock(spec=[])) is None
+
+async def test_voice_services_share_the_registry_model(monkeypatch, wav_audio):
+    model = FakeModel()
+    registry = WhisperModelRegistry(loader=Mock(return_value=model))
+    monkeypatch.setattr("app.services.voice_service.whisper_models", registry)
+
+    first, second = VoiceService(), VoiceService()
+    first.settings.STT_PROVIDER = second.settings.STT_PROVIDER = "whisper"
+    assert first.whisper_model is second.whisper_model is model
+    assert await first.speech_to_text(Mock(read=Mock(return_value=wav_audio))) == "hello"
+    registry.loader.assert_called_once_with(first.settings.WHISPER_MODEL)
+
+async def test_failed_load_falls_back_to_google(monkeypatch, wav_audio):
+    registry = WhisperModelRegistry(loader=Mock(side_effect=RuntimeError("no weights")))
+    monkeypatch.setattr("app.services.voice_service.whisper_models", registry)
+
+    service = VoiceService()
+    service.settings.STT_PROVIDER = "whisper"
+    service.speech_client = None
+    with pytest.raises(ValueError, match="Whisper model not initialized"):
+        await service.speech_to_text(Mock(read=Mock(return_value=wav_audio)))
+    # The fallback is per call: the next one tries Whisper again
+    assert service.settings.STT_PROVIDER == "whisper"
+
+    service.speech_client = Mock()
+    google = AsyncMock(return_value="from google")
+    monkeypatch.setattr(service, "_google_speech_to_text", google)
+    assert await service.speech_to_text(Mock(read=Mock(return_value=wav_audio))) == "from google"
+    assert registry.loader.call_count == 2
+
+def test_process_workers_load_their_own_model(monkeypatch):
+    registry = WhisperModelRegistry(loader=Mock(side_effect=AssertionError("loaded in the parent")))
+    monkeypatch.setattr("app.services.voice_service.whisper_models", registry)
+    settings = VoiceServiceSettings(STT_EXECUTOR="process", STT_PROVIDER="whisper", WHISPER_PRELOAD=True)
+
+    service = VoiceService()
+    service.stt_executor = create_stt_executor(settings)
+    assert service._load_whisper_model()
+    registry.loader.assert_not_called()
+    # Workers warm up as they start instead
+    assert service.stt_executor.initializer is warm_up_worker
+    assert service.stt_executor.initargs == ([settings.WHISPER_MODEL],)